@@ -1,17 +1,43 @@
-from flask import Flask, request, jsonify, send_file
-import io
-import json
+import time
+
+_STARTUP_STARTED = time.perf_counter()
+
+from flask import (
+    Flask,
+    g,
+    has_request_context,
+    jsonify,
+    request,
+    send_file,
+    send_from_directory,
+)
+import functools
+import math
+import multiprocessing
 import os
 import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import date as date_cls, datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 import requests
 
-from pdf_utils import build_timetable_pdf
-from xlsx_utils import build_timetable_xlsx
+from data_registry import DataRegistry
+from export_cache import ExportCache, export_cache_key
+from export_jobs import ExportJobQueue, QueueFullError
+import memory_sampling
+import metrics
+import profiling
+import server_timing
+from request_bodies import RequestBodyError, read_json_body
+from station_index import norm_station_query
 
 from flask_cors import CORS
 
+STARTUP_PHASES = [("imports", time.perf_counter() - _STARTUP_STARTED)]
+
 app = Flask(__name__, static_folder="docs", static_url_path="")
 
 ALLOWED_ORIGINS = [
@@ -55,10 +81,207 @@ if RTT_API_MODE not in {"new", "legacy", "auto"}:
 
 print(f"RTT API mode: {RTT_API_MODE}")
 
-DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+DATA_DIR = os.environ.get("DATA_DIR") or os.path.join(os.path.dirname(__file__), "data")
 DATA_PATH = os.path.join(DATA_DIR, "stations.json")
 ATOC_CODES_PATH = os.path.join(DATA_DIR, "atoc_codes.json")
 CONNECTIONS_PATH = os.path.join(DATA_DIR, "connections.json")
+# Seconds between checks of the data files for changes; 0 disables reloading.
+DATA_RELOAD_INTERVAL = float(os.environ.get("DATA_RELOAD_INTERVAL") or 30)
+DATA_SNAPSHOT_PATH = os.environ.get("DATA_SNAPSHOT_PATH") or os.path.join(
+    DATA_DIR, "snapshot.pickle"
+)
+# Fast start defers the PDF/XLSX libraries to the first export and loads data
+# from the prebuilt snapshot when it is current.
+FAST_START = (os.environ.get("FAST_START") or "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+}
+# Default PDF renderer: "platypus", "canvas" (direct grid drawing, for very
+# large timetables) or "auto". A request can override it with ?renderer=
+# or meta.renderer.
+PDF_RENDERER = (os.environ.get("PDF_RENDERER") or "platypus").strip().lower()
+# XLSX writer: "standard", "streaming" (write-only sheets, for large
+# workbooks) or "auto". A request can override it with ?writer=.
+XLSX_WRITER = (os.environ.get("XLSX_WRITER") or "auto").strip().lower()
+# Worker processes for rendering large PDFs in parallel; 0 (the default)
+# renders in the request thread. Off by default because parallel output is
+# not the serial document: each batch starts on a new page, so there can be
+# a few more pages (124 instead of 121 for 2 x 60 x 200 cells), and the
+# merged file is written by pypdf. The speedup depends on having spare CPUs;
+# on one CPU four workers were slower than serial (55 s against 50 s).
+PDF_RENDER_PROCESSES = max(0, int(os.environ.get("PDF_RENDER_PROCESSES") or "0"))
+# Rendered exports are cached by payload hash: a per-worker memory LRU and,
+# when EXPORT_CACHE_DIR is set, a directory shared by all workers. A size of
+# 0 turns that tier off.
+EXPORT_CACHE_MEMORY_MB = float(os.environ.get("EXPORT_CACHE_MEMORY_MB") or "64")
+EXPORT_CACHE_DIR = os.environ.get("EXPORT_CACHE_DIR") or None
+EXPORT_CACHE_DISK_MB = float(os.environ.get("EXPORT_CACHE_DISK_MB") or "512")
+# Exports are rendered into a temporary file that moves from memory to disk
+# past this size, then streamed from there. Exports this large also skip the
+# in-memory cache tier.
+EXPORT_SPOOL_MB = float(os.environ.get("EXPORT_SPOOL_MB") or "2")
+# Background export jobs (/timetable/jobs). State lives in EXPORT_JOB_DIR so
+# any worker on the host can answer a poll; with several instances, see the
+# README. Synchronous exports larger than
+# EXPORT_SYNC_MAX_CELLS are refused with a pointer to the job API (0 = no
+# limit).
+EXPORT_JOB_DIR = os.environ.get("EXPORT_JOB_DIR") or os.path.join(
+    tempfile.gettempdir(), "paper-timetable-jobs"
+)
+EXPORT_JOB_WORKERS = max(1, int(os.environ.get("EXPORT_JOB_WORKERS") or "2"))
+EXPORT_JOB_MAX_QUEUED = max(1, int(os.environ.get("EXPORT_JOB_MAX_QUEUED") or "32"))
+EXPORT_JOB_RETENTION = float(os.environ.get("EXPORT_JOB_RETENTION") or "600")
+EXPORT_SYNC_MAX_CELLS = max(0, int(os.environ.get("EXPORT_SYNC_MAX_CELLS") or "0"))
+# Export request bodies may be gzip or deflate compressed. Both limits apply
+# to the decompressed body; the ratio limit turns away compression bombs
+# (0 = no limit).
+EXPORT_BODY_MAX_MB = float(os.environ.get("EXPORT_BODY_MAX_MB") or "64")
+EXPORT_BODY_MAX_RATIO = float(os.environ.get("EXPORT_BODY_MAX_RATIO") or "200")
+# /metrics sums what every gunicorn worker writes to METRICS_DIR.
+# GUNICORN_THREADS must match gunicorn's --threads (the Dockerfile passes it)
+# for the thread saturation gauges to be meaningful.
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(
+    tempfile.gettempdir(), "paper-timetable-metrics"
+)
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL") or "5")
+GUNICORN_THREADS = max(1, int(os.environ.get("GUNICORN_THREADS") or "8"))
+# Per-phase timings (token, upstream, decode, normalize, serialize; parse,
+# layout, render for exports) go out in a Server-Timing header unless
+# SERVER_TIMING is off. Requests slower than SERVER_TIMING_LOG_MS are logged
+# with the same breakdown (0 disables the log).
+SERVER_TIMING = (os.environ.get("SERVER_TIMING") or "1").strip().lower() not in {
+    "0",
+    "false",
+    "no",
+}
+SERVER_TIMING_LOG_MS = float(os.environ.get("SERVER_TIMING_LOG_MS") or "1000")
+# Request profiling, off unless configured. A request whose X-Profile-Token
+# header matches PROFILE_SECRET is always profiled, and PROFILE_SAMPLE_RATE
+# (0-1) of all other requests are. The stack is sampled every
+# PROFILE_INTERVAL_MS and the newest PROFILE_MAX_FILES profiles are kept in
+# PROFILE_DIR. /admin/profiles lists and serves them, and can change the
+# sample rate of every worker; it needs the same header.
+PROFILE_HEADER = "X-Profile-Token"
+PROFILE_SECRET = os.environ.get("PROFILE_SECRET") or None
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE") or "0")
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS") or "5")
+PROFILE_MAX_FILES = max(1, int(os.environ.get("PROFILE_MAX_FILES") or "200"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or os.path.join(
+    tempfile.gettempdir(), "paper-timetable-profiles"
+)
+# Fraction (0-1) of calls to the export builders and the search and service
+# normalizers run under tracemalloc. Each sample's peak and net bytes go to
+# /metrics and are logged with its MEMORY_TOP_SITES largest allocation sites.
+MEMORY_SAMPLE_RATE = float(os.environ.get("MEMORY_SAMPLE_RATE") or "0")
+MEMORY_TOP_SITES = max(1, int(os.environ.get("MEMORY_TOP_SITES") or "5"))
+
+
+EXPORT_CACHE = ExportCache(
+    int(EXPORT_CACHE_MEMORY_MB * 1024 * 1024),
+    disk_dir=EXPORT_CACHE_DIR,
+    max_disk_bytes=int(EXPORT_CACHE_DISK_MB * 1024 * 1024),
+    max_memory_entry_bytes=int(EXPORT_SPOOL_MB * 1024 * 1024),
+    logger=app.logger,
+)
+EXPORT_JOBS = ExportJobQueue(
+    EXPORT_JOB_DIR,
+    workers=EXPORT_JOB_WORKERS,
+    max_queued=EXPORT_JOB_MAX_QUEUED,
+    retention=EXPORT_JOB_RETENTION,
+    logger=app.logger,
+)
+
+METRICS = metrics.Metrics(METRICS_DIR, flush_interval=METRICS_FLUSH_INTERVAL, logger=app.logger)
+METRICS.histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by route and status.",
+    metrics.LATENCY_BUCKETS,
+)
+METRICS.gauge("http_requests_in_flight", "Requests being handled.")
+METRICS.gauge("http_worker_threads", "Request threads available to handle them.")
+METRICS.histogram(
+    "rtt_upstream_request_duration_seconds",
+    "Time for an RTT API request, by backend and outcome.",
+    metrics.LATENCY_BUCKETS,
+)
+METRICS.gauge("rtt_upstream_requests_in_flight", "RTT API requests awaiting a response.")
+METRICS.histogram(
+    "rtt_upstream_retry_after_seconds",
+    "Retry-After values sent with RTT rate limit responses.",
+    metrics.RETRY_AFTER_BUCKETS,
+)
+METRICS.histogram(
+    "export_render_duration_seconds",
+    "Time to render an export that missed the cache, by format.",
+    metrics.RENDER_BUCKETS,
+)
+METRICS.histogram(
+    "export_output_bytes", "Size of rendered exports, by format.", metrics.SIZE_BUCKETS
+)
+METRICS.histogram(
+    "memory_sample_peak_bytes",
+    "Peak traced memory of sampled calls, by function.",
+    metrics.MEMORY_BUCKETS,
+)
+METRICS.histogram(
+    "memory_sample_net_bytes",
+    "Traced memory still held when sampled calls returned, by function.",
+    metrics.MEMORY_BUCKETS,
+)
+
+
+def _report_memory_sample(function, peak, net, sites):
+    labels = {"function": function}
+    METRICS.observe("memory_sample_peak_bytes", peak, labels)
+    METRICS.observe("memory_sample_net_bytes", net, labels)
+    app.logger.info(
+        "Memory sample: function=%s peak_bytes=%d net_bytes=%d top_sites=%s",
+        function,
+        peak,
+        net,
+        ",".join(f"{site}={size}" for site, size in sites),
+    )
+
+
+memory_sampling.configure(
+    MEMORY_SAMPLE_RATE, top_sites=MEMORY_TOP_SITES, report=_report_memory_sample
+)
+
+PROFILER = profiling.RequestProfiler(
+    PROFILE_DIR,
+    secret=PROFILE_SECRET,
+    sample_rate=PROFILE_SAMPLE_RATE,
+    interval=PROFILE_INTERVAL_MS / 1000,
+    max_files=PROFILE_MAX_FILES,
+    logger=app.logger,
+)
+
+_pdf_pool = None
+_pdf_pool_lock = threading.Lock()
+
+
+def _get_pdf_pool():
+    global _pdf_pool
+    if PDF_RENDER_PROCESSES < 2:
+        return None
+    with _pdf_pool_lock:
+        if _pdf_pool is None:
+            # Forking a threaded server is unsafe; spawned workers import
+            # pdf_utils themselves on first use.
+            _pdf_pool = ProcessPoolExecutor(
+                max_workers=PDF_RENDER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pdf_pool
+
+
+def _reset_pdf_pool(pool):
+    global _pdf_pool
+    with _pdf_pool_lock:
+        if _pdf_pool is pool:
+            _pdf_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
 
 
 class RttTimeoutError(Exception):
@@ -139,42 +362,29 @@ def _pin_auto_mode_to_new(reason):
     )
 
 
-def norm_station_query(value):
-    value = (value or "").lower()
-    value = value.replace("&", "and")
-    value = re.sub(r"[^a-z0-9 ]+", " ", value)
-    value = re.sub(r"\s+", " ", value).strip()
-    return value
-
-
-with open(DATA_PATH, "r", encoding="utf-8") as f:
-    STATIONS = json.load(f)
-
-with open(ATOC_CODES_PATH, "r", encoding="utf-8") as f:
-    ATOC_CODES = json.load(f)
-
-with open(CONNECTIONS_PATH, "r", encoding="utf-8") as f:
-    CONNECTIONS = json.load(f)
-
-
-STATIONS_N = [
+DATA = DataRegistry(
     {
-        "stationName": st["stationName"],
-        "crsCode": st["crsCode"],
-        "_name_n": norm_station_query(st["stationName"]),
-        "_crs_n": st["crsCode"].lower(),
-        "_n": norm_station_query(st["stationName"]) + " " + st["crsCode"].lower(),
-    }
-    for st in STATIONS
-    if st.get("crsCode")
-]
+        "stations": DATA_PATH,
+        "atoc_codes": ATOC_CODES_PATH,
+        "connections": CONNECTIONS_PATH,
+    },
+    check_interval=DATA_RELOAD_INTERVAL,
+    logger=app.logger,
+    snapshot_path=DATA_SNAPSHOT_PATH if FAST_START else None,
+)
+STARTUP_PHASES.extend(DATA.load_phases)
 
-STATIONS_BY_CRS = {
-    st["crsCode"].upper(): st["stationName"]
-    for st in STATIONS
-    if st.get("crsCode")
-}
+if not FAST_START:
+    _export_started = time.perf_counter()
+    import pdf_utils  # noqa: F401
+    import xlsx_utils  # noqa: F401
+
+    STARTUP_PHASES.append(("export modules", time.perf_counter() - _export_started))
 
+NEAR_STATIONS_DEFAULT_LIMIT = 5
+NEAR_STATIONS_MAX_LIMIT = 50
+NEAR_STATIONS_MAX_POINTS = 500
+STATION_LOOKUP_MAX_CODES = 100
 
 def _parse_retry_after(value):
     if value is None:
@@ -188,10 +398,62 @@ def _parse_retry_after(value):
         return None
     return parsed if parsed >= 0 else None
 
+def _upstream_outcome(status_code):
+    if status_code == 429:
+        return "429"
+    if status_code >= 500:
+        return "5xx"
+    if status_code >= 400:
+        return "4xx"
+    return "ok"
+
+
+def _upstream_get(backend, url, **kwargs):
+    """requests.get against an RTT backend, recorded in the upstream metrics.
+
+    The body is read before returning, as a plain requests.get would, but
+    separately so that time to first byte and body transfer can be told
+    apart. requests has no hook for the connect, so it counts as TTFB.
+    """
+    labels = {"backend": backend}
+    outcome = "error"
+    started = time.perf_counter()
+    METRICS.inc("rtt_upstream_requests_in_flight", labels)
+    try:
+        resp = requests.get(url, stream=True, **kwargs)
+        headers_at = time.perf_counter()
+        resp.content
+        outcome = _upstream_outcome(resp.status_code)
+        # Token fetches are already timed as a whole by the "token" phase.
+        if backend != "token":
+            server_timing.record("upstream-ttfb", headers_at - started)
+            server_timing.record("upstream-body", time.perf_counter() - headers_at)
+        return resp
+    except requests.Timeout:
+        outcome = "timeout"
+        raise
+    except requests.ConnectionError:
+        outcome = "connection"
+        raise
+    finally:
+        METRICS.inc("rtt_upstream_requests_in_flight", labels, -1)
+        METRICS.observe(
+            "rtt_upstream_request_duration_seconds",
+            time.perf_counter() - started,
+            {"backend": backend, "outcome": outcome},
+        )
+
+
+def _record_retry_after(backend, retry_after):
+    if retry_after is not None:
+        METRICS.observe("rtt_upstream_retry_after_seconds", retry_after, {"backend": backend})
+
+
 def rtt_get(path, params=None):
     url = RTT_LEGACY_BASE + path
     try:
-        resp = requests.get(
+        resp = _upstream_get(
+            "legacy",
             url,
             auth=(RTT_USER, RTT_PASS),
             params=params,
@@ -205,6 +467,7 @@ def rtt_get(path, params=None):
         raise RttConnectionError() from exc
     if resp.status_code == 429:
         retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+        _record_retry_after("legacy", retry_after)
         app.logger.warning(
             "RTT rate limit for %s (retry_after=%s): %s",
             url,
@@ -218,7 +481,8 @@ def rtt_get(path, params=None):
         # Log the body once to see what RTT is actually saying
         app.logger.error("RTT error %s for %s: %s", resp.status_code, url, resp.text[:500])
         raise RttHttpError(resp.status_code, resp.text) from e
-    return resp.json()
+    with server_timing.phase("decode"):
+        return resp.json()
 
 
 def _short_code_from_location(location_obj):
@@ -653,6 +917,7 @@ def _normalize_search_service_entry(service, search_crs="", search_description="
     }
 
 
+@memory_sampling.sampled
 def _normalize_search_response(data, to_code=None):
     query = (data or {}).get("query") or {}
     query_location = query.get("location") or {}
@@ -669,7 +934,7 @@ def _normalize_search_response(data, to_code=None):
     to_name = _first_present_text(
         destination.get("name"),
         destination.get("description"),
-        STATIONS_BY_CRS.get((to_code or "").upper(), "") if to_code else "",
+        _current_data().stations_by_crs.get((to_code or "").upper(), "") if to_code else "",
     )
     query_crs = _first_present_text(_short_code_from_location(query_location), location.get("crs"))
 
@@ -694,6 +959,7 @@ def _normalize_search_response(data, to_code=None):
     }
 
 
+@memory_sampling.sampled
 def _normalize_service_response(data):
     payload = data or {}
     service_obj = payload.get("service") if isinstance(payload.get("service"), dict) else payload
@@ -942,7 +1208,7 @@ def _convert_new_search_to_legacy_shape(data, to_code=None):
     query = data.get("query") or {}
     query_location = query.get("location") or {}
     from_name = query_location.get("description") or ""
-    to_name = STATIONS_BY_CRS.get((to_code or "").upper(), "") if to_code else ""
+    to_name = _current_data().stations_by_crs.get((to_code or "").upper(), "") if to_code else ""
     services = data.get("services") or []
     return {
         "location": {"name": from_name, "description": from_name},
@@ -1012,7 +1278,8 @@ def _get_refreshable_access_token():
     # Try treating RTT_TOKEN as a refresh token first.
     url = f"{RTT_NEW_BASE}/api/get_access_token"
     try:
-        resp = requests.get(
+        resp = _upstream_get(
+            "token",
             url,
             headers={"Authorization": f"Bearer {RTT_TOKEN}"},
             timeout=15,
@@ -1025,6 +1292,7 @@ def _get_refreshable_access_token():
         raise RttConnectionError() from exc
     if resp.status_code == 429:
         retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+        _record_retry_after("token", retry_after)
         app.logger.warning(
             "RTT rate limit for %s (retry_after=%s): %s",
             url,
@@ -1047,10 +1315,12 @@ def _get_refreshable_access_token():
 
 
 def rtt_get_new(path, params=None):
-    token = _get_refreshable_access_token()
+    with server_timing.phase("token"):
+        token = _get_refreshable_access_token()
     url = RTT_NEW_BASE + path
     try:
-        resp = requests.get(
+        resp = _upstream_get(
+            "new",
             url,
             headers={"Authorization": f"Bearer {token}"},
             params=params,
@@ -1064,6 +1334,7 @@ def rtt_get_new(path, params=None):
         raise RttConnectionError() from exc
     if resp.status_code == 429:
         retry_after = _parse_retry_after(resp.headers.get("Retry-After"))
+        _record_retry_after("new", retry_after)
         app.logger.warning(
             "RTT rate limit for %s (retry_after=%s): %s",
             url,
@@ -1081,7 +1352,107 @@ def rtt_get_new(path, params=None):
             resp.text[:500],
         )
         raise RttHttpError(resp.status_code, resp.text) from e
-    return resp.json()
+    with server_timing.phase("decode"):
+        return resp.json()
+
+
+@app.before_request
+def _check_data_files():
+    DATA.maybe_reload()
+    # The whole request answers from this snapshot, even if a reload swaps
+    # in another meanwhile, so X-Data-Version matches what was served.
+    g.data = DATA.current()
+
+
+def _current_data():
+    data = g.get("data") if has_request_context() else None
+    return data if data is not None else DATA.current()
+
+
+@app.after_request
+def _add_data_version(response):
+    if request.path.startswith("/api/"):
+        response.headers["X-Data-Version"] = _current_data().version
+    return response
+
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics_started = time.perf_counter()
+    # Set here rather than at import so it is recorded by the worker itself.
+    METRICS.set("http_worker_threads", GUNICORN_THREADS)
+    METRICS.inc("http_requests_in_flight")
+
+
+@app.after_request
+def _record_response_status(response):
+    g.metrics_status = response.status_code
+    return response
+
+
+@app.after_request
+def _add_server_timing(response):
+    timings = server_timing.current()
+    if not SERVER_TIMING or not timings:
+        return response
+    started = g.get("metrics_started")
+    total = time.perf_counter() - started if started is not None else None
+    response.headers["Server-Timing"] = server_timing.header_value(timings, total)
+    # Lets the page read the timings through the Resource Timing API too.
+    origin = request.headers.get("Origin")
+    if origin in ALLOWED_ORIGINS:
+        response.headers["Timing-Allow-Origin"] = origin
+    return response
+
+
+@app.before_request
+def _start_profile():
+    if not PROFILER.enabled or request.path.startswith(("/admin/", "/metrics")):
+        return
+    requested = PROFILER.authorized(request.headers.get(PROFILE_HEADER))
+    if requested or PROFILER.sampled():
+        route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+        g.profile = PROFILER.start(route)
+        g.profile_requested = requested
+
+
+@app.after_request
+def _add_profile_name(response):
+    profile = g.get("profile")
+    if profile is not None and g.get("profile_requested"):
+        response.headers["X-Profile"] = profile.name
+    return response
+
+
+@app.teardown_request
+def _finish_profile(exc):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        PROFILER.finish(profile)
+
+
+@app.teardown_request
+def _record_request_metrics(exc):
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    METRICS.inc("http_requests_in_flight", value=-1)
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    status = 500 if exc is not None else g.pop("metrics_status", 500)
+    duration = time.perf_counter() - started
+    METRICS.observe(
+        "http_request_duration_seconds",
+        duration,
+        {"route": route, "status": str(status)},
+    )
+    if SERVER_TIMING_LOG_MS and duration * 1000 >= SERVER_TIMING_LOG_MS:
+        app.logger.warning(
+            "Slow request: method=%s route=%s status=%s %s",
+            request.method,
+            route,
+            status,
+            server_timing.log_fields(server_timing.current(), duration),
+        )
 
 
 # Only used in testing
@@ -1171,7 +1542,10 @@ def api_search():
         if _rtt_error_is_outside_permitted_history(exc):
             return jsonify({"error": "history_too_old"}), 400
         return jsonify({"error": "upstream", "status": exc.status_code}), 502
-    return jsonify(_normalize_search_response(data, to_code=to))
+    with server_timing.phase("normalize"):
+        body = _normalize_search_response(data, to_code=to)
+    with server_timing.phase("serialize"):
+        return jsonify(body)
 
 @app.route("/rtt/service")
 def api_service():
@@ -1248,7 +1622,10 @@ def api_service():
         if _rtt_error_is_outside_permitted_history(exc):
             return jsonify({"error": "history_too_old"}), 400
         return jsonify({"error": "upstream", "status": exc.status_code}), 502
-    return jsonify(_normalize_service_response(data))
+    with server_timing.phase("normalize"):
+        body = _normalize_service_response(data)
+    with server_timing.phase("serialize"):
+        return jsonify(body)
 
 
 @app.get("/api/stations")
@@ -1261,126 +1638,665 @@ def api_stations():
     if not qn:
         return jsonify([])
 
-    def station_match_score(st):
-        name_n = st["_name_n"]
-        crs_n = st["_crs_n"]
-        text_n = st["_n"]
-
-        if crs_n == qn:
-            return 0
-        if name_n == qn:
-            return 1
-        if name_n.startswith(qn):
-            return 2
-        if any(word.startswith(qn) for word in name_n.split()):
-            return 3
-        if f" {qn}" in name_n:
-            return 4
-        if qn in name_n:
-            return 5
-        if crs_n.startswith(qn):
-            return 6
-        if qn in crs_n:
-            return 7
-        if qn in text_n:
-            return 8
-        return None
-
-    matches = []
-    for st in STATIONS_N:
-        score = station_match_score(st)
-        if score is None:
-            continue
-        matches.append((score, len(st["stationName"]), st["stationName"], st))
-
-    matches.sort(key=lambda item: (item[0], item[1], item[2]))
     return jsonify(
         [
             {"stationName": st["stationName"], "crsCode": st["crsCode"]}
-            for _, _, _, st in matches[:20]
+            for st in _current_data().station_index.search(qn, limit=20)
         ]
     )
 
 
+def _station_lookup_record(st):
+    return {
+        "stationName": st["stationName"],
+        "crsCode": st["crsCode"],
+        "lat": st.get("lat"),
+        "lon": st.get("long"),
+        "constituentCountry": st.get("constituentCountry"),
+    }
+
+
+@app.route("/api/stations/lookup", methods=["GET", "POST"])
+def api_stations_lookup():
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        if not isinstance(payload, dict):
+            return jsonify({"error": "Request body must be a JSON object"}), 400
+        raw_codes = payload.get("crs")
+        if isinstance(raw_codes, str):
+            raw_codes = raw_codes.split(",")
+    else:
+        raw_codes = request.args.get("crs", "").split(",")
+    if not isinstance(raw_codes, list):
+        return jsonify({"error": "crs list required"}), 400
+
+    codes = []
+    for code in raw_codes:
+        code = str(code or "").strip().upper()
+        if code and code not in codes:
+            codes.append(code)
+    if not codes:
+        return jsonify({"error": "crs list required"}), 400
+    if len(codes) > STATION_LOOKUP_MAX_CODES:
+        return jsonify({"error": "too many codes", "max": STATION_LOOKUP_MAX_CODES}), 400
+
+    records = _current_data().station_records_by_crs
+    stations = {}
+    missing = []
+    for code in codes:
+        st = records.get(code)
+        if st is None:
+            missing.append(code)
+        else:
+            stations[code] = _station_lookup_record(st)
+    return jsonify({"stations": stations, "missing": missing})
+
+
+def _parse_coordinate(value, limit):
+    try:
+        parsed = float(value)
+    except (TypeError, ValueError):
+        return None
+    if not math.isfinite(parsed) or abs(parsed) > limit:
+        return None
+    return parsed
+
+
+def _parse_near_limit(value):
+    if value is None or value == "":
+        return NEAR_STATIONS_DEFAULT_LIMIT
+    try:
+        parsed = int(value)
+    except (TypeError, ValueError):
+        return None
+    if parsed < 1:
+        return None
+    return min(parsed, NEAR_STATIONS_MAX_LIMIT)
+
+
+@app.get("/api/stations/near")
+def api_stations_near():
+    lat = _parse_coordinate(request.args.get("lat"), 90)
+    lon = _parse_coordinate(request.args.get("lon"), 180)
+    if lat is None or lon is None:
+        return jsonify({"error": "lat and lon required"}), 400
+
+    limit = _parse_near_limit(request.args.get("limit"))
+    if limit is None:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    return jsonify(_current_data().station_geo_index.nearest(lat, lon, limit=limit))
+
+
+@app.post("/api/stations/near")
+def api_stations_near_bulk():
+    payload = request.get_json(silent=True) or {}
+    if not isinstance(payload, dict):
+        return jsonify({"error": "Request body must be a JSON object"}), 400
+    points = payload.get("points")
+    if not isinstance(points, list) or not points:
+        return jsonify({"error": "points payload required"}), 400
+    if len(points) > NEAR_STATIONS_MAX_POINTS:
+        return jsonify({"error": "too many points", "max": NEAR_STATIONS_MAX_POINTS}), 400
+
+    limit = _parse_near_limit(payload.get("limit"))
+    if limit is None:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+
+    coordinates = []
+    for idx, point in enumerate(points):
+        if isinstance(point, dict):
+            lat = _parse_coordinate(point.get("lat"), 90)
+            lon = _parse_coordinate(point.get("lon", point.get("long")), 180)
+        elif isinstance(point, (list, tuple)) and len(point) == 2:
+            lat = _parse_coordinate(point[0], 90)
+            lon = _parse_coordinate(point[1], 180)
+        else:
+            lat = lon = None
+        if lat is None or lon is None:
+            return jsonify({"error": "invalid point", "index": idx}), 400
+        coordinates.append((lat, lon))
+
+    geo_index = _current_data().station_geo_index
+    return jsonify(
+        {
+            "results": [
+                geo_index.nearest(lat, lon, limit=limit)
+                for lat, lon in coordinates
+            ]
+        }
+    )
+
+
+def _versioned_json(payload, version):
+    resp = jsonify(payload)
+    resp.set_etag(version)
+    return resp.make_conditional(request)
+
+
 @app.get("/api/atoc-codes")
 def api_atoc_codes():
-    return jsonify(ATOC_CODES)
+    data = _current_data()
+    return _versioned_json(data.atoc_codes, data.version)
 
 
 @app.get("/api/connections")
 def api_connections():
-    return jsonify(CONNECTIONS)
+    data = _current_data()
+    return _versioned_json(data.connections, data.version)
 
 
-def _pdf_download_name(meta):
+def _export_download_name(meta, extension):
     raw_name = ""
     if isinstance(meta, dict):
         raw_name = str(meta.get("filename") or "").strip()
     if not raw_name:
-        return "timetable.pdf"
+        return f"timetable.{extension}"
 
     name = re.sub(r"[\x00-\x1f/\\]+", "-", raw_name)
     name = re.sub(r"\s+", " ", name).strip(" .")
-    if not name.lower().endswith(".pdf"):
-        name = f"{name}.pdf"
-    return name[:180] or "timetable.pdf"
+    name = re.sub(r"\.(pdf|xlsx)$", "", name, flags=re.IGNORECASE)
+    if not name:
+        return f"timetable.{extension}"
+    if not name.lower().endswith(f".{extension}"):
+        name = f"{name}.{extension}"
+    return name[:180]
 
 
-def _xlsx_download_name(meta):
-    raw_name = ""
-    if isinstance(meta, dict):
-        raw_name = str(meta.get("filename") or "").strip()
-    if not raw_name:
-        return "timetable.xlsx"
+PDF_MIMETYPE = "application/pdf"
+XLSX_MIMETYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
 
-    name = re.sub(r"[\x00-\x1f/\\]+", "-", raw_name)
-    name = re.sub(r"\s+", " ", name).strip(" .")
-    name = re.sub(r"\.pdf$", ".xlsx", name, flags=re.IGNORECASE)
-    if not name.lower().endswith(".xlsx"):
-        name = f"{name}.xlsx"
-    return name[:180] or "timetable.xlsx"
 
+def _payload_cells(tables):
+    cells = 0
+    for table in tables:
+        if isinstance(table, dict):
+            cells += len(table.get("headers") or ()) * len(table.get("rows") or ())
+    return cells
 
-@app.route("/timetable/pdf", methods=["POST"])
-def timetable_pdf():
-    payload = request.get_json(silent=True) or {}
+
+def _export_request_payload():
+    """Return ``(payload, error response)`` for an export request body."""
+    if not request.is_json:
+        return {}, None
+    try:
+        with server_timing.phase("parse"):
+            payload = read_json_body(
+                request.stream,
+                request.headers.get("Content-Encoding"),
+                content_length=request.content_length,
+                max_bytes=int(EXPORT_BODY_MAX_MB * 1024 * 1024),
+                max_ratio=EXPORT_BODY_MAX_RATIO,
+            )
+    except RequestBodyError as exc:
+        return None, (jsonify({"error": str(exc)}), exc.status)
+    if payload is not None and not isinstance(payload, dict):
+        return None, (jsonify({"error": "Request body must be a JSON object"}), 400)
+    return payload or {}, None
+
+
+def _parse_export_payload(payload, kind):
     tables = payload.get("tables", [])
     meta = payload.get("meta", {})
-
     if not isinstance(tables, list) or not tables:
-        return jsonify({"error": "tables payload required"}), 400
+        return None, (jsonify({"error": "tables payload required"}), 400)
+    if not isinstance(meta, dict):
+        meta = {}
+    export = {"kind": kind, "tables": tables, "meta": meta}
+    if kind == "pdf":
+        from pdf_utils import resolve_pdf_renderer
+
+        renderer = request.args.get("renderer") or meta.get("renderer") or PDF_RENDERER
+        try:
+            export["renderer"] = resolve_pdf_renderer(str(renderer), tables)
+        except ValueError as exc:
+            return None, (jsonify({"error": str(exc)}), 400)
+    else:
+        from xlsx_utils import resolve_xlsx_writer
+
+        writer = request.args.get("writer") or XLSX_WRITER
+        try:
+            export["writer"] = resolve_xlsx_writer(str(writer), tables)
+        except ValueError as exc:
+            return None, (jsonify({"error": str(exc)}), 400)
+        export["stationCodes"] = payload.get("stationCodes", [])
+        export["tocCodes"] = payload.get("tocCodes", [])
+    return export, None
+
+
+def _export_file(export, progress=None):
+    """Return ``(file, size, cache status)`` for an export, rendering on a miss."""
+    if export["kind"] == "pdf":
+        cache_key = export_cache_key(
+            "pdf",
+            {
+                "tables": export["tables"],
+                "meta": export["meta"],
+                "renderer": export["renderer"],
+                "processes": PDF_RENDER_PROCESSES,
+            },
+        )
+    else:
+        # meta only names the download, so it is left out of the key.
+        cache_key = export_cache_key(
+            "xlsx",
+            {
+                "tables": export["tables"],
+                "stationCodes": export["stationCodes"],
+                "tocCodes": export["tocCodes"],
+                "writer": export["writer"],
+            },
+        )
+    cached = EXPORT_CACHE.open(cache_key)
+    if cached is not None:
+        f, size = cached
+        return f, size, "hit"
+
+    f = tempfile.SpooledTemporaryFile(max_size=int(EXPORT_SPOOL_MB * 1024 * 1024))
+    started = time.perf_counter()
+    timings = {}
+    try:
+        if export["kind"] == "pdf":
+            _render_pdf(
+                export["tables"], export["meta"], export["renderer"], progress, f, timings
+            )
+        else:
+            from xlsx_utils import build_timetable_xlsx
+
+            build_timetable_xlsx(
+                export["tables"],
+                station_codes=export["stationCodes"],
+                toc_codes=export["tocCodes"],
+                progress=progress,
+                output=f,
+                writer=export["writer"],
+                timings=timings,
+            )
+        duration = time.perf_counter() - started
+        server_timing.record_all(timings or {"render": duration})
+        size = f.tell()
+        labels = {"format": export["kind"]}
+        METRICS.observe("export_render_duration_seconds", duration, labels)
+        METRICS.observe("export_output_bytes", size, labels)
+        f.seek(0)
+        EXPORT_CACHE.store(cache_key, f, size)
+    except BaseException:
+        f.close()
+        raise
+    return f, size, "miss"
+
+
+def _export_file_info(export):
+    if export["kind"] == "pdf":
+        return _export_download_name(export["meta"], "pdf"), PDF_MIMETYPE
+    return _export_download_name(export["meta"], "xlsx"), XLSX_MIMETYPE
+
+
+def _sync_export(kind):
+    payload, error = _export_request_payload()
+    if error:
+        return error
+    export, error = _parse_export_payload(payload, kind)
+    if error:
+        return error
+    if EXPORT_SYNC_MAX_CELLS and _payload_cells(export["tables"]) > EXPORT_SYNC_MAX_CELLS:
+        return (
+            jsonify({"error": "Timetable too large to export directly, use /timetable/jobs"}),
+            413,
+        )
 
-    pdf_bytes = build_timetable_pdf(tables, meta=meta)
-    return send_file(
-        io.BytesIO(pdf_bytes),
-        mimetype="application/pdf",
+    f, size, cache_status = _export_file(export)
+    download_name, mimetype = _export_file_info(export)
+    # send_file streams the file in blocks and closes it once sent; the
+    # length is set explicitly because it cannot see a file object's size.
+    response = send_file(
+        f,
+        mimetype=mimetype,
         as_attachment=True,
-        download_name=_pdf_download_name(meta),
+        download_name=download_name,
+    )
+    response.content_length = size
+    response.headers["X-Export-Cache"] = cache_status
+    return response
+
+
+@app.route("/timetable/pdf", methods=["POST"])
+def timetable_pdf():
+    return _sync_export("pdf")
+
+
+def _render_pdf(tables, meta, renderer, progress=None, output=None, timings=None):
+    from pdf_utils import build_timetable_pdf, build_timetable_pdf_parallel
+
+    pool = _get_pdf_pool()
+    if pool is not None:
+        try:
+            return build_timetable_pdf_parallel(
+                tables,
+                meta=meta,
+                renderer=renderer,
+                executor=pool,
+                workers=PDF_RENDER_PROCESSES,
+                progress=progress,
+                output=output,
+                timings=timings,
+            )
+        except BrokenProcessPool:
+            app.logger.warning("PDF worker pool broke, rendering in-process")
+            _reset_pdf_pool(pool)
+    if output is not None:
+        output.seek(0)
+        output.truncate()
+    return build_timetable_pdf(
+        tables,
+        meta=meta,
+        renderer=renderer,
+        progress=progress,
+        output=output,
+        timings=timings,
     )
 
 
 @app.route("/timetable/xlsx", methods=["POST"])
 def timetable_xlsx():
-    payload = request.get_json(silent=True) or {}
-    tables = payload.get("tables", [])
-    meta = payload.get("meta", {})
-    station_codes = payload.get("stationCodes", [])
-    toc_codes = payload.get("tocCodes", [])
+    return _sync_export("xlsx")
+
 
+@app.route("/timetable/csv", methods=["POST"])
+def timetable_csv():
+    from csv_utils import CSV_FORMATS, ZIP_MIMETYPE, csv_files, iter_csv_export
+
+    payload, error = _export_request_payload()
+    if error:
+        return error
+    fmt = str(request.args.get("format") or payload.get("format") or "csv").strip().lower()
+    if fmt not in CSV_FORMATS:
+        return jsonify({"error": "format must be csv or tsv"}), 400
+    tables = payload.get("tables", [])
     if not isinstance(tables, list) or not tables:
         return jsonify({"error": "tables payload required"}), 400
 
-    xlsx_bytes = build_timetable_xlsx(
+    files = csv_files(
         tables,
-        station_codes=station_codes,
-        toc_codes=toc_codes,
+        station_codes=payload.get("stationCodes", []),
+        toc_codes=payload.get("tocCodes", []),
+        fmt=fmt,
     )
-    return send_file(
-        io.BytesIO(xlsx_bytes),
-        mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        as_attachment=True,
-        download_name=_xlsx_download_name(meta),
+    _, extension, mimetype = CSV_FORMATS[fmt]
+    if len(files) > 1:
+        extension, mimetype = "zip", ZIP_MIMETYPE
+    response = app.response_class(iter_csv_export(files, fmt), mimetype=mimetype)
+    response.headers.set(
+        "Content-Disposition",
+        "attachment",
+        filename=_export_download_name(payload.get("meta"), extension),
     )
+    return response
+
+
+EXPORT_FORMATS = ("pdf", "xlsx", "csv", "tsv")
+
+
+def _combined_exports(payload, kinds):
+    # Every format is built from the same tables, meta and code lists.
+    exports = []
+    for kind in kinds:
+        if kind in {"csv", "tsv"}:
+            tables = payload.get("tables")
+            if not isinstance(tables, list) or not tables:
+                return None, (jsonify({"error": "tables payload required"}), 400)
+            export = {
+                "kind": kind,
+                "tables": tables,
+                "stationCodes": payload.get("stationCodes", []),
+                "tocCodes": payload.get("tocCodes", []),
+            }
+        else:
+            export, error = _parse_export_payload(payload, kind)
+            if error:
+                return None, error
+            if EXPORT_SYNC_MAX_CELLS and _payload_cells(export["tables"]) > EXPORT_SYNC_MAX_CELLS:
+                return None, (jsonify({"error": "Timetable too large to export directly"}), 413)
+        exports.append(export)
+    return exports, None
+
+
+def _combined_archive(exports, rendered):
+    """Yield the combined zip as it is written, reading each rendered file."""
+    from csv_utils import CHUNK_BYTES, csv_files, csv_members, iter_zip
+
+    members = []
+    for export in exports:
+        kind = export["kind"]
+        if kind in rendered:
+            # PDFs and workbooks are compressed already, so they are stored.
+            chunks = iter(functools.partial(rendered[kind][0].read, CHUNK_BYTES), b"")
+            members.append((_export_file_info(export)[0], chunks, False))
+            continue
+        files = csv_files(
+            export["tables"],
+            station_codes=export["stationCodes"],
+            toc_codes=export["tocCodes"],
+            fmt=kind,
+        )
+        members.extend(csv_members(files, kind))
+    return iter_zip(members)
+
+
+@app.route("/timetable/export", methods=["POST"])
+def timetable_export():
+    """Several formats of one timetable from a single upload, as one zip."""
+    payload, error = _export_request_payload()
+    if error:
+        return error
+    formats = request.args.get("formats") or payload.get("formats") or []
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    kinds = []
+    for kind in formats if isinstance(formats, list) else []:
+        kind = str(kind).strip().lower()
+        if kind not in EXPORT_FORMATS:
+            return jsonify({"error": "formats must list pdf, xlsx, csv or tsv"}), 400
+        if kind not in kinds:
+            kinds.append(kind)
+    if not kinds:
+        return jsonify({"error": "formats required"}), 400
+    exports, error = _combined_exports(payload, kinds)
+    if error:
+        return error
+
+    # PDF and XLSX render side by side (each through the export cache); CSV
+    # is cheap enough to write straight into the zip afterwards.
+    renders = [export for export in exports if export["kind"] in {"pdf", "xlsx"}]
+    rendered = {}
+    failure = None
+    with ThreadPoolExecutor(max_workers=max(1, len(renders))) as executor:
+        futures = [(export, executor.submit(_export_file, export)) for export in renders]
+        for export, future in futures:
+            try:
+                rendered[export["kind"]] = future.result()
+            except Exception as exc:  # noqa: BLE001
+                failure = failure or exc
+
+    def close_rendered():
+        for f, _, _ in rendered.values():
+            f.close()
+
+    if failure is not None:
+        close_rendered()
+        raise failure
+    # The zip is written as it is sent, so no copy of it is ever held.
+    response = app.response_class(
+        _combined_archive(exports, rendered), mimetype="application/zip"
+    )
+    response.call_on_close(close_rendered)
+    response.headers.set(
+        "Content-Disposition",
+        "attachment",
+        filename=_export_download_name(payload.get("meta"), "zip"),
+    )
+    response.headers["X-Export-Cache"] = ", ".join(
+        f"{kind}={status}" for kind, (_, _, status) in rendered.items()
+    )
+    return response
+
+
+def _job_response(status):
+    job_id = status["jobId"]
+    body = {
+        key: status[key]
+        for key in (
+            "jobId",
+            "format",
+            "status",
+            "progress",
+            "queuedAt",
+            "startedAt",
+            "finishedAt",
+            "error",
+            "bytes",
+        )
+    }
+    body["statusUrl"] = f"/timetable/jobs/{job_id}"
+    body["resultUrl"] = f"/timetable/jobs/{job_id}/result"
+    return body
+
+
+@app.route("/timetable/jobs", methods=["POST"])
+def timetable_job_submit():
+    payload, error = _export_request_payload()
+    if error:
+        return error
+    kind = str(request.args.get("format") or payload.get("format") or "").strip().lower()
+    if kind not in {"pdf", "xlsx"}:
+        return jsonify({"error": "format must be pdf or xlsx"}), 400
+    export, error = _parse_export_payload(payload, kind)
+    if error:
+        return error
+
+    download_name, mimetype = _export_file_info(export)
+    try:
+        status = EXPORT_JOBS.submit(
+            kind,
+            lambda progress: _export_file(export, progress)[0],
+            _payload_cells(export["tables"]),
+            download_name,
+            mimetype,
+        )
+    except QueueFullError as exc:
+        return jsonify({"error": str(exc)}), 503
+    except OSError as exc:
+        app.logger.error("Could not queue export job: %s", exc)
+        return jsonify({"error": "Could not queue export job"}), 500
+    body = _job_response(status)
+    return jsonify(body), 202, {"Location": body["statusUrl"]}
+
+
+@app.route("/timetable/jobs/<job_id>")
+def timetable_job_status(job_id):
+    status = EXPORT_JOBS.get(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(_job_response(status))
+
+
+@app.route("/timetable/jobs/<job_id>/result")
+def timetable_job_result(job_id):
+    status = EXPORT_JOBS.get(job_id)
+    if status is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if status["status"] == "failed":
+        return jsonify({"error": status["error"] or "Export failed"}), 500
+    if status["status"] != "done":
+        return jsonify(_job_response(status)), 409
+    try:
+        return send_file(
+            EXPORT_JOBS.result_path(job_id),
+            mimetype=status["mimetype"],
+            as_attachment=True,
+            download_name=status["downloadName"],
+        )
+    except FileNotFoundError:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+
+@app.route("/timetable/cache-stats")
+def timetable_cache_stats():
+    return jsonify(EXPORT_CACHE.stats())
+
+
+@app.route("/metrics")
+def prometheus_metrics():
+    return METRICS.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+def _profile_admin_error():
+    if PROFILER.secret is None:
+        return jsonify({"error": "Profiling is not configured"}), 404
+    if not PROFILER.authorized(request.headers.get(PROFILE_HEADER)):
+        return jsonify({"error": "Missing or wrong profile token"}), 403
+    return None
+
+
+@app.route("/admin/profiles")
+def profile_list():
+    error = _profile_admin_error()
+    if error:
+        return error
+    try:
+        limit = max(1, int(request.args.get("limit") or 50))
+    except ValueError:
+        return jsonify({"error": "limit must be a positive integer"}), 400
+    profiles = [
+        {
+            "name": name,
+            "bytes": size,
+            "modified": datetime.fromtimestamp(modified, timezone.utc).isoformat(),
+            "url": f"/admin/profiles/{name}",
+        }
+        for name, size, modified in PROFILER.profiles()[:limit]
+    ]
+    return jsonify({"sampleRate": PROFILER.sample_rate, "profiles": profiles})
+
+
+@app.route("/admin/profiles/<name>")
+def profile_download(name):
+    error = _profile_admin_error()
+    if error:
+        return error
+    if not profiling.PROFILE_NAME_RE.match(name):
+        return jsonify({"error": "Unknown profile"}), 404
+    return send_from_directory(
+        PROFILER.directory, name, mimetype="text/plain", as_attachment=True
+    )
+
+
+@app.route("/admin/profiles/settings", methods=["PUT"])
+def profile_settings():
+    error = _profile_admin_error()
+    if error:
+        return error
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict) or "sampleRate" not in body:
+        return jsonify({"error": "sampleRate required"}), 400
+    rate = body["sampleRate"]
+    # null goes back to PROFILE_SAMPLE_RATE.
+    if rate is not None and (
+        isinstance(rate, bool) or not isinstance(rate, (int, float)) or not 0 <= rate <= 1
+    ):
+        return jsonify({"error": "sampleRate must be between 0 and 1, or null"}), 400
+    PROFILER.set_sample_rate(None if rate is None else float(rate))
+    return jsonify({"sampleRate": PROFILER.sample_rate})
+
+
+STARTUP_PHASES.append(("total", time.perf_counter() - _STARTUP_STARTED))
+if DATA.loaded_from_snapshot:
+    _startup_mode = "fast, data snapshot"
+else:
+    _startup_mode = "fast" if FAST_START else "standard"
+print(
+    f"Startup ({_startup_mode}): "
+    + ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in STARTUP_PHASES)
+)
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8080))
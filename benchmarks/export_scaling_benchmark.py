@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""How the PDF, XLSX and CSV exports scale, checked against a baseline.
+
+Runs every export engine over a matrix of synthetic payloads that vary
+station count, service count (and so the number of PDF column chunks),
+facility icon density, highlight density and table count. Each engine and
+configuration records wall time, CPU time, traced peak memory (from a
+separate traced build), output bytes and PDF page count. "pdf-parallel"
+renders on a process pool of ``--workers``; its CPU time and peak memory
+only cover the parent process.
+
+Results are compared with ``export_scaling_baseline.json`` beside this
+script. Any metric past its tolerance is reported and the run exits with
+status 1. ``--write-baseline`` records a new baseline. Raw timings depend on
+the machine, so each configuration also times a fixed pure-Python
+calibration loop (before and after its runs), and wall and CPU time are
+recorded and compared as multiples of it. Time growth smaller than ``TIME_FLOOR`` seconds is ignored
+as noise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import re
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import csv_utils  # noqa: E402
+import pdf_utils  # noqa: E402
+import xlsx_utils  # noqa: E402
+from synthetic_timetable import make_pdf_tables, make_xlsx_tables  # noqa: E402
+
+
+BASELINE_PATH = Path(__file__).with_name("export_scaling_baseline.json")
+PAGE_RE = re.compile(rb"/Type /Page\b(?!s)")
+
+CONFIGS = {
+    "base": {"stations": 30, "services": 60},
+    "stations-120": {"stations": 120, "services": 60},
+    "stations-200": {"stations": 200, "services": 60},
+    "services-240": {"stations": 30, "services": 240},
+    "services-480": {"stations": 30, "services": 480},
+    "facilities-all": {"stations": 30, "services": 120, "facility_density": 2.0},
+    "facilities-none": {"stations": 30, "services": 120, "facility_density": 0.0},
+    "highlights-half": {"stations": 60, "services": 120, "highlight_density": 0.5},
+    "tables-4": {"stations": 40, "services": 80, "tables": 4},
+}
+ENGINES = (
+    "pdf-platypus",
+    "pdf-canvas",
+    "pdf-parallel",
+    "xlsx-standard",
+    "xlsx-streaming",
+    "csv",
+)
+# Allowed growth over the baseline before a metric counts as a regression.
+# Any change in page count is reported.
+TOLERANCES = {"wall_rel": 0.5, "cpu_rel": 0.5, "peak": 0.2, "bytes": 0.05}
+TIME_METRICS = ("wall_rel", "cpu_rel")
+TIME_FLOOR = 0.05
+# What the baseline records; raw wall and cpu times stay out of it.
+BASELINE_METRICS = ("cells", "wall_rel", "cpu_rel", "peak", "bytes", "pages", "chunks")
+
+
+def _calibration_loop():
+    # Roughly what an export does per cell: format, join, hash and sort strings.
+    rows = [[f"{hour:02d}:{minute:02d}" for minute in range(60)] for hour in range(24)]
+    for _ in range(40):
+        text = json.dumps(rows)
+        cells = sorted(cell for row in json.loads(text) for cell in row)
+        lengths = {cell: len(cell) for cell in cells}
+        assert len(",".join(cells).split(",")) >= len(lengths)
+
+
+def calibrate(repeat=5):
+    """Fastest wall time of the calibration loop, in seconds."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        _calibration_loop()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _noop():
+    return None
+
+
+def _payload(engine, config):
+    options = dict(config)
+    stations = options.pop("stations")
+    services = options.pop("services")
+    if engine.startswith("pdf"):
+        return make_pdf_tables(stations, services, **options), None, None
+    options.pop("highlight_density", None)
+    return make_xlsx_tables(stations, services, **options)
+
+
+def _export(engine, tables, station_codes, toc_codes, pool=None, workers=1):
+    kind, _, variant = engine.partition("-")
+    if variant == "parallel":
+        return pdf_utils.build_timetable_pdf_parallel(
+            tables, renderer="canvas", executor=pool, workers=workers
+        )
+    if kind == "pdf":
+        return pdf_utils.build_timetable_pdf(tables, renderer=variant)
+    if kind == "xlsx":
+        return xlsx_utils.build_timetable_xlsx(
+            tables, station_codes, toc_codes, writer=variant
+        )
+    files = csv_utils.csv_files(tables, station_codes, toc_codes)
+    return b"".join(csv_utils.iter_csv_export(files))
+
+
+def measure(engine, config, repeat=1, pool=None, workers=1):
+    tables, station_codes, toc_codes = _payload(engine, config)
+    calibration = calibrate()
+    wall = cpu = None
+    for _ in range(repeat):
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        data = _export(engine, tables, station_codes, toc_codes, pool, workers)
+        run_wall = time.perf_counter() - wall_start
+        run_cpu = time.process_time() - cpu_start
+        wall = run_wall if wall is None else min(wall, run_wall)
+        cpu = run_cpu if cpu is None else min(cpu, run_cpu)
+    # Calibrated either side of the timed runs, in case the machine's speed drifts.
+    calibration = min(calibration, calibrate())
+    # Traced separately: tracemalloc slows the export several times over.
+    tracemalloc.start()
+    _export(engine, tables, station_codes, toc_codes, pool, workers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        "cells": sum(len(t["headers"]) * len(t["rows"]) for t in tables),
+        "wall": round(wall, 4),
+        "cpu": round(cpu, 4),
+        "calibration": round(calibration, 4),
+        "wall_rel": round(wall / calibration, 2),
+        "cpu_rel": round(cpu / calibration, 2),
+        "peak": peak,
+        "bytes": len(data),
+        "pages": None,
+        "chunks": None,
+    }
+    if engine.startswith("pdf"):
+        result["pages"] = len(PAGE_RE.findall(data))
+        result["chunks"] = sum(len(pdf_utils._table_chunks(t)[1]) for t in tables)
+    return result
+
+
+def regressions(results, baseline, tolerances):
+    found = []
+    for name, engines in results.items():
+        for engine, result in engines.items():
+            expected = baseline.get(name, {}).get(engine)
+            if expected is None:
+                continue
+            for metric, tolerance in tolerances.items():
+                old, new = expected.get(metric), result.get(metric)
+                if old is None or new <= old * (1 + tolerance):
+                    continue
+                if metric in TIME_METRICS and (new - old) * result["calibration"] < TIME_FLOOR:
+                    continue
+                found.append(f"{name} {engine}: {metric} {old} -> {new}")
+            if expected.get("pages") != result["pages"]:
+                found.append(f"{name} {engine}: pages {expected.get('pages')} -> {result['pages']}")
+    return found
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", action="append", choices=sorted(CONFIGS))
+    parser.add_argument("--engine", action="append", choices=ENGINES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--workers", type=int, default=max(2, os.cpu_count() or 1))
+    parser.add_argument("--tolerance", type=float, help="override the peak memory tolerance")
+    parser.add_argument("--time-tolerance", type=float, help="override the time tolerance")
+    parser.add_argument("--json", type=Path, help="also write the results here")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    names = args.config or list(CONFIGS)
+    engines = args.engine or list(ENGINES)
+
+    pool = None
+    if "pdf-parallel" in engines:
+        pool = ProcessPoolExecutor(max_workers=args.workers)
+        # Start the workers up front so the first render doesn't pay for it.
+        for future in [pool.submit(_noop) for _ in range(args.workers)]:
+            future.result()
+
+    results = {}
+    print(f"{'config':<16} {'engine':<15} {'cells':>8} {'wall ms':>9} {'cpu ms':>9} "
+          f"{'wall x':>7} {'cpu x':>7} {'peak MiB':>9} {'bytes':>10} {'pages':>5} "
+          f"{'chunks':>6}")
+    try:
+        for name in names:
+            results[name] = {}
+            for engine in engines:
+                result = measure(engine, CONFIGS[name], args.repeat, pool, args.workers)
+                results[name][engine] = result
+                print(
+                    f"{name:<16} {engine:<15} {result['cells']:>8} "
+                    f"{result['wall'] * 1000:>9.1f} {result['cpu'] * 1000:>9.1f} "
+                    f"{result['wall_rel']:>7.1f} {result['cpu_rel']:>7.1f} "
+                    f"{result['peak'] / 1024 / 1024:>9.1f} {result['bytes']:>10} "
+                    f"{result['pages'] or '':>5} {result['chunks'] or '':>6}"
+                )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2) + "\n")
+    if args.write_baseline:
+        baseline = {}
+        if args.baseline.exists():
+            baseline = json.loads(args.baseline.read_text())
+        for name, engine_results in results.items():
+            recorded = baseline.setdefault("results", {}).setdefault(name, {})
+            for engine, result in engine_results.items():
+                recorded[engine] = {metric: result[metric] for metric in BASELINE_METRICS}
+        # Traced peaks shift between Python releases.
+        baseline["python"] = platform.python_version()
+        baseline["workers"] = args.workers
+        args.baseline.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not args.baseline.exists():
+        print(f"no baseline at {args.baseline}; run with --write-baseline", file=sys.stderr)
+        return 0
+
+    tolerances = dict(TOLERANCES)
+    if args.tolerance is not None:
+        tolerances["peak"] = args.tolerance
+    if args.time_tolerance is not None:
+        tolerances.update(dict.fromkeys(TIME_METRICS, args.time_tolerance))
+    found = regressions(results, json.loads(args.baseline.read_text())["results"], tolerances)
+    if found:
+        print("regressions against the baseline:", file=sys.stderr)
+        print("\n".join(found), file=sys.stderr)
+        return 1
+    print("no regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Column sizing cost for the PDF export.
+
+Times ``pdf_utils._calc_col_widths`` (single pass, memoised string widths)
+against the previous column-by-column measurement on a synthetic table,
+and checks both produce the same widths.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from reportlab.pdfbase import pdfmetrics  # noqa: E402
+
+import pdf_utils  # noqa: E402
+from synthetic_timetable import make_pdf_table  # noqa: E402
+
+
+def column_by_column_widths(headers, rows, font_name, font_size, padding=6):
+    widths = []
+    for col_idx in range(len(headers)):
+        entries = [headers[col_idx]]
+        for row in rows:
+            if col_idx < len(row):
+                entries.append(row[col_idx])
+        max_width = 0
+        for val in entries:
+            if hasattr(val, "width"):
+                max_width = max(max_width, val.width)
+            else:
+                max_width = max(
+                    max_width,
+                    pdfmetrics.stringWidth(pdf_utils._cell_text(val), font_name, font_size),
+                )
+        widths.append(max_width + padding)
+    return widths
+
+
+def _best_of(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    table = make_pdf_table(args.stations, args.services)
+    headers, rows = table["headers"], table["rows"]
+    cells = len(rows) * len(headers)
+
+    expected = column_by_column_widths(headers, rows, "Helvetica", 8)
+    pdf_utils._string_width.cache_clear()
+    start = time.perf_counter()
+    actual = pdf_utils._calc_col_widths(headers, rows, "Helvetica", 8)
+    cold = time.perf_counter() - start
+    if actual != expected:
+        print("Column widths differ from the column-by-column reference", file=sys.stderr)
+        return 1
+
+    baseline = _best_of(
+        lambda: column_by_column_widths(headers, rows, "Helvetica", 8), args.repeat
+    )
+    warm = _best_of(
+        lambda: pdf_utils._calc_col_widths(headers, rows, "Helvetica", 8), args.repeat
+    )
+    info = pdf_utils._string_width.cache_info()
+    print(f"{args.stations} stations x {args.services} services ({cells} cells)")
+    print(f"column by column : {baseline * 1000:8.1f} ms")
+    print(f"memoised, cold   : {cold * 1000:8.1f} ms")
+    print(f"memoised, warm   : {warm * 1000:8.1f} ms  ({baseline / warm:.1f}x faster)")
+    print(f"distinct strings : {info.currsize} (hits {info.hits}, misses {info.misses})")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
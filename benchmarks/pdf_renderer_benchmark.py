@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""PDF export time for the platypus and canvas renderers.
+
+Builds the same synthetic tables with both ``build_timetable_pdf``
+renderers and reports wall time, output size and page count. The two
+renderers must paginate identically.
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+import pdf_utils  # noqa: E402
+from synthetic_timetable import make_pdf_tables  # noqa: E402
+
+
+PAGE_RE = re.compile(rb"/Type /Page\b(?!s)")
+
+
+def _render(tables, renderer, repeat):
+    best = None
+    pdf_bytes = b""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        pdf_bytes = pdf_utils.build_timetable_pdf(tables, renderer=renderer)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, pdf_bytes
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=150)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--tables", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=1)
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    tables = make_pdf_tables(args.stations, args.services, tables=args.tables)
+    cells = sum(len(t["headers"]) * len(t["rows"]) for t in tables)
+    print(f"{args.tables} x {args.stations} stations x {args.services} services ({cells} cells)")
+
+    results = {}
+    for renderer in ("platypus", "canvas"):
+        elapsed, pdf_bytes = _render(tables, renderer, args.repeat)
+        pages = len(PAGE_RE.findall(pdf_bytes))
+        results[renderer] = (elapsed, pages)
+        print(f"{renderer:<9}: {elapsed * 1000:9.1f} ms  {len(pdf_bytes):>9} bytes  {pages} pages")
+
+    if results["platypus"][1] != results["canvas"][1]:
+        print("Renderers paginated differently", file=sys.stderr)
+        return 1
+    speedup = results["platypus"][0] / results["canvas"][0]
+    print(f"canvas is {speedup:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""Per-query latency of the station autocomplete.
+
+Compares the precomputed ``StationSearchIndex`` with the linear scan that
+``/api/stations`` used previously, and checks both return identical results
+when typo-tolerant matching is switched off.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from station_index import (  # noqa: E402
+    StationSearchIndex,
+    build_station_entries,
+    norm_station_query,
+)
+
+
+DEFAULT_QUERIES = [
+    "a", "ab", "lo", "lon", "london", "london e", "kgx", "eus", "man",
+    "manchester pic", "st", "st p", "cross", "road", "ed", "edinb", "birm",
+    "new st", "x", "zz", "wood a", "peter", "cambridge", "bfr", "gla", "port",
+    "peterbrough", "edinbrugh", "manchestr picadilly", "lodnon kin",
+]
+
+
+def linear_search(entries, qn, limit=20):
+    def station_match_score(st):
+        name_n = st["_name_n"]
+        crs_n = st["_crs_n"]
+        text_n = st["_n"]
+
+        if crs_n == qn:
+            return 0
+        if name_n == qn:
+            return 1
+        if name_n.startswith(qn):
+            return 2
+        if any(word.startswith(qn) for word in name_n.split()):
+            return 3
+        if f" {qn}" in name_n:
+            return 4
+        if qn in name_n:
+            return 5
+        if crs_n.startswith(qn):
+            return 6
+        if qn in crs_n:
+            return 7
+        if qn in text_n:
+            return 8
+        return None
+
+    matches = []
+    for st in entries:
+        score = station_match_score(st)
+        if score is None:
+            continue
+        matches.append((score, len(st["stationName"]), st["stationName"], st))
+    matches.sort(key=lambda item: (item[0], item[1], item[2]))
+    return [st for _, _, _, st in matches[:limit]]
+
+
+def _time_per_query(func, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for qn in queries:
+            func(qn)
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(queries))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=Path, default=REPO_ROOT / "data" / "stations.json")
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("queries", nargs="*")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    stations = json.loads(args.stations.read_text(encoding="utf-8"))
+    entries = build_station_entries(stations)
+
+    start = time.perf_counter()
+    index = StationSearchIndex(entries)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Indexed {len(index)} stations in {build_ms:.1f} ms")
+
+    queries = [norm_station_query(q) for q in (args.queries or DEFAULT_QUERIES)]
+    queries = [q for q in queries if q]
+
+    mismatches = [
+        qn
+        for qn in queries
+        if index.search(qn, fuzzy=False) != linear_search(entries, qn)
+    ]
+    if mismatches:
+        print(f"Result mismatch for: {', '.join(mismatches)}", file=sys.stderr)
+        return 1
+
+    def run_linear(qn):
+        return linear_search(entries, qn)
+
+    def run_exact(qn):
+        return index.search(qn, fuzzy=False)
+
+    runners = (run_linear, run_exact, index.search)
+    print(f"{'query':<22}{'linear us':>12}{'index us':>12}{'fuzzy us':>12}")
+    for qn in queries:
+        timings = [_time_per_query(func, [qn], args.repeat) for func in runners]
+        print(f"{qn:<22}" + "".join(f"{t * 1e6:>12.1f}" for t in timings))
+    linear, indexed, fuzzy = (
+        _time_per_query(func, queries, args.repeat) for func in runners
+    )
+    print(
+        f"{'mean':<22}{linear * 1e6:>12.1f}{indexed * 1e6:>12.1f}{fuzzy * 1e6:>12.1f}"
+        f"   ({linear / fuzzy:.1f}x faster)"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
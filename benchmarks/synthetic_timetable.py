@@ -0,0 +1,179 @@
+"""Synthetic ``tables`` payloads shaped like the ones docs/app.js posts.
+
+``make_pdf_tables`` follows ``buildPdfTableData`` (facilities row, "Comes
+from"/"Continues to" rows, per-cell format dicts). ``make_xlsx_tables``
+follows ``buildSpreadsheetTableData`` (headcode row with links, two label
+columns, arr/dep rows of plain strings) and also returns the station and
+TOC code lists.
+"""
+
+from __future__ import annotations
+
+import random
+
+
+FACILITY_TOKENS = ["FC", "SL", "BUS", "WALK", "LU", "TRAM", "DLR"]
+HIGHLIGHT_COLORS = ["#fce3b0", "#e6d9ff", "#f7c9c9"]
+OPERATORS = ["GR", "XC", "LM", "TL", "SR", "VT", "GW", "SE"]
+STATION_CODES = ["EDB", "KGX", "EUS", "PBO", "YRK", "NCL", "BHM", "MAN", "GLC", "CBG"]
+
+
+def _station_code(idx: int) -> str:
+    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    return letters[idx // 676 % 26] + letters[idx // 26 % 26] + letters[idx % 26]
+
+
+def _time_cell(rnd: random.Random, minutes: int, highlight_density: float) -> dict:
+    cell = {"text": f"{minutes // 60 % 24:02d}:{minutes % 60:02d}"}
+    if rnd.random() < 0.3:
+        cell["bold"] = True
+    elif rnd.random() < 0.15:
+        cell["italic"] = True
+    if rnd.random() < 0.03:
+        cell["strike"] = True
+    if rnd.random() < 0.1:
+        cell["color"] = rnd.choice(["#2c6fbe", "#e53935", "muted"])
+    if rnd.random() < 0.02:
+        cell["noReport"] = True
+    if rnd.random() < highlight_density:
+        cell["bgColor"] = rnd.choice(HIGHLIGHT_COLORS)
+    if rnd.random() < 0.25:
+        cell["platformText"] = f"[{rnd.randint(1, 15)}]"
+        if rnd.random() < 0.5:
+            cell["platformConfirmed"] = True
+        elif rnd.random() < 0.1:
+            cell["platformChanged"] = True
+    return cell
+
+
+def make_pdf_table(
+    stations: int = 20,
+    services: int = 40,
+    *,
+    facility_density: float = 0.3,
+    highlight_density: float = 0.03,
+    call_density: float = 0.85,
+    seed: int = 0,
+    title: str = "Synthetic corridor",
+) -> dict:
+    rnd = random.Random(seed)
+    headers = ["Operator"] + [rnd.choice(OPERATORS) for _ in range(services)]
+    facilities = ["Facilities"]
+    for _ in range(services):
+        tokens = [token for token in FACILITY_TOKENS if rnd.random() < facility_density / 2]
+        facilities.append(" ".join(tokens))
+
+    start_minutes = [360 + svc * 1440 // max(1, services) // 2 for svc in range(services)]
+    rows = [facilities]
+    rows.append(
+        ["Comes from"]
+        + [
+            {"text": rnd.choice(STATION_CODES), "title": "Origin"} if rnd.random() < 0.5 else ""
+            for _ in range(services)
+        ]
+    )
+    for station_idx in range(stations):
+        code = _station_code(station_idx)
+        arrivals = [f"{code} (arr)"]
+        departures = ["(dep)"]
+        for svc in range(services):
+            minutes = start_minutes[svc] + station_idx * 4
+            if rnd.random() < call_density:
+                arrivals.append(_time_cell(rnd, minutes, highlight_density))
+                departures.append(_time_cell(rnd, minutes + 1, highlight_density))
+            else:
+                arrivals.append("|")
+                departures.append("|")
+        rows.append(arrivals)
+        rows.append(departures)
+    rows.append(
+        ["Continues to"]
+        + [
+            {"text": rnd.choice(STATION_CODES), "title": "Destination"} if rnd.random() < 0.5 else ""
+            for _ in range(services)
+        ]
+    )
+    service_times = [f"{m // 60 % 24:02d}:{m % 60:02d}" for m in start_minutes]
+    return {
+        "title": title,
+        "dateLabel": "Monday 11 May 2026",
+        "headers": headers,
+        "rows": rows,
+        "serviceTimes": service_times,
+    }
+
+
+def make_pdf_tables(stations: int = 20, services: int = 40, *, tables: int = 1, seed: int = 0, **kwargs) -> list:
+    return [
+        make_pdf_table(stations, services, seed=seed + idx, title=f"Synthetic corridor {idx + 1}", **kwargs)
+        for idx in range(tables)
+    ]
+
+
+def make_xlsx_table(
+    stations: int = 20,
+    services: int = 40,
+    *,
+    facility_density: float = 0.3,
+    call_density: float = 0.85,
+    seed: int = 0,
+    title: str = "Synthetic corridor",
+) -> dict:
+    rnd = random.Random(seed)
+    operators = [rnd.choice(OPERATORS) for _ in range(services)]
+    headcodes = ["Headcode", ""] + [
+        {
+            "text": f"{rnd.randint(1, 9)}{rnd.choice('ABCDEFGHJKLMNPRSTUVWX')}{rnd.randint(0, 99):02d}",
+            "hyperlink": f"https://www.realtimetrains.co.uk/service/gb-nr:S{seed:03d}{svc:05d}/2026-05-11",
+        }
+        for svc in range(services)
+    ]
+    headers = ["Operator", ""] + operators
+    facilities = ["Facilities", ""]
+    for _ in range(services):
+        tokens = [token for token in FACILITY_TOKENS if rnd.random() < facility_density / 2]
+        facilities.append(" ".join(tokens))
+
+    start_minutes = [360 + svc * 1440 // max(1, services) // 2 for svc in range(services)]
+    rows = [facilities]
+    rows.append(
+        ["Comes from", ""]
+        + [rnd.choice(STATION_CODES) if rnd.random() < 0.5 else "" for _ in range(services)]
+    )
+    for station_idx in range(stations):
+        arrivals = [_station_code(station_idx), "arr"]
+        departures = ["", "dep"]
+        for svc in range(services):
+            minutes = start_minutes[svc] + station_idx * 4
+            if rnd.random() < call_density:
+                arrivals.append(f"{minutes // 60 % 24:02d}:{minutes % 60:02d}")
+                departures.append(f"{(minutes + 1) // 60 % 24:02d}:{(minutes + 1) % 60:02d}")
+            else:
+                arrivals.append("|")
+                departures.append("|")
+        rows.append(arrivals)
+        rows.append(departures)
+    rows.append(
+        ["Continues to", ""]
+        + [rnd.choice(STATION_CODES) if rnd.random() < 0.5 else "" for _ in range(services)]
+    )
+    return {
+        "title": title,
+        "sheetName": title[:31],
+        "dateLabel": "Monday 11 May 2026",
+        "headcodes": headcodes,
+        "headers": headers,
+        "rows": rows,
+    }
+
+
+def make_xlsx_tables(stations: int = 20, services: int = 40, *, tables: int = 1, seed: int = 0, **kwargs):
+    tables_out = [
+        make_xlsx_table(stations, services, seed=seed + idx, title=f"Synthetic corridor {idx + 1}", **kwargs)
+        for idx in range(tables)
+    ]
+    station_codes = [
+        {"code": _station_code(idx), "name": f"Station {idx}"} for idx in range(stations)
+    ]
+    toc_codes = [{"code": code, "name": f"Operator {code}"} for code in OPERATORS]
+    return tables_out, station_codes, toc_codes
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""XLSX export time and memory for the standard and streaming writers.
+
+Builds the same synthetic workbook with both ``build_timetable_xlsx``
+writers, reports wall time, traced peak memory (from a second, traced
+build) and output size, and checks that every cell reads back with the
+same value, hyperlink and formatting.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+
+from openpyxl import load_workbook  # noqa: E402
+
+import xlsx_utils  # noqa: E402
+from synthetic_timetable import make_xlsx_tables  # noqa: E402
+
+
+def _side(side):
+    if side is None or side.style is None:
+        return None
+    return side.style, side.color.rgb if side.color is not None else None
+
+
+def _cell_format(cell):
+    font = cell.font
+    return (
+        cell.value,
+        cell.hyperlink.target if cell.hyperlink else None,
+        font.b,
+        font.i,
+        font.sz,
+        font.u,
+        font.color.rgb if font.color is not None and font.color.type == "rgb" else None,
+        cell.fill.fill_type,
+        cell.fill.fgColor.rgb,
+        _side(cell.border.left),
+        _side(cell.border.right),
+        _side(cell.border.top),
+        _side(cell.border.bottom),
+        cell.alignment.horizontal,
+        cell.alignment.vertical,
+        cell.alignment.wrap_text,
+    )
+
+
+def differences(expected, actual):
+    wb_a = load_workbook(io.BytesIO(expected))
+    wb_b = load_workbook(io.BytesIO(actual))
+    if wb_a.sheetnames != wb_b.sheetnames:
+        return [f"sheets {wb_a.sheetnames} != {wb_b.sheetnames}"]
+    found = []
+    for name in wb_a.sheetnames:
+        ws_a, ws_b = wb_a[name], wb_b[name]
+        if sorted(map(str, ws_a.merged_cells.ranges)) != sorted(map(str, ws_b.merged_cells.ranges)):
+            found.append(f"{name}: merged ranges differ")
+        if ws_a.freeze_panes != ws_b.freeze_panes:
+            found.append(f"{name}: freeze panes {ws_a.freeze_panes} != {ws_b.freeze_panes}")
+        for letter, dim in ws_a.column_dimensions.items():
+            if ws_b.column_dimensions[letter].width != dim.width:
+                found.append(f"{name}: column {letter} width differs")
+        for row_a, row_b in zip(ws_a.iter_rows(), ws_b.iter_rows()):
+            for cell_a, cell_b in zip(row_a, row_b):
+                if _cell_format(cell_a) != _cell_format(cell_b):
+                    found.append(f"{name}!{cell_a.coordinate} differs")
+    return found
+
+
+def _build(writer, tables, station_codes, toc_codes):
+    start = time.perf_counter()
+    data = xlsx_utils.build_timetable_xlsx(tables, station_codes, toc_codes, writer=writer)
+    elapsed = time.perf_counter() - start
+    # Traced separately: tracemalloc slows the build several times over.
+    tracemalloc.start()
+    xlsx_utils.build_timetable_xlsx(tables, station_codes, toc_codes, writer=writer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, data
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--stations", type=int, default=100)
+    parser.add_argument("--services", type=int, default=200)
+    parser.add_argument("--tables", type=int, default=2)
+    parser.add_argument("--skip-check", action="store_true")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = _parse_args()
+    tables, station_codes, toc_codes = make_xlsx_tables(
+        args.stations, args.services, tables=args.tables
+    )
+    cells = sum(len(t["headers"]) * (len(t["rows"]) + 2) for t in tables)
+    print(f"{args.tables} x {args.stations} stations x {args.services} services ({cells} cells)")
+
+    results = {}
+    for writer in ("standard", "streaming"):
+        elapsed, peak, data = _build(writer, tables, station_codes, toc_codes)
+        results[writer] = (elapsed, data)
+        print(
+            f"{writer:<9}: {elapsed * 1000:9.1f} ms  peak {peak / 1024 / 1024:7.1f} MiB  "
+            f"{len(data):>9} bytes"
+        )
+
+    if not args.skip_check:
+        found = differences(results["standard"][1], results["streaming"][1])
+        if found:
+            print("\n".join(found[:20]), file=sys.stderr)
+            return 1
+    print(f"streaming is {results['standard'][0] / results['streaming'][0]:.1f}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
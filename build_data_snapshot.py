@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import argparse
+import time
+from pathlib import Path
+
+from data_registry import DataRegistry
+
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+DEFAULT_OUTPUT_FILE = DATA_DIR / "snapshot.pickle"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Prebuild the station, ATOC and connection data with its search "
+            "indexes so app.py can skip JSON parsing and indexing at startup."
+        )
+    )
+    parser.add_argument(
+        "--data-dir",
+        type=Path,
+        default=DATA_DIR,
+        help=f"Directory holding the JSON data files, default: {DATA_DIR}",
+    )
+    parser.add_argument(
+        "output_file",
+        nargs="?",
+        type=Path,
+        default=DEFAULT_OUTPUT_FILE,
+        help=f"Output snapshot path, default: {DEFAULT_OUTPUT_FILE}",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    started = time.perf_counter()
+    registry = DataRegistry(
+        {
+            "stations": args.data_dir / "stations.json",
+            "atoc_codes": args.data_dir / "atoc_codes.json",
+            "connections": args.data_dir / "connections.json",
+        },
+        check_interval=0,
+    )
+    args.output_file.parent.mkdir(parents=True, exist_ok=True)
+    registry.write_snapshot(args.output_file)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    print(f"Wrote {args.output_file} (data version {registry.version}, {elapsed_ms:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""CSV and TSV exports of the XLSX ``tables`` payload.
+
+Each table becomes the grid of cell texts its sheet would hold, with no
+formatting. Rows are written 64 KiB at a time as the response is sent, so
+no workbook (or whole file) is ever held in memory. Several files go out as
+one streamed zip.
+"""
+
+import csv
+import io
+import time
+import zipfile
+
+from export_tables import cell_text, lookup_rows, sheet_names
+
+
+CSV_FORMATS = {
+    "csv": (",", "csv", "text/csv"),
+    "tsv": ("\t", "tsv", "text/tab-separated-values"),
+}
+ZIP_MIMETYPE = "application/zip"
+CHUNK_BYTES = 64 * 1024
+# Deflate dominates a zip export's time; level 1 is about three times faster
+# than the default and still shrinks timetable CSVs to a third.
+ZIP_COMPRESSLEVEL = 1
+
+
+class _ZipSink:
+    # The write-only file a streamed zip goes into, drained after each write.
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _table_rows(table):
+    if table.get("title"):
+        yield [str(table.get("title"))]
+    if table.get("dateLabel"):
+        yield [str(table.get("dateLabel"))]
+    if table.get("title") or table.get("dateLabel"):
+        yield []
+    for key in ("headcodes", "headers"):
+        if table.get(key):
+            yield [cell_text(cell) for cell in table[key]]
+    for row in table.get("rows") or []:
+        yield [cell if cell.__class__ is str else cell_text(cell) for cell in row]
+
+
+def _iter_csv(rows, delimiter):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\r\n")
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() < CHUNK_BYTES:
+            continue
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def csv_files(tables, station_codes=None, toc_codes=None, fmt="csv"):
+    """``(name, rows)`` for each file of a CSV export, timetables first.
+
+    The lookup tables only get a file of their own when they have entries.
+    """
+    _, extension, _ = CSV_FORMATS[fmt]
+    files = []
+    for _, table, name in sheet_names(tables):
+        files.append((f"{name}.{extension}", _table_rows(table)))
+    for name, header, entries in (
+        ("Station codes", ["Code", "Station"], station_codes),
+        ("TOC codes", ["Code", "Operator"], toc_codes),
+    ):
+        rows = [header, *lookup_rows(entries)]
+        if len(rows) > 1:
+            files.append((f"{name}.{extension}", rows))
+    return files
+
+
+def csv_members(files, fmt="csv"):
+    """``(name, chunks, compress)`` zip members for iter_zip, one per file."""
+    delimiter = CSV_FORMATS[fmt][0]
+    return [(name, _iter_csv(rows, delimiter), True) for name, rows in files]
+
+
+def iter_zip(members):
+    """Yield the bytes of a zip of ``(name, chunks, compress)`` as it is written.
+
+    Members that are compressed already (PDFs, workbooks) should be stored,
+    with ``compress`` false.
+    """
+    sink = _ZipSink()
+    # The sink cannot seek, so zipfile writes each member's sizes after its
+    # data instead of going back to patch the header.
+    with zipfile.ZipFile(
+        sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+    ) as zf:
+        for name, chunks, compress in members:
+            if not compress:
+                name = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+            with zf.open(name, "w") as member:
+                for chunk in chunks:
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    data = sink.drain()
+    if data:
+        yield data
+
+
+def iter_csv_export(files, fmt="csv"):
+    """Yield the bytes of one CSV file, or of a zip when there are several."""
+    if len(files) == 1:
+        yield from _iter_csv(files[0][1], CSV_FORMATS[fmt][0])
+        return
+    yield from iter_zip(csv_members(files, fmt))
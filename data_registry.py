@@ -0,0 +1,237 @@
+"""Hot-reloadable station, ATOC and connection data.
+
+The data files are re-checked at most once per interval from the request
+path. When one changes, the derived indexes are rebuilt on a background
+thread and swapped in as a single snapshot, so a request that has taken a
+snapshot keeps a consistent view until it finishes.
+
+For fast cold starts a fully built snapshot can be written at image build
+time (see ``build_data_snapshot.py``). It is only used while the content
+hashes it was built from still match the data files.
+"""
+
+import gc
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from station_index import StationGeoIndex, StationSearchIndex, build_station_entries
+
+
+DATA_FILES = ("stations", "atoc_codes", "connections")
+# Bump when DataSnapshot or the station indexes change shape.
+SNAPSHOT_FORMAT = 1
+
+
+class DataSnapshot:
+    def __init__(self, stations, atoc_codes, connections, version):
+        self.stations = stations
+        self.atoc_codes = atoc_codes
+        self.connections = connections
+        self.version = version
+        self.stations_n = build_station_entries(stations)
+        self.stations_by_crs = {
+            st["crsCode"].upper(): st["stationName"]
+            for st in stations
+            if st.get("crsCode")
+        }
+        self.station_records_by_crs = {
+            st["crsCode"].upper(): st
+            for st in stations
+            if st.get("crsCode")
+        }
+        self.station_index = StationSearchIndex(self.stations_n)
+        self.station_geo_index = StationGeoIndex(stations)
+
+
+def _file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _combined_version(content_hashes):
+    digest = hashlib.sha256()
+    for name in DATA_FILES:
+        digest.update(name.encode("utf-8"))
+        digest.update(content_hashes[name].encode("ascii"))
+    return digest.hexdigest()[:16]
+
+
+def write_snapshot(snapshot, content_hashes, path):
+    payload = {
+        "format": SNAPSHOT_FORMAT,
+        "hashes": content_hashes,
+        "snapshot": snapshot,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def _read_snapshot(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    # The indexes are hundreds of thousands of small containers; the cyclic
+    # GC would otherwise run dozens of times while they are recreated.
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return pickle.loads(raw)
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+class DataRegistry:
+    def __init__(self, paths, check_interval=30.0, logger=None, snapshot_path=None):
+        self.paths = {name: paths[name] for name in DATA_FILES}
+        self.check_interval = check_interval
+        self.logger = logger
+        self.load_phases = []
+        self.loaded_from_snapshot = False
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._reloading = False
+        self._last_check = time.monotonic()
+
+        started = time.perf_counter()
+        self._signatures, self._content_hashes, raw = self._read_raw_files()
+        self._phase("data read", started)
+
+        snapshot = None
+        if snapshot_path and os.path.exists(snapshot_path):
+            started = time.perf_counter()
+            snapshot = self._load_snapshot(snapshot_path)
+            self._phase("data snapshot", started)
+        if snapshot is None:
+            started = time.perf_counter()
+            parsed = {name: json.loads(data) for name, data in raw.items()}
+            self._phase("data parse", started)
+            started = time.perf_counter()
+            snapshot = self._make_snapshot(parsed, self._content_hashes)
+            self._phase("data index", started)
+        else:
+            self.loaded_from_snapshot = True
+        self._snapshot = snapshot
+
+    def _phase(self, name, started):
+        self.load_phases.append((name, time.perf_counter() - started))
+
+    def _load_snapshot(self, path):
+        try:
+            payload = _read_snapshot(path)
+        except Exception as exc:  # noqa: BLE001
+            if self.logger:
+                self.logger.warning("Ignoring unreadable data snapshot %s: %s", path, exc)
+            return None
+        if (
+            not isinstance(payload, dict)
+            or payload.get("format") != SNAPSHOT_FORMAT
+            or payload.get("hashes") != self._content_hashes
+        ):
+            if self.logger:
+                self.logger.warning("Ignoring stale data snapshot %s", path)
+            return None
+        return payload.get("snapshot")
+
+    def current(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def write_snapshot(self, path):
+        write_snapshot(self._snapshot, self._content_hashes, path)
+
+    def _read_raw_files(self):
+        signatures = {}
+        hashes = {}
+        raw = {}
+        for name, path in self.paths.items():
+            signatures[name] = _file_signature(path)
+            with open(path, "rb") as f:
+                raw[name] = f.read()
+            hashes[name] = hashlib.sha256(raw[name]).hexdigest()
+        return signatures, hashes, raw
+
+    def _read_files(self):
+        signatures, hashes, raw = self._read_raw_files()
+        parsed = {name: json.loads(data) for name, data in raw.items()}
+        return signatures, hashes, parsed
+
+    def _make_snapshot(self, parsed, hashes):
+        return DataSnapshot(
+            parsed["stations"],
+            parsed["atoc_codes"],
+            parsed["connections"],
+            _combined_version(hashes),
+        )
+
+    def _changed_files(self):
+        changed = []
+        for name, path in self.paths.items():
+            try:
+                signature = _file_signature(path)
+            except OSError:
+                continue
+            if signature != self._signatures.get(name):
+                changed.append(name)
+        return changed
+
+    def reload(self):
+        with self._reload_lock:
+            return self._reload()
+
+    def _reload(self):
+        try:
+            signatures, hashes, parsed = self._read_files()
+            if hashes == self._content_hashes:
+                self._signatures = signatures
+                return False
+            snapshot = self._make_snapshot(parsed, hashes)
+        except Exception as exc:  # noqa: BLE001
+            # Keep serving the previous data. The signatures are left alone,
+            # so the files are tried again at the next check; a half-written
+            # or malformed file is picked up once it has been fixed.
+            if self.logger:
+                self.logger.error("Data reload failed, keeping %s: %s", self.version, exc)
+            return False
+
+        previous = self._snapshot.version
+        self._content_hashes = hashes
+        self._snapshot = snapshot
+        self._signatures = signatures
+        if self.logger:
+            self.logger.info("Data reloaded: %s -> %s", previous, snapshot.version)
+        return True
+
+    def _reload_in_background(self):
+        try:
+            self.reload()
+        finally:
+            with self._lock:
+                self._reloading = False
+
+    def maybe_reload(self):
+        if self.check_interval <= 0:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        with self._lock:
+            if self._reloading or now - self._last_check < self.check_interval:
+                return
+            self._last_check = now
+            if not self._changed_files():
+                return
+            self._reloading = True
+        threading.Thread(
+            target=self._reload_in_background,
+            name="data-reload",
+            daemon=True,
+        ).start()
@@ -37,6 +37,7 @@ const PROXY_SERVICE = `${BACKEND_BASE}/rtt/service`;
 const PROXY_PDF = `${BACKEND_BASE}/timetable/pdf`; // if you call this from JS
 const PROXY_XLSX = `${BACKEND_BASE}/timetable/xlsx`;
 const PROXY_STATION = `${BACKEND_BASE}/api/stations`; // if you call this from JS
+const PROXY_STATION_LOOKUP = `${BACKEND_BASE}/api/stations/lookup`;
 const PROXY_ATOC = `${BACKEND_BASE}/api/atoc-codes`;
 
 const STATION_DEBOUNCE_MS = 180;
@@ -768,6 +769,33 @@ async function fetchStationMatches(query) {
   return resp.json();
 }
 
+// CRS lookups requested in the same tick (e.g. all fields prefilled from a
+// share link) are resolved together with a single bulk request.
+let pendingStationLookup = null;
+
+function lookupStationByCrs(crs) {
+  if (!pendingStationLookup) {
+    const batch = { codes: new Set(), promise: null };
+    batch.promise = Promise.resolve().then(async () => {
+      pendingStationLookup = null;
+      const codes = [...batch.codes].join(",");
+      const resp = await fetch(
+        `${PROXY_STATION_LOOKUP}?crs=${encodeURIComponent(codes)}`,
+      );
+      if (!resp.ok) {
+        return null;
+      }
+      const data = await resp.json();
+      return data?.stations || {};
+    });
+    pendingStationLookup = batch;
+  }
+  pendingStationLookup.codes.add(crs);
+  return pendingStationLookup.promise.then((stations) =>
+    stations ? stations[crs] || null : undefined,
+  );
+}
+
 function updateStationValidity(field) {
   const textValue = field.textInput.value.trim();
   if (!textValue) {
@@ -960,11 +988,15 @@ async function hydrateStationField(field) {
   }
   field.crsInput.value = crs;
   try {
-    const matches = await fetchStationMatches(crs);
-    const exactMatch = matches.find(
-      (match) => normaliseCrs(match.crsCode) === crs,
-    );
-    const picked = exactMatch || matches[0];
+    let picked = await lookupStationByCrs(crs);
+    if (picked === undefined) {
+      // Older backends without the bulk lookup: fall back to autocomplete.
+      const matches = await fetchStationMatches(crs);
+      const exactMatch = matches.find(
+        (match) => normaliseCrs(match.crsCode) === crs,
+      );
+      picked = exactMatch || matches[0];
+    }
     if (picked) {
       field.textInput.value = picked.stationName;
       field.crsInput.value = picked.crsCode;
@@ -1711,17 +1743,46 @@ function formatListWithAnd(values) {
   return `${items.slice(0, -1).join(", ")}, and ${items[items.length - 1]}`;
 }
 
+// Export payloads are large and repetitive, so they are gzipped where the
+// browser can. If that fails, or a backend that predates compressed uploads
+// answers 400 or 415, the export is sent again uncompressed.
+async function postExportPayload(url, payload) {
+  const json = JSON.stringify(payload);
+  const headers = { "Content-Type": "application/json" };
+  if (typeof CompressionStream === "function") {
+    try {
+      const stream = new Blob([json]).stream().pipeThrough(new CompressionStream("gzip"));
+      const body = await new Response(stream).blob();
+      const resp = await fetch(url, {
+        method: "POST",
+        headers: { ...headers, "Content-Encoding": "gzip" },
+        body,
+      });
+      if (resp.status !== 400 && resp.status !== 415) return resp;
+      if (resp.status === 400) {
+        // Only a body that could not be inflated is worth resending
+        // uncompressed; any other 400 would just fail again.
+        const error = await resp
+          .clone()
+          .json()
+          .then((data) => String(data?.error || ""))
+          .catch(() => "");
+        if (!error.startsWith("Request body could not be decompressed")) return resp;
+      }
+    } catch (err) {
+      // Fall back to an uncompressed upload below.
+    }
+  }
+  return fetch(url, { method: "POST", headers, body: json });
+}
+
 downloadPdfBtn.addEventListener("click", async () => {
   if (!lastPdfPayload) return;
   downloadPdfBtn.disabled = true;
   setStatus("Building PDF...");
 
   try {
-    const resp = await fetch(PROXY_PDF, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(lastPdfPayload),
-    });
+    const resp = await postExportPayload(PROXY_PDF, lastPdfPayload);
 
     if (!resp.ok) {
       const text = await resp.text();
@@ -1752,11 +1813,7 @@ downloadXlsxBtn.addEventListener("click", async () => {
   setStatus("Building XLSX...");
 
   try {
-    const resp = await fetch(PROXY_XLSX, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(lastXlsxPayload),
-    });
+    const resp = await postExportPayload(PROXY_XLSX, lastXlsxPayload);
 
     if (!resp.ok) {
       const text = await resp.text();
@@ -0,0 +1,252 @@
+"""Content-addressed cache for rendered PDF and XLSX exports.
+
+Exports are keyed on a SHA-256 of the canonical JSON of everything the
+builder reads, so identical payloads map to the same entry whatever their
+key order or whitespace. Entries live in a small in-process LRU and,
+optionally, in a directory shared by every worker on the host. Both tiers
+are bounded by total bytes; the disk tier evicts the least recently used
+files by mtime, which a disk hit refreshes. Entries above
+``max_memory_entry_bytes`` skip the memory tier and are served straight
+from their file, so a large export is never held in memory.
+"""
+
+import hashlib
+import importlib.metadata
+import json
+import io
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+# Bump when the key or the layout of the cache itself changes.
+EXPORT_CACHE_FORMAT = 1
+# Everything besides the payload that shapes an export's bytes. Keys include
+# a hash of these files and package versions, so after a deploy that changes
+# any of them the files a previous exporter left in a shared cache directory
+# are never served.
+EXPORTER_SOURCES = ("pdf_utils.py", "xlsx_utils.py", "export_tables.py", "docs/icons")
+EXPORTER_PACKAGES = ("reportlab", "svglib", "pypdf", "openpyxl")
+
+
+def _source_files(root, relative):
+    path = os.path.join(root, relative)
+    if os.path.isfile(path):
+        return [relative]
+    found = []
+    for dirpath, dirnames, filenames in os.walk(path):
+        dirnames.sort()
+        for name in sorted(filenames):
+            found.append(os.path.relpath(os.path.join(dirpath, name), root))
+    return found
+
+
+def exporter_version(root=os.path.dirname(os.path.abspath(__file__))):
+    digest = hashlib.sha256()
+    for relative in EXPORTER_SOURCES:
+        for name in _source_files(root, relative):
+            digest.update(name.replace(os.sep, "/").encode("utf-8") + b"\0")
+            with open(os.path.join(root, name), "rb") as f:
+                digest.update(hashlib.sha256(f.read()).digest())
+    for package in EXPORTER_PACKAGES:
+        try:
+            version = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            version = ""
+        digest.update(f"{package}=={version}\0".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+EXPORTER_VERSION = exporter_version()
+
+
+def export_cache_key(kind, payload):
+    canonical = json.dumps(
+        {
+            "format": EXPORT_CACHE_FORMAT,
+            "exporter": EXPORTER_VERSION,
+            "kind": kind,
+            "payload": payload,
+        },
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ExportCache:
+    def __init__(
+        self,
+        max_memory_bytes,
+        disk_dir=None,
+        max_disk_bytes=0,
+        max_memory_entry_bytes=None,
+        logger=None,
+    ):
+        self.max_memory_bytes = max(0, max_memory_bytes)
+        self.max_memory_entry_bytes = (
+            self.max_memory_bytes
+            if max_memory_entry_bytes is None
+            else min(self.max_memory_bytes, max_memory_entry_bytes)
+        )
+        self.disk_dir = disk_dir if disk_dir and max_disk_bytes > 0 else None
+        self.max_disk_bytes = max(0, max_disk_bytes)
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._stats = {
+            "memoryHits": 0,
+            "diskHits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytesSaved": 0,
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    @property
+    def enabled(self):
+        return bool(self.max_memory_bytes or self.disk_dir)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key)
+
+    def _disk_entries(self):
+        entries = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def open(self, key):
+        """Return ``(file, size)`` for a cached export, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self._stats["memoryHits"] += 1
+                self._stats["bytesSaved"] += len(data)
+                return io.BytesIO(data), len(data)
+
+        f = self._open_disk(key)
+        if f is None:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+        size = os.fstat(f.fileno()).st_size
+        data = None
+        if size <= self.max_memory_entry_bytes:
+            data = f.read()
+            f.seek(0)
+        with self._lock:
+            self._stats["diskHits"] += 1
+            self._stats["bytesSaved"] += size
+            if data is not None:
+                self._remember(key, data)
+        return f, size
+
+    def store(self, key, f, size):
+        """Copy ``size`` bytes from ``f`` into the cache and rewind it."""
+        with self._lock:
+            self._stats["stores"] += 1
+        if size <= self.max_memory_entry_bytes:
+            data = f.read()
+            f.seek(0)
+            with self._lock:
+                self._remember(key, data)
+        self._write_disk(key, f, size)
+        f.seek(0)
+
+    def _remember(self, key, data):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self._stats["evictions"] += 1
+
+    def _open_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return f
+
+    def _write_disk(self, key, f, size):
+        if not self.disk_dir or size > self.max_disk_bytes:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as out:
+                shutil.copyfileobj(f, out)
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            if self.logger:
+                self.logger.warning("Export cache write failed for %s: %s", key, exc)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes += size
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self):
+        # Other workers write to the same directory, so the running total is
+        # only a trigger; the directory listing is the real size.
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self._stats["evictions"] += evicted
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memoryEntries"] = len(self._memory)
+            stats["memoryBytes"] = self._memory_bytes
+            stats["diskBytes"] = self._disk_bytes if self.disk_dir else 0
+        lookups = stats["memoryHits"] + stats["diskHits"] + stats["misses"]
+        stats["hitRate"] = (
+            round((stats["memoryHits"] + stats["diskHits"]) / lookups, 4) if lookups else 0.0
+        )
+        return stats
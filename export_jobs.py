@@ -0,0 +1,201 @@
+"""Background export jobs for large PDF and XLSX renders.
+
+Jobs run on a fixed number of threads owned by the worker process that
+accepted them, smallest payload first, so a quick export is never queued
+behind a huge one. Job state and results are written to a directory that
+every worker on the host shares. That way a poll can land on any gunicorn
+worker, not just the one rendering the job. Finished jobs are removed
+after a retention period, and a job whose worker process has exited is
+reported as failed rather than left queued forever.
+
+The directory is only shared within one host. Behind a load balancer with
+several instances, a poll that reaches another instance finds no job, so the
+job routes need session affinity (or a single instance).
+"""
+
+import heapq
+import itertools
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+from metrics import pid_alive
+
+
+JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class ExportJobQueue:
+    def __init__(self, job_dir, workers=2, max_queued=32, retention=600.0, logger=None):
+        self.job_dir = job_dir
+        self.workers = max(1, workers)
+        self.max_queued = max_queued
+        self.retention = retention
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._queue = []
+        self._sequence = itertools.count()
+        self._threads = []
+        self._last_cleanup = 0.0
+        os.makedirs(job_dir, exist_ok=True)
+
+    def _status_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def result_path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.result")
+
+    def _write_status(self, status):
+        path = self._status_path(status["jobId"])
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(status, f)
+        os.replace(tmp_path, path)
+
+    def _start_workers(self):
+        # Threads are started on first use so that importing the app (and
+        # gunicorn's pre-fork master) never owns any.
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._work,
+                name=f"export-job-{len(self._threads) + 1}",
+                daemon=True,
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, kind, render, size, download_name, mimetype):
+        """Queue ``render(progress)`` and return the new job's status.
+
+        ``size`` orders the queue; ``render`` must return a readable file,
+        which is copied into the job directory and closed.
+        """
+        self._cleanup()
+        job_id = uuid.uuid4().hex
+        status = {
+            "jobId": job_id,
+            "pid": os.getpid(),
+            "format": kind,
+            "status": "queued",
+            "progress": 0.0,
+            "size": size,
+            "downloadName": download_name,
+            "mimetype": mimetype,
+            "queuedAt": time.time(),
+            "startedAt": None,
+            "finishedAt": None,
+            "error": None,
+            "bytes": None,
+        }
+        with self._lock:
+            if len(self._queue) >= self.max_queued:
+                raise QueueFullError("Too many export jobs queued")
+            self._write_status(status)
+            heapq.heappush(self._queue, (size, next(self._sequence), status, render))
+            self._start_workers()
+            self._ready.notify()
+        return dict(status)
+
+    def get(self, job_id):
+        if not JOB_ID_RE.fullmatch(job_id or ""):
+            return None
+        self._cleanup()
+        status = self._read_status(self._status_path(job_id))
+        if status is not None and self._orphaned(status):
+            status["status"] = "failed"
+            status["error"] = "The worker running this export exited"
+            status["finishedAt"] = time.time()
+            self._write_status(status)
+        return status
+
+    def _read_status(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _unfinished(self, status):
+        return status.get("status") in {"queued", "running"}
+
+    def _orphaned(self, status):
+        pid = status.get("pid")
+        return (
+            self._unfinished(status)
+            and pid != os.getpid()
+            and not (isinstance(pid, int) and pid_alive(pid))
+        )
+
+    def queued(self):
+        with self._lock:
+            return len(self._queue)
+
+    def _work(self):
+        while True:
+            with self._lock:
+                while not self._queue:
+                    self._ready.wait()
+                _, _, status, render = heapq.heappop(self._queue)
+            self._run(status, render)
+
+    def _run(self, status, render):
+        status["status"] = "running"
+        status["startedAt"] = time.time()
+        self._write_status(status)
+        reported = [0]
+
+        def progress(fraction):
+            # Written at most once per whole percent.
+            percent = int(fraction * 100)
+            if percent > reported[0]:
+                reported[0] = percent
+                status["progress"] = round(fraction, 2)
+                self._write_status(status)
+
+        try:
+            tmp_path = f"{self.result_path(status['jobId'])}.tmp"
+            with render(progress) as f, open(tmp_path, "wb") as out:
+                shutil.copyfileobj(f, out)
+                size = out.tell()
+            os.replace(tmp_path, self.result_path(status["jobId"]))
+        except Exception as exc:  # noqa: BLE001
+            if self.logger:
+                self.logger.exception("Export job %s failed", status["jobId"])
+            status["status"] = "failed"
+            status["error"] = str(exc) or exc.__class__.__name__
+        else:
+            status["status"] = "done"
+            status["progress"] = 1.0
+            status["bytes"] = size
+        status["finishedAt"] = time.time()
+        self._write_status(status)
+
+    def _cleanup(self):
+        now = time.time()
+        if now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+        cutoff = now - self.retention
+        for name in os.listdir(self.job_dir):
+            path = os.path.join(self.job_dir, name)
+            try:
+                if os.stat(path).st_mtime >= cutoff:
+                    continue
+                if name.endswith(".json"):
+                    # A long queue can keep a job waiting past the retention
+                    # period; only jobs that are over (or orphaned) go.
+                    status = self._read_status(path)
+                    if status and self._unfinished(status) and not self._orphaned(status):
+                        continue
+                os.remove(path)
+            except OSError:
+                continue
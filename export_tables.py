@@ -0,0 +1,47 @@
+"""Helpers shared by the spreadsheet-shaped exports (XLSX and CSV)."""
+
+import re
+
+
+INVALID_SHEET_CHARS = re.compile(r"[:\\/?*\[\]]")
+
+
+def _sheet_name(name, fallback):
+    text = INVALID_SHEET_CHARS.sub(" ", str(name or "").strip())[:31].strip()
+    return text or fallback
+
+
+def cell_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, dict):
+        return str(value.get("text") or "")
+    return str(value)
+
+
+def sheet_names(tables):
+    """``(number, table, name)`` for each table, with unique sheet-safe names."""
+    used_names = set()
+    for idx, table in enumerate(tables or [], start=1):
+        base_name = _sheet_name(table.get("sheetName") or table.get("title"), f"Sheet {idx}")
+        name = base_name
+        suffix = 2
+        while name in used_names:
+            suffix_text = f" {suffix}"
+            name = f"{base_name[:31 - len(suffix_text)]}{suffix_text}"
+            suffix += 1
+        used_names.add(name)
+        yield idx, table, name
+
+
+def lookup_rows(entries):
+    """``[code, name]`` rows of a station or operator code list."""
+    for entry in entries or []:
+        if isinstance(entry, dict):
+            code = str(entry.get("code") or "").strip()
+            name = str(entry.get("name") or "").strip()
+        else:
+            code = str(entry[0] if len(entry) > 0 else "").strip()
+            name = str(entry[1] if len(entry) > 1 else "").strip()
+        if code or name:
+            yield [code, name]
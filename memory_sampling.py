@@ -0,0 +1,104 @@
+"""tracemalloc measurements of a sampled fraction of calls to hot functions.
+
+A sampled call runs with tracemalloc on and reports its peak and net
+(still allocated when it returns) traced bytes, plus the source lines that
+held the most memory. Those sites come from the fullest snapshot taken
+during the call: one at the end, and any taken by ``checkpoint()``, which
+the export builders call while their document or workbook is complete.
+
+tracemalloc is process-wide, so only one call is traced at a time and
+calls made meanwhile (including nested sampled functions) run untraced.
+Allocations by other threads during a traced call are counted too. A traced
+call runs several times slower; the rest only pay a random() call.
+"""
+
+import functools
+import os
+import random
+import threading
+import tracemalloc
+
+
+_sample_rate = 0.0
+_top_sites = 5
+_report = None
+_lock = threading.Lock()
+_active = None
+
+
+class _Trace:
+    def __init__(self):
+        self.thread_id = threading.get_ident()
+        self.snapshot = None
+        self.snapshot_size = -1
+
+    def take_snapshot(self):
+        size = tracemalloc.get_traced_memory()[0]
+        if size > self.snapshot_size:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = size
+
+
+def configure(sample_rate, top_sites=5, report=None):
+    """Trace ``sample_rate`` (0-1) of calls, passing each measurement to
+    ``report(function, peak, net, sites)``; sites are ``(file:line, bytes)``.
+    """
+    global _sample_rate, _top_sites, _report
+    _sample_rate = sample_rate if report is not None else 0.0
+    _top_sites = top_sites
+    _report = report
+
+
+def checkpoint():
+    # Only the thread whose call is traced may snapshot it.
+    trace = _active
+    if trace is not None and trace.thread_id == threading.get_ident():
+        trace.take_snapshot()
+
+
+def _top(snapshot):
+    # Lazy imports of openpyxl or reportlab would otherwise top the first
+    # sample of each worker.
+    snapshot = snapshot.filter_traces(
+        (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        )
+    )
+    sites = []
+    for stat in snapshot.statistics("lineno")[:_top_sites]:
+        frame = stat.traceback[0]
+        sites.append((f"{os.path.basename(frame.filename)}:{frame.lineno}", stat.size))
+    return sites
+
+
+def sampled(func):
+    name = func.__name__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _active
+        if not _sample_rate or random.random() >= _sample_rate:
+            return func(*args, **kwargs)
+        if not _lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            # Leave a tracemalloc someone else started (PYTHONTRACEMALLOC) alone.
+            if tracemalloc.is_tracing():
+                return func(*args, **kwargs)
+            _active = trace = _Trace()
+            tracemalloc.start()
+            try:
+                result = func(*args, **kwargs)
+                net, peak = tracemalloc.get_traced_memory()
+                trace.take_snapshot()
+            finally:
+                _active = None
+                tracemalloc.stop()
+            _report(name, peak, net, _top(trace.snapshot))
+            return result
+        finally:
+            _lock.release()
+
+    return wrapper
@@ -0,0 +1,201 @@
+"""Prometheus text-format metrics summed across every gunicorn worker.
+
+Each worker keeps its own values under a lock and writes them to
+``<dir>/<master pid>/<worker pid>.json`` every few seconds while they
+change, and whenever it answers a scrape. A scrape adds up the files of all
+workers under the same master. Counters and histograms of workers that have
+exited are kept, so totals never go backwards; gauges only count workers
+that are still running.
+"""
+
+import json
+import math
+import os
+import threading
+import time
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+RENDER_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SIZE_BUCKETS = tuple(16 * 1024 * 4**power for power in range(8))
+MEMORY_BUCKETS = tuple(1024 * 4**power for power in range(11))
+RETRY_AFTER_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 900, 3600)
+
+
+def _label_key(labels):
+    return tuple(sorted((labels or {}).items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    items = [*labels, *extra]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def _format_number(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def pid_alive(pid):
+    """Whether a process with this pid is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+class Metrics:
+    def __init__(self, directory, flush_interval=5.0, logger=None):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._families = {}
+        self._values = {}
+        self._dirty = False
+        self._flusher = None
+
+    def _define(self, name, kind, help_text, buckets=None):
+        self._families[name] = (kind, help_text, tuple(buckets or ()))
+
+    def counter(self, name, help_text):
+        self._define(name, "counter", help_text)
+
+    def gauge(self, name, help_text):
+        self._define(name, "gauge", help_text)
+
+    def histogram(self, name, help_text, buckets):
+        self._define(name, "histogram", help_text, buckets)
+
+    def _changed(self):
+        self._dirty = True
+        if self._flusher is None:
+            # Started on first use so that gunicorn's pre-fork master never
+            # owns the thread.
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, name="metrics-flush", daemon=True
+            )
+            self._flusher.start()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+            self._changed()
+
+    def set(self, name, value, labels=None):
+        with self._lock:
+            self._values[(name, _label_key(labels))] = value
+            self._changed()
+
+    def observe(self, name, value, labels=None):
+        buckets = self._families[name][2]
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._values.get(key)
+            if histogram is None:
+                histogram = self._values[key] = [[0] * len(buckets), 0.0, 0]
+            for idx, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[0][idx] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+            self._changed()
+
+    def _worker_dir(self):
+        return os.path.join(self.directory, str(os.getppid()))
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            values = [
+                [name, dict(labels), value] for (name, labels), value in self._values.items()
+            ]
+            self._dirty = False
+        worker_dir = self._worker_dir()
+        path = os.path.join(worker_dir, f"{os.getpid()}.json")
+        try:
+            os.makedirs(worker_dir, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump(values, f)
+            os.replace(f"{path}.tmp", path)
+        except OSError as exc:
+            if self.logger:
+                self.logger.warning("Could not write metrics to %s: %s", path, exc)
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _worker_values(self):
+        worker_dir = self._worker_dir()
+        try:
+            names = os.listdir(worker_dir)
+        except OSError:
+            names = []
+        for name in names:
+            pid_text, _, extension = name.partition(".")
+            if extension != "json" or not pid_text.isdigit():
+                continue
+            try:
+                with open(os.path.join(worker_dir, name), encoding="utf-8") as f:
+                    values = json.load(f)
+            except (OSError, ValueError):
+                continue
+            yield int(pid_text), values
+
+    def render(self):
+        """The metrics of every worker in the Prometheus text format."""
+        self.flush()
+        totals = {}
+        for pid, values in self._worker_values():
+            alive = pid == os.getpid() or pid_alive(pid)
+            for name, labels, value in values:
+                family = self._families.get(name)
+                if family is None or (family[0] == "gauge" and not alive):
+                    continue
+                key = (name, _label_key(labels))
+                if family[0] != "histogram":
+                    totals[key] = totals.get(key, 0) + value
+                    continue
+                total = totals.setdefault(key, [[0] * len(family[2]), 0.0, 0])
+                for idx, count in enumerate(value[0][: len(family[2])]):
+                    total[0][idx] += count
+                total[1] += value[1]
+                total[2] += value[2]
+
+        lines = []
+        for name, (kind, help_text, buckets) in self._families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            series = sorted(
+                ((labels, value) for (family, labels), value in totals.items() if family == name),
+                key=lambda item: item[0],
+            )
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip((*buckets, math.inf), (*value[0], None)):
+                    cumulative = value[2] if count is None else cumulative + count
+                    le = (("le", _format_number(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_number(value[1])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {value[2]}")
+        return "\n".join(lines) + "\n"
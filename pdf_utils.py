@@ -1,11 +1,16 @@
-import copy
 import io
 import os
 import re
+import threading
+import time
+from bisect import bisect_right
+from concurrent.futures import as_completed
+from functools import lru_cache
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfgen.canvas import Canvas
 from reportlab.platypus import (
     SimpleDocTemplate,
     Table,
@@ -13,10 +18,13 @@ from reportlab.platypus import (
     Paragraph,
     Spacer,
     CondPageBreak,
+    Flowable,
 )
-from reportlab.graphics.shapes import Drawing
+from reportlab.graphics import renderPDF
 from svglib.svglib import svg2rlg
 
+from memory_sampling import checkpoint as memory_checkpoint, sampled
+
 
 def _cell_text(value):
     if value is None:
@@ -33,29 +41,45 @@ def _cell_text(value):
     return str(value)
 
 
+@lru_cache(maxsize=8192)
+def _string_width(text, font_name, font_size):
+    # Timetable cells repeat a small vocabulary (times, platforms, CRS codes,
+    # headcodes), so measuring each distinct string once pays off quickly.
+    return pdfmetrics.stringWidth(text, font_name, font_size)
+
+
 def _calc_col_widths(headers, rows, font_name, font_size, padding=6):
-    widths = []
-    for col_idx in range(len(headers)):
-        entries = [headers[col_idx]]
-        for row in rows:
-            if col_idx < len(row):
-                entries.append(row[col_idx])
-        max_width = 0
-        for val in entries:
+    col_count = len(headers)
+    widths = [0] * col_count
+    for row in [headers, *rows]:
+        for col_idx, val in enumerate(row[:col_count]):
             if hasattr(val, "width"):
-                max_width = max(max_width, val.width)
+                width = val.width
             else:
-                max_width = max(
-                    max_width,
-                    pdfmetrics.stringWidth(
-                        _cell_text(val), font_name, font_size
-                    ),
-                )
-        widths.append(max_width + padding)
-    return widths
+                width = _string_width(_cell_text(val), font_name, font_size)
+            if width > widths[col_idx]:
+                widths[col_idx] = width
+    return [width + padding for width in widths]
 
 
-def _load_svg_icon(path, size):
+ICONS_DIR = os.path.join(os.path.dirname(__file__), "docs", "icons")
+ICON_FILES = {
+    "FC": "first-class.svg",
+    "SL": "bed.svg",
+    "BUS": "bus.svg",
+    "WALK": "walk.svg",
+    "LU": "lu.svg",
+    "TRAM": "tram.svg",
+    "DLR": "dlr.svg",
+}
+
+# Parsed icons keyed by (path, size), each stored with the file's mtime so an
+# edited icon is re-read. The drawings are shared and must not be mutated.
+_ICON_CACHE = {}
+_ICON_CACHE_LOCK = threading.Lock()
+
+
+def _parse_svg_icon(path, size):
     drawing = svg2rlg(path)
     if drawing is None:
         return None
@@ -68,6 +92,73 @@ def _load_svg_icon(path, size):
     return drawing
 
 
+def _load_svg_icon(path, size):
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        mtime = None
+    key = (path, size)
+    with _ICON_CACHE_LOCK:
+        cached = _ICON_CACHE.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    drawing = _parse_svg_icon(path, size)
+    with _ICON_CACHE_LOCK:
+        _ICON_CACHE[key] = (mtime, drawing)
+    return drawing
+
+
+class _IconForm:
+    # A facility icon that is emitted into the PDF once, as a form XObject,
+    # the first time a document draws it; later uses only reference it.
+    def __init__(self, name, drawing, size):
+        self.name = name
+        self.drawing = drawing
+        self.size = size
+
+    def draw_on(self, canvas, x, y):
+        if not canvas.hasForm(self.name):
+            canvas.beginForm(self.name)
+            renderPDF.draw(self.drawing, canvas, 0, 0)
+            canvas.endForm()
+        canvas.saveState()
+        canvas.translate(x, y)
+        canvas.doForm(self.name)
+        canvas.restoreState()
+
+
+class _IconRow(Flowable):
+    def __init__(self, icons, size, gap=2):
+        super().__init__()
+        self.icons = icons
+        self.size = size
+        self.gap = gap
+        self.width = len(icons) * size + max(0, len(icons) - 1) * gap
+        self.height = size
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        x_offset = 0
+        for icon in self.icons:
+            icon.draw_on(self.canv, x_offset, 0)
+            x_offset += self.size + self.gap
+
+
+def _load_icon_map(size):
+    icon_map = {}
+    for key, filename in ICON_FILES.items():
+        drawing = _load_svg_icon(os.path.join(ICONS_DIR, filename), size)
+        icon_map[key] = (
+            _IconForm(f"PTGIcon{key}{size:g}", drawing, size)
+            if drawing is not None
+            else None
+        )
+    return icon_map
+
+
 def _build_facilities_cell(value, icon_map, size, gap=2):
     if not isinstance(value, str):
         return value
@@ -83,15 +174,7 @@ def _build_facilities_cell(value, icon_map, size, gap=2):
     if not icons:
         return value
 
-    width = len(icons) * size + max(0, len(icons) - 1) * gap
-    drawing = Drawing(width, size)
-    x_offset = 0
-    for icon in icons:
-        icon_copy = copy.deepcopy(icon)
-        icon_copy.translate(x_offset, 0)
-        drawing.add(icon_copy)
-        x_offset += size + gap
-    return drawing
+    return _IconRow(icons, size, gap)
 
 
 def _strip_markup(text):
@@ -138,53 +221,101 @@ def _format_cell_text(cell):
     return text
 
 
-def _build_key_item(
-    icon, label, style, icon_size, gap=10, pill_padding=3, line_color=None
-):
-    label_text = _strip_markup(label)
-    label_width = pdfmetrics.stringWidth(
-        label_text, style.fontName, style.fontSize
+@lru_cache(maxsize=None)
+def _render_styles(font_name, font_size):
+    # Paragraph styles are only read while rendering, so one set can be shared
+    # by every document and thread.
+    styles = getSampleStyleSheet()
+    doc_title_style = styles["Heading2"]
+    doc_title_style.fontSize = doc_title_style.fontSize * 1.5
+    title_style = styles["Heading3"]
+    title_style.fontName = "Helvetica-Bold"
+    title_style.spaceAfter = 6
+    key_style = ParagraphStyle(
+        "Key",
+        parent=styles["Normal"],
+        fontName="Helvetica",
+        fontSize=8.5,
+        leading=10,
+    )
+    key_label_style = ParagraphStyle(
+        "KeyLabel",
+        parent=key_style,
+        fontName="Helvetica-Bold",
+        spaceAfter=2,
+    )
+    cell_style = ParagraphStyle(
+        "Cell",
+        parent=styles["Normal"],
+        fontName=font_name,
+        fontSize=font_size,
+        leading=font_size + 2,
+        spaceBefore=0,
+        spaceAfter=0,
+        leftIndent=0,
+        rightIndent=0,
+        alignment=1,
     )
+    return {
+        "normal": styles["Normal"],
+        "doc_title": doc_title_style,
+        "doc_subtitle": styles["Normal"],
+        "title": title_style,
+        "key": key_style,
+        "key_label": key_label_style,
+        "cell": cell_style,
+    }
+
+
+_KEY_ICON_STYLE = TableStyle(
+    [
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("LEFTPADDING", (0, 0), (-1, -1), 0),
+        ("RIGHTPADDING", (0, 0), (-1, -1), 0),
+        ("TOPPADDING", (0, 0), (-1, -1), 0),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
+    ]
+)
+
+
+@lru_cache(maxsize=16)
+def _key_pill_style(pill_padding, line_color):
+    # Flowables keep layout state, so pills are rebuilt per document; only
+    # their immutable styles are shared.
     border_color = line_color or colors.HexColor("#c6b7a2")
     bg_color = colors.HexColor("#f7f3ea")
+    return TableStyle(
+        [
+            ("BOX", (0, 0), (-1, -1), 0.4, border_color),
+            ("BACKGROUND", (0, 0), (-1, -1), bg_color),
+            ("LEFTPADDING", (0, 0), (-1, -1), pill_padding),
+            ("RIGHTPADDING", (0, 0), (-1, -1), pill_padding),
+            ("TOPPADDING", (0, 0), (-1, -1), pill_padding),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), pill_padding),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]
+    )
+
+
+def _build_key_item(
+    icon, label, style, icon_size, gap=10, pill_padding=3, line_color=None
+):
+    label_width = _string_width(_strip_markup(label), style.fontName, style.fontSize)
     if icon is None:
         content = Paragraph(label, style)
         content_width = label_width
     else:
-        icon_copy = copy.deepcopy(icon)
         spacer = Spacer(gap, 1)
         content = Table(
-            [[icon_copy, spacer, Paragraph(label, style)]],
+            [[_IconRow([icon], icon_size), spacer, Paragraph(label, style)]],
             colWidths=[icon_size, gap, None],
             hAlign="LEFT",
         )
-        content.setStyle(
-            TableStyle(
-                [
-                    ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                    ("LEFTPADDING", (0, 0), (-1, -1), 0),
-                    ("RIGHTPADDING", (0, 0), (-1, -1), 0),
-                    ("TOPPADDING", (0, 0), (-1, -1), 0),
-                    ("BOTTOMPADDING", (0, 0), (-1, -1), 0),
-                ]
-            )
-        )
+        content.setStyle(_KEY_ICON_STYLE)
         content_width = icon_size + gap + label_width
 
     pill = Table([[content]], hAlign="CENTER")
-    pill.setStyle(
-        TableStyle(
-            [
-                ("BOX", (0, 0), (-1, -1), 0.4, border_color),
-                ("BACKGROUND", (0, 0), (-1, -1), bg_color),
-                ("LEFTPADDING", (0, 0), (-1, -1), pill_padding),
-                ("RIGHTPADDING", (0, 0), (-1, -1), pill_padding),
-                ("TOPPADDING", (0, 0), (-1, -1), pill_padding),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), pill_padding),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-            ]
-        )
-    )
+    pill.setStyle(_key_pill_style(pill_padding, line_color))
     width = content_width + (pill_padding * 2)
     return pill, width
 
@@ -255,7 +386,808 @@ def _split_columns(widths, available_width):
     return chunks
 
 
-def build_timetable_pdf(tables, meta=None):
+# "canvas" draws the timetable grid directly instead of through a platypus
+# Table; "auto" picks it once the tables are large enough to benefit.
+PDF_RENDERERS = ("platypus", "canvas", "auto")
+CANVAS_RENDERER_MIN_CELLS = 20000
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+PAGE_MARGIN = 36
+
+GRID_LINE_COLOR = colors.grey
+GRID_LINE_WIDTH = 0.5
+GRID_ROW_SHADE = colors.Color(250 / 255, 246 / 255, 239 / 255)
+GRID_HEADER_FONT = "Helvetica-Bold"
+GRID_PADDING = 2
+
+
+def _row_rules(row_idx, label):
+    # (shaded, rule below, rule above) for a payload row; row 0 is the
+    # facilities row, which gets its own rule below.
+    shaded = row_idx >= 1 and (row_idx - 1) % 2 == 1
+    line_below = label == "Comes from"
+    line_above = label == "Continues to" or label.endswith("(dep)")
+    return shaded, line_below, line_above
+
+
+_BACKGROUND_OPS = {"BACKGROUND", "ROWBACKGROUNDS", "COLBACKGROUNDS"}
+_RULE_OPS = {"LINEABOVE", "LINEBELOW", "LINEBEFORE", "LINEAFTER"}
+
+
+def _cell_spans(cells):
+    # Covers {(col, row): colour} with as few rectangles as possible along
+    # rows: same-coloured neighbours in a row form a run, and a run sitting
+    # directly under an identical run extends it downwards.
+    runs = {}
+    for (col, row), color in sorted(cells.items(), key=lambda item: (item[0][1], item[0][0])):
+        row_runs = runs.setdefault(row, [])
+        if row_runs and row_runs[-1][1] == col - 1 and row_runs[-1][2] == color:
+            row_runs[-1][1] = col
+        else:
+            row_runs.append([col, col, color])
+
+    spans = []
+    open_spans = {}
+    for row in sorted(runs):
+        next_open = {}
+        for c0, c1, color in runs[row]:
+            key = (c0, c1, color)
+            span = open_spans.get(key)
+            if span is not None and span[3] == row - 1:
+                span[3] = row
+            else:
+                span = [c0, row, c1, row, color]
+                spans.append(span)
+            next_open[key] = span
+        open_spans = next_open
+    return [tuple(span) for span in spans]
+
+
+def _compile_table_style(commands):
+    # Table keeps every command, re-slices all of them at each page split
+    # and walks each one when drawing, so a style with one command per cell
+    # or per row costs far more than the regions it paints. Consecutive
+    # single-cell BACKGROUNDs are packed into rectangles (only their order
+    # relative to other backgrounds matters), commands on adjacent rows with
+    # identical columns and arguments become one row range, and exact repeats
+    # are dropped.
+    # Keeping the last of several identical commands is always safe: it
+    # repaints or re-sets whatever the earlier copies did.
+    unique = []
+    seen = set()
+    for command in reversed(commands):
+        command = tuple(command)
+        try:
+            if command in seen:
+                continue
+            seen.add(command)
+        except TypeError:
+            pass
+        unique.append(command)
+    unique.reverse()
+
+    compiled = []
+    cells = {}
+    last_background = None
+    rule_tails = {}
+    rule_style = None
+
+    def append_background(command):
+        nonlocal last_background
+        prev = compiled[last_background] if last_background is not None else None
+        if (
+            prev is not None
+            and prev[0] == "BACKGROUND" == command[0]
+            and prev[3:] == command[3:]
+            and prev[1][0] == command[1][0]
+            and prev[2][0] == command[2][0]
+            and 0 <= prev[2][1] == command[1][1] - 1
+        ):
+            compiled[last_background] = (prev[0], prev[1], (prev[2][0], command[2][1]), *prev[3:])
+            return
+        compiled.append(command)
+        last_background = len(compiled) - 1
+
+    def flush_cells():
+        for c0, r0, c1, r1, color in _cell_spans(cells):
+            append_background(("BACKGROUND", (c0, r0), (c1, r1), color))
+        cells.clear()
+
+    for command in unique:
+        op = command[0]
+        (sc, sr), (ec, er) = command[1], command[2]
+        if op in _BACKGROUND_OPS:
+            if op == "BACKGROUND" and sc == ec >= 0 and sr == er >= 0 and len(command) == 4:
+                cells[(sc, sr)] = command[3]
+                continue
+            flush_cells()
+            append_background(command)
+        elif op in _RULE_OPS:
+            # Rules are drawn in order too, but identically styled ones can
+            # swap places; a differently styled rule ends the merging.
+            style = command[3:]
+            if style != rule_style:
+                rule_tails = {}
+                rule_style = style
+            key = (op, sc, ec)
+            tail = rule_tails.get(key)
+            if tail is not None and sr >= 0 and 0 <= compiled[tail][2][1] == sr - 1:
+                prev = compiled[tail]
+                compiled[tail] = (op, prev[1], (ec, er), *style)
+                continue
+            compiled.append(command)
+            if sr >= 0 and er >= 0:
+                rule_tails[key] = len(compiled) - 1
+            else:
+                rule_tails.pop(key, None)
+        else:
+            compiled.append(command)
+    flush_cells()
+    return compiled
+
+
+def _build_platypus_grid(
+    chunk_headers, chunk_rows, rows, chunk_widths, icon_map, icon_size, cell_style,
+    font_name, font_size
+):
+    highlight_styles = []
+    data_rows = []
+    for row_idx, row in enumerate(chunk_rows):
+        row_label = _cell_text(row[0]).strip() if row else ""
+        is_crs_row = row_label in {"Comes from", "Continues to"}
+        row_cells = []
+        for col_idx, cell in enumerate(row):
+            if isinstance(cell, dict):
+                plain = _cell_text(cell)
+                if is_crs_row and col_idx > 0 and plain:
+                    row_cells.append(
+                        Paragraph(f"<i>{plain}</i>", cell_style)
+                    )
+                else:
+                    formatted = _format_cell_text(cell)
+                    if formatted != plain:
+                        row_cells.append(Paragraph(formatted, cell_style))
+                    else:
+                        row_cells.append(plain)
+                bg_color = cell.get("bgColor")
+                if bg_color:
+                    highlight_styles.append(
+                        (
+                            col_idx,
+                            row_idx + 1,
+                            colors.HexColor(bg_color),
+                        )
+                    )
+            else:
+                plain = _cell_text(cell)
+                if is_crs_row and col_idx > 0 and plain:
+                    row_cells.append(
+                        Paragraph(f"<i>{plain}</i>", cell_style)
+                    )
+                else:
+                    row_cells.append(
+                        _build_facilities_cell(cell, icon_map, icon_size)
+                    )
+        data_rows.append(row_cells)
+
+    data = [chunk_headers] + data_rows
+
+    pdf_table = Table(data, colWidths=chunk_widths, repeatRows=1, hAlign="LEFT")
+    line_color = GRID_LINE_COLOR
+    line_width = GRID_LINE_WIDTH
+    row_shade = GRID_ROW_SHADE
+    table_style = [
+        ("FONT", (0, 0), (-1, -1), font_name, font_size),
+        ("FONTNAME", (0, 0), (-1, 1), GRID_HEADER_FONT),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("BACKGROUND", (0, 1), (-1, 1), colors.lightgrey),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ("ALIGN", (0, 0), (0, -1), "RIGHT"),
+        ("LINEBEFORE", (0, 0), (-1, -1), line_width, line_color),
+        ("LINEAFTER", (0, 0), (-1, -1), line_width, line_color),
+        ("LEFTPADDING", (0, 0), (-1, -1), GRID_PADDING),
+        ("RIGHTPADDING", (0, 0), (-1, -1), GRID_PADDING),
+        ("TOPPADDING", (0, 0), (-1, -1), GRID_PADDING),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), GRID_PADDING),
+    ]
+
+    if len(rows) >= 1:
+        table_style.append(
+            ("LINEBELOW", (0, 1), (-1, 1), line_width, line_color)
+        )
+
+    for row_idx, row in enumerate(rows):
+        label = _cell_text(row[0]).strip() if row else ""
+        data_row_idx = row_idx + 1
+        shaded, line_below, line_above = _row_rules(row_idx, label)
+        if shaded:
+            table_style.append(
+                ("BACKGROUND", (0, data_row_idx), (-1, data_row_idx), row_shade)
+            )
+        if line_below:
+            table_style.append(
+                (
+                    "LINEBELOW",
+                    (0, data_row_idx),
+                    (-1, data_row_idx),
+                    line_width,
+                    line_color,
+                )
+            )
+        if line_above:
+            table_style.append(
+                (
+                    "LINEABOVE",
+                    (0, data_row_idx),
+                    (-1, data_row_idx),
+                    line_width,
+                    line_color,
+                )
+            )
+
+    for col_idx, row_idx, color in highlight_styles:
+        table_style.append(
+            ("BACKGROUND", (col_idx, row_idx), (col_idx, row_idx), color)
+        )
+
+    pdf_table.setStyle(TableStyle(_compile_table_style(table_style)))
+    return pdf_table
+
+
+_RUN_UNSAFE = re.compile(r"[<>&\s]")
+
+
+def _run_font(font_name, bold, italic):
+    if bold and italic:
+        return f"{font_name}-BoldOblique"
+    if bold:
+        return f"{font_name}-Bold"
+    if italic:
+        return f"{font_name}-Oblique"
+    return font_name
+
+
+@lru_cache(maxsize=4096)
+def _text_runs(
+    text, platform_text, bold, italic, strike, color, confirmed, changed,
+    font_name, font_size,
+):
+    # The runs a one-line cell Paragraph would draw for _format_cell_text's
+    # markup, as (x offset, text, font, colour, struck) plus the line width.
+    # None means the cell needs a real Paragraph.
+    runs = []
+    x = 0
+    if text:
+        if _RUN_UNSAFE.search(text):
+            return None
+        text_color = colors.black
+        if color and color != "muted":
+            try:
+                text_color = colors.toColor(color)
+            except ValueError:
+                return None
+        font = _run_font(font_name, bold, italic)
+        runs.append((x, text, font, text_color, strike))
+        x += _string_width(text, font, font_size)
+    if platform_text:
+        if _RUN_UNSAFE.search(platform_text):
+            return None
+        if runs:
+            x += _string_width(" ", font_name, font_size)
+        font = _run_font(font_name, confirmed, False)
+        platform_color = colors.HexColor("#8243a8") if changed else colors.black
+        runs.append((x, platform_text, font, platform_color, strike))
+        x += _string_width(platform_text, font, font_size)
+    return tuple(runs), x
+
+
+class _GridLayout:
+    # A timetable chunk laid out once: column positions, the drawing plan of
+    # every cell and every row height. Cell plans are
+    #   ("s", lines, font)       plain text, aligned like the platypus Table
+    #   ("r", runs, width)       formatted text drawn as centred runs
+    #   ("f", flowable, w, h)    icons, or a Paragraph where runs won't do
+    def __init__(
+        self, chunk_headers, chunk_rows, chunk_widths, icon_map, icon_size,
+        cell_style, font_name, font_size,
+    ):
+        self.font_name = font_name
+        self.font_size = font_size
+        self.leading = 1.2 * font_size
+        self.cell_style = cell_style
+        self.col_widths = list(chunk_widths)
+        self.col_positions = [0]
+        for width in self.col_widths:
+            self.col_positions.append(self.col_positions[-1] + width)
+        self.width = self.col_positions[-1]
+
+        self.plans = [self._header_plans(chunk_headers)]
+        self.highlights = [()]
+        self.shaded = [False]
+        self.line_below = [False]
+        self.line_above = [False]
+        for row_idx, row in enumerate(chunk_rows):
+            row_label = _cell_text(row[0]).strip() if row else ""
+            shaded, line_below, line_above = _row_rules(row_idx, row_label)
+            self.shaded.append(shaded)
+            self.line_below.append(line_below or row_idx == 0)
+            self.line_above.append(line_above)
+            is_crs_row = row_label in {"Comes from", "Continues to"}
+            font = GRID_HEADER_FONT if row_idx == 0 else font_name
+            plans = []
+            highlights = []
+            for col_idx, cell in enumerate(row):
+                plans.append(
+                    self._cell_plan(cell, col_idx, is_crs_row, font, icon_map, icon_size)
+                )
+                if isinstance(cell, dict) and cell.get("bgColor"):
+                    highlights.append((col_idx, colors.HexColor(cell["bgColor"])))
+            self.plans.append(plans)
+            self.highlights.append(highlights)
+
+        self.row_heights = [self._row_height(plans) for plans in self.plans]
+        # offsets[i] is the height of rows 1..i-1, so any run of body rows is
+        # measured with one subtraction when the grid is split.
+        self.offsets = [0, 0]
+        for height in self.row_heights[1:]:
+            self.offsets.append(self.offsets[-1] + height)
+
+    def _header_plans(self, headers):
+        return [
+            self._text_plan(_cell_text(value), GRID_HEADER_FONT) for value in headers
+        ]
+
+    def _text_plan(self, text, font):
+        return ("s", text.split("\n"), font)
+
+    def _paragraph_plan(self, markup, col_idx):
+        para = Paragraph(markup, self.cell_style)
+        width, height = para.wrap(self.col_widths[col_idx] - 2 * GRID_PADDING, 0)
+        return ("f", para, width, height)
+
+    def _runs_plan(self, runs, markup, col_idx):
+        if runs is not None:
+            runs, width = runs
+            if width <= self.col_widths[col_idx] - 2 * GRID_PADDING:
+                return ("r", runs, width)
+        return self._paragraph_plan(markup, col_idx)
+
+    def _cell_plan(self, cell, col_idx, is_crs_row, font, icon_map, icon_size):
+        plain = _cell_text(cell)
+        if is_crs_row and col_idx > 0 and plain:
+            runs = _text_runs(
+                plain, None, False, True, False, None, False, False,
+                self.font_name, self.font_size,
+            )
+            return self._runs_plan(runs, f"<i>{plain}</i>", col_idx)
+        if isinstance(cell, dict):
+            formatted = _format_cell_text(cell)
+            if formatted == plain:
+                return self._text_plan(plain, font)
+            runs = _text_runs(
+                str(cell.get("text", "")),
+                str(cell.get("platformText") or "") or None,
+                bool(cell.get("bold")),
+                bool(cell.get("italic")),
+                bool(cell.get("strike")),
+                cell.get("color"),
+                bool(cell.get("platformConfirmed")),
+                bool(cell.get("platformChanged")),
+                self.font_name,
+                self.font_size,
+            )
+            return self._runs_plan(runs, formatted, col_idx)
+        value = _build_facilities_cell(cell, icon_map, icon_size)
+        if isinstance(value, Flowable):
+            return ("f", value, value.width, value.height)
+        return self._text_plan(plain, font)
+
+    def _row_height(self, plans):
+        height = 0
+        for plan in plans:
+            if plan[0] == "s":
+                cell_height = self.leading * len(plan[1])
+            elif plan[0] == "r":
+                cell_height = self.cell_style.leading
+            else:
+                cell_height = plan[3]
+            if cell_height > height:
+                height = cell_height
+        return height + 2 * GRID_PADDING
+
+
+class _CanvasGrid(Flowable):
+    # Draws a chunk laid out by _GridLayout straight onto the canvas, in
+    # place of a platypus Table. The header row plus body rows
+    # [start, stop) are shown; splitting only picks a new stop row, so a
+    # table running over many pages is never re-measured.
+    def __init__(self, layout, start=1, stop=None):
+        super().__init__()
+        self.layout = layout
+        self.start = start
+        self.stop = len(layout.plans) if stop is None else stop
+        self.hAlign = "LEFT"
+        self.width = layout.width
+        self.height = (
+            layout.row_heights[0] + layout.offsets[self.stop] - layout.offsets[self.start]
+        )
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def split(self, available_width, available_height):
+        layout = self.layout
+        limit = layout.offsets[self.start] + available_height - layout.row_heights[0]
+        stop = bisect_right(layout.offsets, limit, self.start, self.stop + 1) - 1
+        if stop <= self.start:
+            return []
+        if stop >= self.stop:
+            return [self]
+        return [
+            _CanvasGrid(layout, self.start, stop),
+            _CanvasGrid(layout, stop, self.stop),
+        ]
+
+    def _row_positions(self):
+        layout = self.layout
+        y = self.height
+        positions = []
+        for row_idx in [0, *range(self.start, self.stop)]:
+            height = layout.row_heights[row_idx]
+            y -= height
+            positions.append((row_idx, y, height))
+        return positions
+
+    def draw(self):
+        canv = self.canv
+        layout = self.layout
+        rows = self._row_positions()
+
+        fills = []
+        for row_idx, y, height in rows:
+            if row_idx <= 1:
+                color = colors.lightgrey
+            elif layout.shaded[row_idx]:
+                color = GRID_ROW_SHADE
+            else:
+                continue
+            if fills and fills[-1][0] == color and fills[-1][2] == y + height:
+                fills[-1][2] = y
+                fills[-1][3] += height
+            else:
+                fills.append([color, 0, y, height, layout.width])
+        cells = {}
+        for view_idx, (row_idx, y, height) in enumerate(rows):
+            for col_idx, color in layout.highlights[row_idx]:
+                cells[(col_idx, view_idx)] = color
+        for c0, r0, c1, r1, color in _cell_spans(cells):
+            x = layout.col_positions[c0]
+            bottom = rows[r1][1]
+            fills.append(
+                [
+                    color,
+                    x,
+                    bottom,
+                    rows[r0][1] + rows[r0][2] - bottom,
+                    layout.col_positions[c1 + 1] - x,
+                ]
+            )
+        current = None
+        for color, x, y, height, width in fills:
+            if color != current:
+                canv.setFillColor(color)
+                current = color
+            canv.rect(x, y, width, height, stroke=0, fill=1)
+
+        self._draw_cells(canv, layout, rows)
+        self._draw_lines(canv, layout, rows)
+
+    def _draw_cells(self, canv, layout, rows):
+        font_size = layout.font_size
+        leading = layout.leading
+        para_leading = layout.cell_style.leading
+        text = canv.beginText()
+        current_font = None
+        current_color = None
+        strikes = []
+        flowables = []
+        for row_idx, y, height in rows:
+            plans = layout.plans[row_idx]
+            for col_idx, plan in enumerate(plans):
+                kind = plan[0]
+                col_x = layout.col_positions[col_idx]
+                col_width = layout.col_widths[col_idx]
+                if kind == "s":
+                    lines = plan[1]
+                    if len(lines) == 1 and not lines[0]:
+                        continue
+                    font = plan[2]
+                    if current_color is not colors.black:
+                        text.setFillColor(colors.black)
+                        current_color = colors.black
+                    if font != current_font:
+                        text.setFont(font, font_size, leading)
+                        current_font = font
+                    baseline = y + (height + len(lines) * leading) / 2 - font_size
+                    for line in lines:
+                        line_width = _string_width(line, font, font_size)
+                        if col_idx == 0:
+                            line_x = col_x + col_width - GRID_PADDING - line_width
+                        else:
+                            line_x = col_x + (col_width - line_width) / 2
+                        text.setTextOrigin(line_x, baseline)
+                        text.textOut(line)
+                        baseline -= leading
+                elif kind == "r":
+                    runs, width = plan[1], plan[2]
+                    start_x = col_x + (col_width - width) / 2
+                    baseline = y + (height + para_leading) / 2 - font_size
+                    for offset, run_text, font, color, struck in runs:
+                        if color != current_color:
+                            text.setFillColor(color)
+                            current_color = color
+                        if font != current_font:
+                            text.setFont(font, font_size, leading)
+                            current_font = font
+                        run_x = start_x + offset
+                        text.setTextOrigin(run_x, baseline)
+                        text.textOut(run_text)
+                        if struck:
+                            run_width = _string_width(run_text, font, font_size)
+                            strikes.append(
+                                (color, run_x, baseline + 0.25 * font_size, run_x + run_width)
+                            )
+                else:
+                    flowable, width, flow_height = plan[1], plan[2], plan[3]
+                    flowables.append(
+                        (
+                            flowable,
+                            col_x + (col_width - width) / 2,
+                            y + (height - flow_height) / 2,
+                        )
+                    )
+        canv.drawText(text)
+
+        if strikes:
+            canv.setLineWidth(1)
+            for color, x1, y1, x2 in strikes:
+                canv.setStrokeColor(color)
+                canv.line(x1, y1, x2, y1)
+        for flowable, x, y in flowables:
+            flowable.drawOn(canv, x, y)
+
+    def _draw_lines(self, canv, layout, rows):
+        canv.setStrokeColor(GRID_LINE_COLOR)
+        canv.setLineWidth(GRID_LINE_WIDTH)
+        canv.setLineCap(1)
+        canv.setLineJoin(1)
+        path = canv.beginPath()
+        for x in layout.col_positions:
+            path.moveTo(x, self.height)
+            path.lineTo(x, 0)
+        rules = set()
+        for row_idx, y, height in rows:
+            if layout.line_above[row_idx]:
+                rules.add(y + height)
+            if layout.line_below[row_idx]:
+                rules.add(y)
+        # Like a split Table, a rule on the row either side of a page break is
+        # drawn on both pages.
+        if self.start > 1 and layout.line_below[self.start - 1]:
+            rules.add(self.height - layout.row_heights[0])
+        if self.stop < len(layout.plans) and layout.line_above[self.stop]:
+            rules.add(0)
+        for y in sorted(rules):
+            path.moveTo(0, y)
+            path.lineTo(layout.width, y)
+        canv.drawPath(path, stroke=1, fill=0)
+
+
+def resolve_pdf_renderer(renderer, tables):
+    renderer = (renderer or "platypus").strip().lower()
+    if renderer not in PDF_RENDERERS:
+        raise ValueError(f"Unknown PDF renderer: {renderer}")
+    if renderer != "auto":
+        return renderer
+    cells = 0
+    for table in tables:
+        rows = table.get("rows") or ()
+        cells += len(table.get("headers") or ()) * len(rows)
+    return "canvas" if cells >= CANVAS_RENDERER_MIN_CELLS else "platypus"
+
+
+@sampled
+def build_timetable_pdf(
+    tables, meta=None, renderer=None, progress=None, output=None, timings=None
+):
+    # With an output file the PDF is written there and None is returned.
+    # A timings dict receives the "layout" and "render" seconds.
+    started = time.perf_counter()
+    renderer = resolve_pdf_renderer(renderer, tables)
+    return _build_pdf(
+        [(table, None) for table in tables],
+        meta,
+        renderer,
+        progress=progress,
+        output=output,
+        timings=timings,
+        started=started,
+    )
+
+
+# Inputs smaller than this render faster serially than the pool can start,
+# pickle and merge them.
+PDF_PARALLEL_MIN_CELLS = 20000
+
+
+@sampled
+def build_timetable_pdf_parallel(
+    tables,
+    meta=None,
+    renderer=None,
+    executor=None,
+    workers=1,
+    progress=None,
+    output=None,
+    timings=None,
+):
+    """Render batches of tables/column chunks on ``executor`` and merge them.
+
+    Each batch starts on a new page, so the result can run to a few more
+    pages than build_timetable_pdf's; page numbers are stamped across the
+    merged document afterwards. Progress is reported as batches finish, and
+    timings receives the "render" (all batches) and "merge" seconds. Falls
+    back to build_timetable_pdf when there is no executor or the input is too
+    small to be worth splitting.
+    """
+    started = time.perf_counter()
+    renderer = resolve_pdf_renderer(renderer, tables)
+    batches = _parallel_batches(tables, workers) if executor is not None else []
+    if len(batches) < 2:
+        return _build_pdf(
+            [(table, None) for table in tables],
+            meta,
+            renderer,
+            progress=progress,
+            output=output,
+            timings=timings,
+            started=started,
+        )
+    futures = {
+        executor.submit(_render_pdf_part, batch, meta, renderer, idx == 0): cells
+        for idx, (batch, cells) in enumerate(batches)
+    }
+    total = sum(futures.values())
+    done = 0
+    for future in as_completed(futures):
+        done += futures[future]
+        if progress is not None:
+            progress(done / total)
+    parts = [future.result() for future in futures]
+    merging = time.perf_counter()
+    result = _merge_pdf_parts(parts, meta, output)
+    if timings is not None:
+        timings["render"] = merging - started
+        timings["merge"] = time.perf_counter() - merging
+    return result
+
+
+def _render_pdf_part(parts, meta, renderer, heading):
+    return _build_pdf(parts, meta, renderer, heading=heading, page_numbers=False)
+
+
+def _parallel_batches(tables, workers):
+    # (batch, cells) pairs; a batch is a list of (table, chunk positions).
+    units = []
+    for table in tables:
+        col_widths, chunks = _table_chunks(table)
+        row_count = len(table.get("rows", []))
+        for pos, chunk in enumerate(chunks):
+            units.append((table, pos, len(chunk) * row_count))
+    total = sum(cells for _, _, cells in units)
+    count = min(workers, len(units))
+    if count < 2 or total < PDF_PARALLEL_MIN_CELLS:
+        return []
+
+    # Contiguous batches of roughly equal size keep the document order and
+    # let consecutive chunks share pages as they would when rendered serially.
+    batches = []
+    batch = []
+    batch_cells = 0
+    done = 0
+    for table, pos, cells in units:
+        if batch and done >= total * (len(batches) + 1) / count:
+            batches.append((batch, batch_cells))
+            batch = []
+            batch_cells = 0
+        if batch and batch[-1][0] is table:
+            batch[-1][1].append(pos)
+        else:
+            batch.append((table, [pos]))
+        batch_cells += cells
+        done += cells
+    batches.append((batch, batch_cells))
+    return batches
+
+
+def _page_number_overlay(count):
+    # One page per number, drawn exactly as the serial footer draws it.
+    buffer = io.BytesIO()
+    overlay = Canvas(buffer, pagesize=A4)
+    for number in range(1, count + 1):
+        overlay.setFont("Helvetica", 8)
+        _draw_page_number(overlay, number)
+        overlay.showPage()
+    overlay.save()
+    return buffer.getvalue()
+
+
+def _stamp_page_numbers(writer):
+    from pypdf import PdfReader
+
+    overlay = PdfReader(io.BytesIO(_page_number_overlay(len(writer.pages))))
+    for page, number_page in zip(writer.pages, overlay.pages):
+        page.merge_page(number_page)
+        # Merging leaves the combined content stream uncompressed.
+        page.compress_content_streams()
+
+
+def _merge_pdf_parts(parts, meta, output=None):
+    from pypdf import PdfReader, PdfWriter
+
+    meta = meta or {}
+    writer = PdfWriter()
+    for part in parts:
+        writer.append(PdfReader(io.BytesIO(part)))
+    _stamp_page_numbers(writer)
+
+    doc_title = _cell_text(meta.get("title", "")).strip()
+    pdf_document_title = _cell_text(
+        meta.get("documentTitle") or doc_title or "Paper Timetable"
+    ).strip()
+    writer.add_metadata(
+        {
+            "/Title": pdf_document_title,
+            "/Author": "Paper Timetable Generator",
+            "/Subject": pdf_document_title or "Rail timetable",
+            "/Creator": "Paper Timetable Generator",
+        }
+    )
+    if output is not None:
+        writer.write(output)
+        return None
+    buffer = io.BytesIO()
+    writer.write(buffer)
+    return buffer.getvalue()
+
+
+def _draw_page_number(canvas, number):
+    canvas.drawRightString(PAGE_WIDTH - PAGE_MARGIN, PAGE_MARGIN - 18, f"Page {number}")
+
+
+def _table_chunks(table, font_name="Helvetica", font_size=8, width=PAGE_WIDTH - 2 * PAGE_MARGIN):
+    headers = table.get("headers", [])
+    rows = table.get("rows", [])
+    if not headers or not rows:
+        return [], []
+    col_widths = _calc_col_widths(headers, rows, font_name, font_size)
+    return col_widths, _split_columns(col_widths, width)
+
+
+def _build_pdf(
+    parts,
+    meta,
+    renderer,
+    heading=True,
+    page_numbers=True,
+    progress=None,
+    output=None,
+    timings=None,
+    started=None,
+):
+    # parts is a list of (table, chunk positions or None for all chunks).
+    started = time.perf_counter() if started is None else started
     meta = meta or {}
     doc_title = _cell_text(meta.get("title", "")).strip()
     doc_subtitle = _cell_text(meta.get("subtitle", "")).strip()
@@ -263,49 +1195,24 @@ def build_timetable_pdf(tables, meta=None):
         meta.get("documentTitle") or doc_title or "Paper Timetable"
     ).strip()
 
-    buffer = io.BytesIO()
+    buffer = output if output is not None else io.BytesIO()
     doc = SimpleDocTemplate(
         buffer,
         pagesize=A4,
-        leftMargin=36,
-        rightMargin=36,
-        topMargin=36,
-        bottomMargin=36,
+        leftMargin=PAGE_MARGIN,
+        rightMargin=PAGE_MARGIN,
+        topMargin=PAGE_MARGIN,
+        bottomMargin=PAGE_MARGIN,
     )
-    styles = getSampleStyleSheet()
-    doc_title_style = styles["Heading2"]
-    doc_title_style.fontSize = doc_title_style.fontSize * 1.5
-    doc_subtitle_style = styles["Normal"]
-    title_style = styles["Heading3"]
-    title_style.fontName = "Helvetica-Bold"
-    title_style.spaceAfter = 6
     font_name = "Helvetica"
     font_size = 8
-    key_style = ParagraphStyle(
-        "Key",
-        parent=styles["Normal"],
-        fontName="Helvetica",
-        fontSize=8.5,
-        leading=10,
-    )
-    key_label_style = ParagraphStyle(
-        "KeyLabel",
-        parent=key_style,
-        fontName="Helvetica-Bold",
-        spaceAfter=2,
-    )
-    cell_style = ParagraphStyle(
-        "Cell",
-        parent=styles["Normal"],
-        fontName=font_name,
-        fontSize=font_size,
-        leading=font_size + 2,
-        spaceBefore=0,
-        spaceAfter=0,
-        leftIndent=0,
-        rightIndent=0,
-        alignment=1,
-    )
+    styles = _render_styles(font_name, font_size)
+    doc_title_style = styles["doc_title"]
+    doc_subtitle_style = styles["doc_subtitle"]
+    title_style = styles["title"]
+    key_style = styles["key"]
+    key_label_style = styles["key_label"]
+    cell_style = styles["cell"]
 
     elements = []
 
@@ -318,34 +1225,25 @@ def build_timetable_pdf(tables, meta=None):
         if hasattr(canvas, "setCreator"):
             canvas.setCreator("Paper Timetable Generator")
         footer_text = "Created by Paper Timetable Generator using RTT data"
-        page_text = f"Page {doc.page}"
         y = doc.bottomMargin - 18
         canvas.setFont(font_name, 8)
         canvas.drawString(doc.leftMargin, y, footer_text)
-        canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, y, page_text)
+        if page_numbers:
+            _draw_page_number(canvas, doc.page)
         canvas.restoreState()
 
-    if doc_title:
+    if heading and doc_title:
         elements.append(Paragraph(doc_title, doc_title_style))
-    if doc_title and doc_subtitle:
+    if heading and doc_title and doc_subtitle:
         elements.append(Spacer(1, 8))
-    if doc_subtitle:
+    if heading and doc_subtitle:
         elements.append(Paragraph(doc_subtitle, doc_subtitle_style))
         elements.append(Spacer(1, 6))
 
-    assets_dir = os.path.join(os.path.dirname(__file__), "docs", "icons")
     icon_size = 11
-    icon_map = {
-        "FC": _load_svg_icon(os.path.join(assets_dir, "first-class.svg"), icon_size),
-        "SL": _load_svg_icon(os.path.join(assets_dir, "bed.svg"), icon_size),
-        "BUS": _load_svg_icon(os.path.join(assets_dir, "bus.svg"), icon_size),
-        "WALK": _load_svg_icon(os.path.join(assets_dir, "walk.svg"), icon_size),
-        "LU": _load_svg_icon(os.path.join(assets_dir, "lu.svg"), icon_size),
-        "TRAM": _load_svg_icon(os.path.join(assets_dir, "tram.svg"), icon_size),
-        "DLR": _load_svg_icon(os.path.join(assets_dir, "dlr.svg"), icon_size),
-    }
+    icon_map = _load_icon_map(icon_size)
 
-    for table in tables:
+    for table, chunk_filter in parts:
         base_title = _cell_text(table.get("title", "")).strip()
         date_label = _cell_text(table.get("dateLabel", "")).strip()
         service_times = table.get("serviceTimes", [])
@@ -355,8 +1253,9 @@ def build_timetable_pdf(tables, meta=None):
         if not headers or not rows:
             continue
 
-        col_widths = _calc_col_widths(headers, rows, font_name, font_size)
-        chunk_indices = _split_columns(col_widths, doc.width)
+        col_widths, chunk_indices = _table_chunks(table, font_name, font_size, doc.width)
+        if chunk_filter is not None:
+            chunk_indices = [chunk_indices[pos] for pos in chunk_filter]
 
         for chunk in chunk_indices:
             chunk_times = [
@@ -495,47 +1394,6 @@ def build_timetable_pdf(tables, meta=None):
                     )
                 )
 
-            highlight_styles = []
-            data_rows = []
-            for row_idx, row in enumerate(chunk_rows):
-                row_label = _cell_text(row[0]).strip() if row else ""
-                is_crs_row = row_label in {"Comes from", "Continues to"}
-                row_cells = []
-                for col_idx, cell in enumerate(row):
-                    if isinstance(cell, dict):
-                        plain = _cell_text(cell)
-                        if is_crs_row and col_idx > 0 and plain:
-                            row_cells.append(
-                                Paragraph(f"<i>{plain}</i>", cell_style)
-                            )
-                        else:
-                            formatted = _format_cell_text(cell)
-                            if formatted != plain:
-                                row_cells.append(Paragraph(formatted, cell_style))
-                            else:
-                                row_cells.append(plain)
-                        bg_color = cell.get("bgColor")
-                        if bg_color:
-                            highlight_styles.append(
-                                (
-                                    col_idx,
-                                    row_idx + 1,
-                                    colors.HexColor(bg_color),
-                                )
-                            )
-                    else:
-                        plain = _cell_text(cell)
-                        if is_crs_row and col_idx > 0 and plain:
-                            row_cells.append(
-                                Paragraph(f"<i>{plain}</i>", cell_style)
-                            )
-                        else:
-                            row_cells.append(
-                                _build_facilities_cell(cell, icon_map, icon_size)
-                            )
-                data_rows.append(row_cells)
-
-            data = [chunk_headers] + data_rows
             chunk_widths = [col_widths[i] for i in chunk]
 
             if title:
@@ -589,75 +1447,18 @@ def build_timetable_pdf(tables, meta=None):
                     crs_label_height + crs_para.wrap(doc.width, doc.height)[1] + 4
                 )
 
-            pdf_table = Table(data, colWidths=chunk_widths, repeatRows=1, hAlign="LEFT")
-            line_color = colors.grey
-            line_width = 0.5
-            row_shade = colors.Color(250 / 255, 246 / 255, 239 / 255)
-            table_style = [
-                ("FONT", (0, 0), (-1, -1), font_name, font_size),
-                ("FONTNAME", (0, 0), (-1, 1), "Helvetica-Bold"),
-                ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
-                ("BACKGROUND", (0, 1), (-1, 1), colors.lightgrey),
-                ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-                ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-                ("ALIGN", (0, 0), (0, -1), "RIGHT"),
-                ("LINEBEFORE", (0, 0), (-1, -1), line_width, line_color),
-                ("LINEAFTER", (0, 0), (-1, -1), line_width, line_color),
-                ("LEFTPADDING", (0, 0), (-1, -1), 2),
-                ("RIGHTPADDING", (0, 0), (-1, -1), 2),
-                ("TOPPADDING", (0, 0), (-1, -1), 2),
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
-            ]
-
-            if len(rows) >= 1:
-                table_style.append(
-                    ("LINEBELOW", (0, 1), (-1, 1), line_width, line_color)
-                )
-
-            for row_idx, row in enumerate(rows):
-                label = _cell_text(row[0]).strip() if row else ""
-                data_row_idx = row_idx + 1
-                if row_idx >= 1 and (row_idx - 1) % 2 == 1:
-                    table_style.append(
-                        ("BACKGROUND", (0, data_row_idx), (-1, data_row_idx), row_shade)
+            if renderer == "canvas":
+                pdf_table = _CanvasGrid(
+                    _GridLayout(
+                        chunk_headers, chunk_rows, chunk_widths, icon_map, icon_size,
+                        cell_style, font_name, font_size,
                     )
-                if label == "Comes from":
-                    table_style.append(
-                        (
-                            "LINEBELOW",
-                            (0, data_row_idx),
-                            (-1, data_row_idx),
-                            line_width,
-                            line_color,
-                        )
-                    )
-                if label == "Continues to":
-                    table_style.append(
-                        (
-                            "LINEABOVE",
-                            (0, data_row_idx),
-                            (-1, data_row_idx),
-                            line_width,
-                            line_color,
-                        )
-                    )
-                if label.endswith("(dep)"):
-                    table_style.append(
-                        (
-                            "LINEABOVE",
-                            (0, data_row_idx),
-                            (-1, data_row_idx),
-                            line_width,
-                            line_color,
-                        )
-                    )
-
-            for col_idx, row_idx, color in highlight_styles:
-                table_style.append(
-                    ("BACKGROUND", (col_idx, row_idx), (col_idx, row_idx), color)
                 )
-
-            pdf_table.setStyle(TableStyle(table_style))
+            else:
+                pdf_table = _build_platypus_grid(
+                    chunk_headers, chunk_rows, rows, chunk_widths, icon_map,
+                    icon_size, cell_style, font_name, font_size,
+                )
             table_height = pdf_table.wrap(doc.width, doc.height)[1]
             spacer_height = 14
             elements.append(
@@ -679,7 +1480,30 @@ def build_timetable_pdf(tables, meta=None):
             elements.append(Spacer(1, spacer_height))
 
     if not elements:
-        elements.append(Paragraph("No timetable data provided.", styles["Normal"]))
+        elements.append(Paragraph("No timetable data provided.", styles["normal"]))
 
+    if progress is not None:
+        doc.setProgressCallBack(_progress_callback(progress))
+    building = time.perf_counter()
     doc.build(elements, onFirstPage=draw_footer, onLaterPages=draw_footer)
+    memory_checkpoint()
+    if timings is not None:
+        timings["layout"] = building - started
+        timings["render"] = time.perf_counter() - building
+    if output is not None:
+        return None
     return buffer.getvalue()
+
+
+def _progress_callback(progress):
+    # reportlab reports flowables consumed; a split table re-queues its
+    # remainder, so this is only a rough fraction of the document.
+    total = [0]
+
+    def callback(kind, value):
+        if kind == "SIZE_EST":
+            total[0] = value
+        elif kind == "PROGRESS" and total[0]:
+            progress(min(1.0, max(0.0, value / total[0])))
+
+    return callback
@@ -0,0 +1,194 @@
+"""Opt-in stack sampling of individual requests, written as collapsed stacks.
+
+A profiled request gets a helper thread that snapshots the request thread's
+stack every few milliseconds. The counts are written one ``frame;frame;...
+count`` line per distinct stack, the format flamegraph.pl and speedscope
+read. Nothing runs for requests that are not profiled, and nothing at all
+while profiling is disabled.
+
+Work done outside the request thread (PDF worker processes, export job
+threads, a streamed response body) is not sampled.
+"""
+
+import hmac
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+
+
+PROFILE_EXTENSION = ".collapsed"
+PROFILE_NAME_RE = re.compile(r"^[\w-]+\.collapsed$")
+SETTINGS_NAME = "settings.json"
+# Seconds between checks of the shared settings file.
+SETTINGS_CHECK_INTERVAL = 5.0
+
+
+class StackSampler:
+    def __init__(self, name, thread_id, interval):
+        self.name = name
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="request-profiler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                name = getattr(code, "co_qualname", code.co_name)
+                stack.append(f"{os.path.basename(code.co_filename)}:{name}")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def collapsed(self):
+        return "".join(
+            f"{stack} {count}\n" for stack, count in sorted(self.counts.items())
+        )
+
+
+class RequestProfiler:
+    def __init__(
+        self,
+        directory,
+        secret=None,
+        sample_rate=0.0,
+        interval=0.005,
+        max_files=200,
+        logger=None,
+    ):
+        self.directory = directory
+        self.secret = secret or None
+        self.default_sample_rate = sample_rate
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.max_files = max_files
+        self.logger = logger
+        self._settings_checked = 0.0
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        # Without a secret the rate can only come from the environment.
+        return self.secret is not None or self.sample_rate > 0
+
+    def authorized(self, token):
+        return (
+            self.secret is not None
+            and token is not None
+            and hmac.compare_digest(token.encode(), self.secret.encode())
+        )
+
+    def sampled(self):
+        if self.secret is not None:
+            self._maybe_load_settings()
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def _settings_path(self):
+        return os.path.join(self.directory, SETTINGS_NAME)
+
+    def _maybe_load_settings(self):
+        now = time.monotonic()
+        if now - self._settings_checked < SETTINGS_CHECK_INTERVAL:
+            return
+        self._settings_checked = now
+        try:
+            with open(self._settings_path(), encoding="utf-8") as f:
+                settings = json.load(f)
+            self.sample_rate = float(settings["sampleRate"])
+        except FileNotFoundError:
+            self.sample_rate = self.default_sample_rate
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            if self.logger:
+                self.logger.warning("Could not read profiler settings: %s", exc)
+
+    def set_sample_rate(self, rate):
+        """Share a new sample rate with every worker, or None for the default."""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._settings_path()
+        if rate is None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.sample_rate = self.default_sample_rate
+        else:
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                json.dump({"sampleRate": rate}, f)
+            os.replace(f"{path}.tmp", path)
+            self.sample_rate = rate
+        self._settings_checked = time.monotonic()
+
+    def start(self, route):
+        """Start sampling the calling thread; the profile is named for route."""
+        with self._lock:
+            self._counter += 1
+            counter = self._counter
+        now = time.time()
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(now))
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", route).strip("-") or "root"
+        name = (
+            f"{stamp}{int(now % 1 * 1000):03d}Z-{slug}-{os.getpid()}-{counter}"
+            f"{PROFILE_EXTENSION}"
+        )
+        sampler = StackSampler(name, threading.get_ident(), self.interval)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler):
+        sampler.stop()
+        path = os.path.join(self.directory, sampler.name)
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+                f.write(sampler.collapsed())
+            os.replace(f"{path}.tmp", path)
+        except OSError as exc:
+            if self.logger:
+                self.logger.warning("Could not write profile %s: %s", path, exc)
+            return
+        self._prune()
+
+    def profiles(self):
+        """``(name, size, modified)`` of each stored profile, newest first."""
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        found = []
+        for name in names:
+            if not PROFILE_NAME_RE.match(name):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((name, stat.st_size, stat.st_mtime))
+        # Names start with their UTC timestamp, so they sort by age.
+        found.sort(reverse=True)
+        return found
+
+    def _prune(self):
+        for name, _, _ in self.profiles()[self.max_files :]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
@@ -0,0 +1,140 @@
+"""JSON request bodies sent with ``Content-Encoding: gzip`` or ``deflate``.
+
+Export payloads are large and repetitive, so clients may compress them.
+Bodies are inflated as they are read, a bounded step at a time. A body that
+passes the size or compression ratio limit is refused at that point, before
+the rest of it has been inflated.
+"""
+
+import json
+import zlib
+
+
+READ_CHUNK_BYTES = 64 * 1024
+INFLATE_STEP_BYTES = 256 * 1024
+# Small bodies (mostly empty grids) can legitimately compress far better than
+# any sensible ratio limit, so the ratio is only checked past this size.
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+CONTENT_ENCODINGS = ("identity", "gzip", "x-gzip", "deflate")
+# Every 400 for a body that would not inflate starts with this, so clients
+# can tell it apart from a payload the export itself rejected.
+UNDECOMPRESSABLE = "Request body could not be decompressed"
+
+
+class RequestBodyError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _content_encoding(header):
+    encodings = [
+        encoding.strip().lower()
+        for encoding in (header or "").split(",")
+        if encoding.strip() and encoding.strip().lower() != "identity"
+    ]
+    if len(encodings) > 1:
+        raise RequestBodyError("Only one Content-Encoding is supported", 415)
+    encoding = encodings[0] if encodings else "identity"
+    if encoding not in CONTENT_ENCODINGS:
+        raise RequestBodyError(f"Unsupported Content-Encoding: {encoding}", 415)
+    return encoding
+
+
+def _read_chunks(stream, counter):
+    while True:
+        chunk = stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return
+        counter[0] += len(chunk)
+        yield chunk
+
+
+def _is_zlib_header(data):
+    return len(data) >= 2 and data[0] & 0x0F == 8 and (data[0] << 8 | data[1]) % 31 == 0
+
+
+def _inflate(chunks, encoding):
+    gzip = encoding != "deflate"
+    decoder = None
+    for chunk in chunks:
+        while chunk:
+            if decoder is None:
+                # HTTP deflate should be zlib-wrapped, but some clients send
+                # raw deflate streams; the two are told apart by the header.
+                if gzip:
+                    wbits = 16 + zlib.MAX_WBITS
+                else:
+                    wbits = zlib.MAX_WBITS if _is_zlib_header(chunk) else -zlib.MAX_WBITS
+                decoder = zlib.decompressobj(wbits)
+            try:
+                data = decoder.decompress(chunk, INFLATE_STEP_BYTES)
+            except zlib.error:
+                raise RequestBodyError(UNDECOMPRESSABLE) from None
+            chunk = decoder.unconsumed_tail
+            if decoder.eof:
+                chunk = decoder.unused_data
+                if chunk and not gzip:
+                    raise RequestBodyError(
+                        f"{UNDECOMPRESSABLE}: data follows the deflate stream"
+                    )
+                # gzip bodies may hold several members back to back.
+                decoder = None
+            if data:
+                yield data
+    if decoder is not None:
+        data = decoder.flush()
+        if data:
+            yield data
+        if not decoder.eof:
+            raise RequestBodyError(f"{UNDECOMPRESSABLE}: it is truncated")
+
+
+def read_body(
+    stream, content_encoding=None, content_length=None, max_bytes=None, max_ratio=None
+):
+    """The decoded body of a request, as a bytearray, within the given limits.
+
+    ``max_bytes`` bounds the body after decompression; ``max_ratio`` bounds
+    decompressed size over compressed size. Either may be None or 0 for no
+    limit. Raises RequestBodyError carrying the HTTP status to answer with.
+    """
+    encoding = _content_encoding(content_encoding)
+    too_large = f"Request body is larger than {max_bytes} bytes"
+    if max_bytes and content_length and content_length > max_bytes:
+        raise RequestBodyError(too_large, 413)
+
+    read = [0]
+    chunks = _read_chunks(stream, read)
+    if encoding != "identity":
+        chunks = _inflate(chunks, encoding)
+    body = bytearray()
+    for chunk in chunks:
+        body += chunk
+        if max_bytes and len(body) > max_bytes:
+            if encoding != "identity":
+                too_large = f"{too_large} once decompressed"
+            raise RequestBodyError(too_large, 413)
+        if (
+            max_ratio
+            and encoding != "identity"
+            and len(body) > RATIO_CHECK_MIN_BYTES
+            and len(body) > max_ratio * read[0]
+        ):
+            raise RequestBodyError(
+                f"Request body decompresses more than {max_ratio:g} times over", 413
+            )
+    return body
+
+
+def read_json_body(
+    stream, content_encoding=None, content_length=None, max_bytes=None, max_ratio=None
+):
+    """The parsed JSON body of a request, or None when it is empty."""
+    body = read_body(stream, content_encoding, content_length, max_bytes, max_ratio)
+    if not body.strip():
+        return None
+    try:
+        return json.loads(body)
+    except ValueError as exc:
+        raise RequestBodyError(f"Request body is not valid JSON: {exc}") from None
@@ -3,4 +3,5 @@
 SCRIPT_DIR=$(cd -- "$(dirname -- "${BASH_SOURCE[0]}")" &> /dev/null && pwd)
 PYTHON_CMD="python3"
 
+$PYTHON_CMD -m pytest -q "$SCRIPT_DIR/tests" || exit
 $PYTHON_CMD "$SCRIPT_DIR/tests/run_cached_timetable_tests.py"
@@ -0,0 +1,57 @@
+"""Per-phase timings of a request, for the Server-Timing header and logs.
+
+Phases are kept on ``flask.g``, so only work done in the request thread
+is recorded; timings taken elsewhere (export job threads, PDF worker
+processes) are dropped. A phase that runs more than once adds up.
+"""
+
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context
+
+
+def record(name, seconds):
+    if not has_request_context():
+        return
+    timings = g.get("server_timings")
+    if timings is None:
+        timings = g.server_timings = {}
+    timings[name] = timings.get(name, 0.0) + seconds
+
+
+def record_all(timings):
+    for name, seconds in (timings or {}).items():
+        record(name, seconds)
+
+
+@contextmanager
+def phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def current():
+    if not has_request_context():
+        return {}
+    return g.get("server_timings") or {}
+
+
+def header_value(timings, total=None):
+    entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+def log_fields(timings, total=None):
+    fields = {
+        f"{name.replace('-', '_')}_ms": round(seconds * 1000, 1)
+        for name, seconds in timings.items()
+    }
+    if total is not None:
+        fields["total_ms"] = round(total * 1000, 1)
+    return " ".join(f"{key}={value}" for key, value in fields.items())
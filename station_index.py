@@ -0,0 +1,362 @@
+"""Precomputed search index for the station autocomplete.
+
+Every match tier used by ``/api/stations`` is answered from sorted arrays
+built once at load time, so a query only touches the stations that can
+actually appear in the results. Typos are handled by a symmetric-delete
+dictionary over name words, consulted only once the exact tiers run dry.
+Nearest-station lookups use a k-d tree over unit-sphere coordinates.
+"""
+
+import heapq
+import math
+import re
+from bisect import bisect_left, bisect_right
+from heapq import nsmallest
+
+
+_RANGE_END = "\uffff"
+FUZZY_MAX_DISTANCE = 2
+EARTH_RADIUS_KM = 6371.0088
+
+
+def norm_station_query(value):
+    value = (value or "").lower()
+    value = value.replace("&", "and")
+    value = re.sub(r"[^a-z0-9 ]+", " ", value)
+    value = re.sub(r"\s+", " ", value).strip()
+    return value
+
+
+def build_station_entries(stations):
+    entries = []
+    for st in stations:
+        if not st.get("crsCode"):
+            continue
+        name_n = norm_station_query(st["stationName"])
+        crs_n = st["crsCode"].lower()
+        entries.append(
+            {
+                "stationName": st["stationName"],
+                "crsCode": st["crsCode"],
+                "_name_n": name_n,
+                "_crs_n": crs_n,
+                "_n": name_n + " " + crs_n,
+            }
+        )
+    return entries
+
+
+def _fuzzy_distance_limit(token):
+    if len(token) < 4:
+        return 0
+    if len(token) < 8:
+        return 1
+    return FUZZY_MAX_DISTANCE
+
+
+def _deletes(word, max_distance):
+    found = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            if len(item) <= 1:
+                continue
+            for pos in range(len(item)):
+                next_frontier.add(item[:pos] + item[pos + 1:])
+        next_frontier -= found
+        found |= next_frontier
+        frontier = next_frontier
+    return found
+
+
+def _edit_distance(a, b, max_distance):
+    # Optimal string alignment distance (Levenshtein plus adjacent
+    # transpositions), abandoned as soon as it must exceed max_distance.
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (
+                prev_prev is not None
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                cur[j] = min(cur[j], prev_prev[j - 2] + 1)
+        if min(cur) > max_distance:
+            return None
+        prev_prev, prev = prev, cur
+    return prev[-1] if prev[-1] <= max_distance else None
+
+
+def _sorted_pairs(pairs):
+    pairs = sorted(pairs)
+    return [key for key, _ in pairs], [idx for _, idx in pairs]
+
+
+def _prefix_range(keys, values, prefix):
+    lo = bisect_left(keys, prefix)
+    hi = bisect_right(keys, prefix + _RANGE_END, lo)
+    return values[lo:hi]
+
+
+class StationSearchIndex:
+    # Match tiers, best first. They mirror the original linear scorer:
+    #   0 CRS equals query          5 query inside name
+    #   1 name equals query         6 CRS starts with query
+    #   2 name starts with query    7 query inside CRS
+    #   3 a word starts with query  8 query inside "name crs"
+    #   4 query follows a space     9 fuzzy word match (typos)
+    def __init__(self, entries):
+        self.entries = list(entries)
+
+        order = sorted(
+            range(len(self.entries)),
+            key=lambda i: (
+                len(self.entries[i]["stationName"]),
+                self.entries[i]["stationName"],
+            ),
+        )
+        # Ties inside a tier are broken by (name length, name); a precomputed
+        # rank keeps that ordering without re-sorting strings per query.
+        self._rank = [0] * len(self.entries)
+        for rank, idx in enumerate(order):
+            self._rank[idx] = rank
+
+        self._crs_exact = {}
+        self._name_exact = {}
+        names = []
+        inner_words = []
+        name_suffixes = []
+        crs_codes = []
+        crs_suffixes = []
+        text_suffixes = []
+        for idx, st in enumerate(self.entries):
+            name_n = st["_name_n"]
+            crs_n = st["_crs_n"]
+            text_n = st["_n"]
+            self._crs_exact.setdefault(crs_n, []).append(idx)
+            self._name_exact.setdefault(name_n, []).append(idx)
+            names.append((name_n, idx))
+            crs_codes.append((crs_n, idx))
+            for pos in range(1, len(name_n)):
+                if name_n[pos - 1] == " ":
+                    inner_words.append((name_n[pos:], idx))
+            for pos in range(len(name_n)):
+                name_suffixes.append((name_n[pos:], idx))
+            for pos in range(len(crs_n)):
+                crs_suffixes.append((crs_n[pos:], idx))
+            # Suffixes wholly inside the name or the CRS are already covered
+            # above; only those spanning the separator can add tier 8 hits.
+            for pos in range(len(name_n) + 1):
+                text_suffixes.append((text_n[pos:], idx))
+
+        self._names = _sorted_pairs(names)
+        self._inner_words = _sorted_pairs(inner_words)
+        self._name_suffixes = _sorted_pairs(name_suffixes)
+        self._crs_codes = _sorted_pairs(crs_codes)
+        self._crs_suffixes = _sorted_pairs(crs_suffixes)
+        self._text_suffixes = _sorted_pairs(text_suffixes)
+
+        self._word_stations = {}
+        for idx, st in enumerate(self.entries):
+            for word in st["_name_n"].split():
+                self._word_stations.setdefault(word, set()).add(idx)
+        self._words = sorted(self._word_stations)
+        self._word_deletes = {}
+        for word in self._words:
+            for variant in _deletes(word, _fuzzy_distance_limit(word)):
+                self._word_deletes.setdefault(variant, []).append(word)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _tier_candidates(self, qn):
+        yield self._crs_exact.get(qn, ())
+        yield self._name_exact.get(qn, ())
+        yield _prefix_range(*self._names, qn)
+        if " " not in qn:
+            # A word-start suffix begins with a space-free query exactly when
+            # that word does; the first word is already handled by tier 2.
+            yield _prefix_range(*self._inner_words, qn)
+        else:
+            yield ()
+        yield _prefix_range(*self._inner_words, qn)
+        yield _prefix_range(*self._name_suffixes, qn)
+        yield _prefix_range(*self._crs_codes, qn)
+        yield _prefix_range(*self._crs_suffixes, qn)
+        yield _prefix_range(*self._text_suffixes, qn)
+
+    def _fuzzy_words(self, token, allow_prefix):
+        matches = {}
+        if allow_prefix:
+            lo = bisect_left(self._words, token)
+            hi = bisect_right(self._words, token + _RANGE_END, lo)
+            for word in self._words[lo:hi]:
+                matches[word] = 0
+        max_distance = _fuzzy_distance_limit(token)
+        if not max_distance:
+            if token in self._word_stations:
+                matches[token] = 0
+            return matches
+        for variant in _deletes(token, max_distance):
+            for word in self._word_deletes.get(variant, ()):
+                if word in matches:
+                    continue
+                distance = _edit_distance(token, word, max_distance)
+                if distance is not None:
+                    matches[word] = distance
+        return matches
+
+    def _fuzzy_candidates(self, qn):
+        # Every query word must match some name word within its edit budget;
+        # the last word may also be an unfinished prefix. Stations are scored
+        # by the summed distance of their best word per query word.
+        tokens = qn.split()
+        distances = None
+        for pos, token in enumerate(tokens):
+            words = self._fuzzy_words(token, allow_prefix=pos == len(tokens) - 1)
+            token_best = {}
+            for word, distance in words.items():
+                for idx in self._word_stations[word]:
+                    if distance < token_best.get(idx, distance + 1):
+                        token_best[idx] = distance
+            if distances is None:
+                distances = token_best
+            else:
+                distances = {
+                    idx: distances[idx] + distance
+                    for idx, distance in token_best.items()
+                    if idx in distances
+                }
+            if not distances:
+                return {}
+        return distances or {}
+
+    def search(self, qn, limit=20, fuzzy=True):
+        if not qn or limit <= 0:
+            return []
+
+        seen = set()
+        picked = []
+        for candidates in self._tier_candidates(qn):
+            tier = {idx for idx in candidates if idx not in seen}
+            if not tier:
+                continue
+            seen.update(tier)
+            remaining = limit - len(picked)
+            picked.extend(nsmallest(remaining, tier, key=self._rank.__getitem__))
+            if len(picked) >= limit:
+                return [self.entries[idx] for idx in picked]
+
+        if fuzzy:
+            distances = self._fuzzy_candidates(qn)
+            tier = [idx for idx in distances if idx not in seen]
+            picked.extend(
+                nsmallest(
+                    limit - len(picked),
+                    tier,
+                    key=lambda idx: (distances[idx], self._rank[idx]),
+                )
+            )
+        return [self.entries[idx] for idx in picked]
+
+
+def _unit_vector(lat, lon):
+    lat_r = math.radians(lat)
+    lon_r = math.radians(lon)
+    cos_lat = math.cos(lat_r)
+    return (cos_lat * math.cos(lon_r), cos_lat * math.sin(lon_r), math.sin(lat_r))
+
+
+def _chord_to_km(chord):
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class StationGeoIndex:
+    # Stations are stored as points on the unit sphere so straight-line
+    # (chord) distance orders them exactly like great-circle distance, which
+    # lets a plain 3-d tree answer k-nearest queries anywhere on the globe.
+    def __init__(self, stations):
+        self.entries = []
+        points = []
+        for st in stations:
+            lat = st.get("lat")
+            lon = st.get("long")
+            if not st.get("crsCode") or lat is None or lon is None:
+                continue
+            try:
+                lat = float(lat)
+                lon = float(lon)
+            except (TypeError, ValueError):
+                continue
+            self.entries.append(
+                {
+                    "stationName": st["stationName"],
+                    "crsCode": st["crsCode"],
+                    "lat": lat,
+                    "lon": lon,
+                }
+            )
+            points.append(_unit_vector(lat, lon))
+        self._points = points
+        self._nodes = []
+        self._root = self._build(list(range(len(points))), 0)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return -1
+        axis = depth % 3
+        indices.sort(key=lambda idx: self._points[idx][axis])
+        mid = len(indices) // 2
+        node_id = len(self._nodes)
+        self._nodes.append([indices[mid], axis, -1, -1])
+        self._nodes[node_id][2] = self._build(indices[:mid], depth + 1)
+        self._nodes[node_id][3] = self._build(indices[mid + 1:], depth + 1)
+        return node_id
+
+    def nearest(self, lat, lon, limit=10):
+        if limit <= 0 or self._root < 0:
+            return []
+        target = _unit_vector(lat, lon)
+        best = []
+        stack = [self._root]
+        while stack:
+            node_id = stack.pop()
+            if node_id < 0:
+                continue
+            idx, axis, left, right = self._nodes[node_id]
+            point = self._points[idx]
+            dist_sq = (
+                (point[0] - target[0]) ** 2
+                + (point[1] - target[1]) ** 2
+                + (point[2] - target[2]) ** 2
+            )
+            if len(best) < limit:
+                heapq.heappush(best, (-dist_sq, -idx))
+            elif dist_sq < -best[0][0]:
+                heapq.heapreplace(best, (-dist_sq, -idx))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # The far side is pushed first so the near side is explored
+            # first; it is skipped entirely when the splitting plane lies
+            # beyond the current k-th best distance.
+            if len(best) < limit or diff * diff < -best[0][0]:
+                stack.append(far)
+            stack.append(near)
+
+        results = sorted((-neg_sq, -neg_idx) for neg_sq, neg_idx in best)
+        return [
+            dict(self.entries[idx], distanceKm=round(_chord_to_km(math.sqrt(dist_sq)), 3))
+            for dist_sq, idx in results
+        ]
@@ -0,0 +1,24 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(REPO_ROOT))
+# The synthetic payload generator lives with the benchmarks.
+sys.path.insert(0, str(REPO_ROOT / "benchmarks"))
+
+
+@pytest.fixture(scope="session")
+def app_module():
+    # The app refuses to start without RTT credentials; tests never call RTT.
+    os.environ.setdefault("RTT_TOKEN", "test")
+    import app
+
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
@@ -0,0 +1,87 @@
+import csv
+import io
+import zipfile
+
+from csv_utils import CHUNK_BYTES, csv_files, iter_csv_export, iter_zip
+
+
+TABLE = {
+    "title": "Cambridge to London",
+    "dateLabel": "Monday 11 May 2026",
+    "headcodes": ["", "1A23", "1B45"],
+    "headers": ["Station", {"text": "GR"}, None],
+    "rows": [
+        ["Cambridge", "10:00", {"text": "10:15", "bold": True}],
+        ["London, Kings Cross", "10:50", ""],
+    ],
+}
+
+
+def _export(tables, station_codes=None, toc_codes=None, fmt="csv"):
+    files = csv_files(tables, station_codes, toc_codes, fmt)
+    return b"".join(iter_csv_export(files, fmt))
+
+
+def _unzip(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        return {info.filename: zf.read(info).decode("utf-8") for info in zf.infolist()}
+
+
+def test_single_table_is_a_plain_csv():
+    text = _export([TABLE]).decode("utf-8")
+    assert list(csv.reader(io.StringIO(text))) == [
+        ["Cambridge to London"],
+        ["Monday 11 May 2026"],
+        [],
+        ["", "1A23", "1B45"],
+        ["Station", "GR", ""],
+        ["Cambridge", "10:00", "10:15"],
+        ["London, Kings Cross", "10:50", ""],
+    ]
+    assert text.endswith("\r\n")
+
+
+def test_tsv_uses_tabs():
+    data = _export([{"headers": ["A", "B"], "rows": [["1", "2"]]}], fmt="tsv")
+    assert data == b"A\tB\r\n1\t2\r\n"
+
+
+def test_several_files_are_zipped_with_unique_names():
+    tables = [TABLE, dict(TABLE, title="Cambridge to London"), {"rows": [["x"]]}]
+    members = _unzip(
+        _export(tables, station_codes=[{"code": "CBG", "name": "Cambridge"}])
+    )
+    assert list(members) == [
+        "Cambridge to London.csv",
+        "Cambridge to London 2.csv",
+        "Sheet 3.csv",
+        "Station codes.csv",
+    ]
+    assert members["Sheet 3.csv"] == "x\r\n"
+    assert members["Station codes.csv"] == "Code,Station\r\nCBG,Cambridge\r\n"
+
+
+def test_lookup_files_need_entries():
+    files = csv_files([TABLE], station_codes=[], toc_codes=[["", ""], ["GR", "LNER"]])
+    assert [name for name, _ in files] == ["Cambridge to London.csv", "TOC codes.csv"]
+
+
+def test_large_tables_stream_in_chunks():
+    table = {"headers": ["Station", "Time"], "rows": [["Cambridge", "10:00"]] * 20000}
+    files = csv_files([table])
+    chunks = list(iter_csv_export(files))
+    assert len(chunks) > 1
+    assert all(len(chunk) < CHUNK_BYTES + 100 for chunk in chunks)
+    assert b"".join(chunks).count(b"\r\n") == 20001
+
+
+def test_iter_zip_stores_members_that_are_already_compressed():
+    pdf = [b"%PDF-1.4 ", b"x" * 1000]
+    members = [("timetable.pdf", iter(pdf), False), ("notes.csv", [b"a,b\r\n"], True)]
+    data = b"".join(iter_zip(members))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        pdf_info, csv_info = zf.infolist()
+        assert pdf_info.compress_type == zipfile.ZIP_STORED
+        assert csv_info.compress_type == zipfile.ZIP_DEFLATED
+        assert zf.read("timetable.pdf") == b"".join(pdf)
+        assert zf.read("notes.csv") == b"a,b\r\n"
@@ -0,0 +1,81 @@
+import json
+import os
+
+from data_registry import DataRegistry
+
+
+STATIONS = [{"stationName": "Cambridge", "crsCode": "CBG", "lat": 52.19, "long": 0.14}]
+
+
+def _write(path, data, bump=0):
+    path.write_text(data if isinstance(data, str) else json.dumps(data))
+    # Same-size rewrites within one clock tick would keep the signature.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+def _registry(tmp_path, **kwargs):
+    paths = {
+        "stations": tmp_path / "stations.json",
+        "atoc_codes": tmp_path / "atoc_codes.json",
+        "connections": tmp_path / "connections.json",
+    }
+    _write(paths["stations"], STATIONS)
+    _write(paths["atoc_codes"], {"GR": "LNER"})
+    _write(paths["connections"], {})
+    return DataRegistry(paths, **kwargs), paths
+
+
+def test_reload_swaps_in_a_new_snapshot(tmp_path):
+    registry, paths = _registry(tmp_path)
+    before = registry.current()
+    ely = {"stationName": "Ely", "crsCode": "ELY"}
+    _write(paths["stations"], STATIONS + [ely], bump=1)
+
+    assert registry.reload() is True
+    after = registry.current()
+    assert after.version != before.version
+    assert after.stations_by_crs == {"CBG": "Cambridge", "ELY": "Ely"}
+    # A request holding the old snapshot keeps a consistent view.
+    assert before.stations_by_crs == {"CBG": "Cambridge"}
+    assert registry._changed_files() == []
+
+
+def test_touched_but_unchanged_files_do_not_reload(tmp_path):
+    registry, paths = _registry(tmp_path)
+    version = registry.version
+    _write(paths["atoc_codes"], {"GR": "LNER"}, bump=1)
+
+    assert registry._changed_files() == ["atoc_codes"]
+    assert registry.reload() is False
+    assert registry.version == version
+    assert registry._changed_files() == []
+
+
+def test_failed_reload_keeps_data_and_is_retried(tmp_path):
+    registry, paths = _registry(tmp_path)
+    version = registry.version
+    _write(paths["connections"], "{not json", bump=1)
+
+    assert registry.reload() is False
+    assert registry.version == version
+    assert registry._changed_files() == ["connections"]
+
+    _write(paths["connections"], {"CBG": []}, bump=2)
+    assert registry.reload() is True
+    assert registry.current().connections == {"CBG": []}
+
+
+def test_snapshot_is_used_only_while_its_hashes_match(tmp_path):
+    registry, paths = _registry(tmp_path)
+    snapshot_path = tmp_path / "data.snapshot"
+    registry.write_snapshot(snapshot_path)
+
+    loaded, _ = _registry(tmp_path, snapshot_path=snapshot_path)
+    assert loaded.loaded_from_snapshot
+    assert loaded.version == registry.version
+
+    _write(paths["stations"], [])
+    stale = DataRegistry(paths, snapshot_path=snapshot_path)
+    assert not stale.loaded_from_snapshot
+    assert stale.current().stations == []
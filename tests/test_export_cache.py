@@ -0,0 +1,107 @@
+import io
+import os
+
+from export_cache import ExportCache, export_cache_key, exporter_version
+
+
+def _store(cache, key, data):
+    cache.store(key, io.BytesIO(data), len(data))
+
+
+def _read(cache, key):
+    found = cache.open(key)
+    if found is None:
+        return None
+    f, size = found
+    with f:
+        data = f.read()
+    assert len(data) == size
+    return data
+
+
+def _age(cache, key, seconds_ago):
+    path = cache._disk_path(key)
+    stat = os.stat(path)
+    mtime = stat.st_mtime_ns - seconds_ago * 1_000_000_000
+    os.utime(path, ns=(stat.st_atime_ns, mtime))
+
+
+def test_key_ignores_payload_order_but_not_kind():
+    key = export_cache_key("pdf", {"tables": [1, 2], "title": "x"})
+    assert key == export_cache_key("pdf", {"title": "x", "tables": [1, 2]})
+    assert key != export_cache_key("xlsx", {"tables": [1, 2], "title": "x"})
+    assert key != export_cache_key("pdf", {"tables": [2, 1], "title": "x"})
+
+
+def test_exporter_version_follows_source_changes(tmp_path):
+    (tmp_path / "pdf_utils.py").write_text("A = 1\n")
+    (tmp_path / "docs" / "icons").mkdir(parents=True)
+    (tmp_path / "docs" / "icons" / "wifi.svg").write_text("<svg/>")
+    version = exporter_version(str(tmp_path))
+    assert exporter_version(str(tmp_path)) == version
+
+    (tmp_path / "pdf_utils.py").write_text("A = 2\n")
+    changed = exporter_version(str(tmp_path))
+    assert changed != version
+
+    (tmp_path / "docs" / "icons" / "bike.svg").write_text("<svg/>")
+    assert exporter_version(str(tmp_path)) != changed
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ExportCache(max_memory_bytes=250)
+    _store(cache, "a", b"a" * 100)
+    _store(cache, "b", b"b" * 100)
+    assert _read(cache, "a") == b"a" * 100
+    _store(cache, "c", b"c" * 100)
+
+    assert _read(cache, "b") is None
+    assert _read(cache, "a") == b"a" * 100
+    assert _read(cache, "c") == b"c" * 100
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memoryEntries"] == 2
+    assert stats["memoryBytes"] == 200
+    assert stats["memoryHits"] == 3
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_evicts_oldest_files_and_hits_refresh_them(tmp_path):
+    cache = ExportCache(0, disk_dir=str(tmp_path), max_disk_bytes=250)
+    _store(cache, "aa01", b"a" * 100)
+    _store(cache, "bb02", b"b" * 100)
+    _age(cache, "aa01", 20)
+    _age(cache, "bb02", 10)
+    assert _read(cache, "aa01") == b"a" * 100
+    _store(cache, "cc03", b"c" * 100)
+
+    assert _read(cache, "bb02") is None
+    assert _read(cache, "aa01") == b"a" * 100
+    assert _read(cache, "cc03") == b"c" * 100
+    assert cache.stats()["diskBytes"] == 200
+
+    # A second worker sees the entries another one wrote.
+    other = ExportCache(0, disk_dir=str(tmp_path), max_disk_bytes=250)
+    assert _read(other, "cc03") == b"c" * 100
+    assert other.stats()["diskHits"] == 1
+
+
+def test_large_entries_skip_the_memory_tier(tmp_path):
+    cache = ExportCache(
+        1000, disk_dir=str(tmp_path), max_disk_bytes=1000, max_memory_entry_bytes=50
+    )
+    _store(cache, "ab01", b"x" * 100)
+    _store(cache, "ab02", b"y" * 10)
+
+    assert cache.stats()["memoryEntries"] == 1
+    assert _read(cache, "ab01") == b"x" * 100
+    stats = cache.stats()
+    assert stats["diskHits"] == 1
+    assert stats["memoryEntries"] == 1
+
+
+def test_entries_over_the_disk_budget_are_not_written(tmp_path):
+    cache = ExportCache(0, disk_dir=str(tmp_path), max_disk_bytes=50)
+    _store(cache, "ab01", b"x" * 100)
+    assert _read(cache, "ab01") is None
+    assert cache.stats()["diskBytes"] == 0
@@ -0,0 +1,84 @@
+import io
+import zipfile
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "meta, extension, expected",
+    [
+        (None, "pdf", "timetable.pdf"),
+        ({"filename": "  "}, "xlsx", "timetable.xlsx"),
+        ({"filename": "Week 12"}, "pdf", "Week 12.pdf"),
+        ({"filename": "Week 12.pdf"}, "xlsx", "Week 12.xlsx"),
+        ({"filename": "Week 12.XLSX"}, "zip", "Week 12.zip"),
+        ({"filename": "a/b\\c\n d. "}, "csv", "a-b-c- d.csv"),
+        ({"filename": "..."}, "pdf", "timetable.pdf"),
+    ],
+)
+def test_export_download_name(app_module, meta, extension, expected):
+    assert app_module._export_download_name(meta, extension) == expected
+
+
+def test_export_download_name_is_capped(app_module):
+    name = app_module._export_download_name({"filename": "x" * 300}, "pdf")
+    assert len(name) == 180
+
+
+TABLES = [
+    {
+        "title": "Northbound",
+        "headers": ["Station", "1A01"],
+        "rows": [["York", "10:00"], ["Leeds", "10:25"]],
+    }
+]
+
+
+def _combined(client, formats, **extra):
+    body = {"tables": TABLES, "meta": {"filename": "Week 12"}, "formats": formats}
+    body.update(extra)
+    return client.post("/timetable/export", json=body)
+
+
+def test_combined_export_streams_a_valid_zip(client):
+    response = _combined(
+        client, ["pdf", "xlsx", "csv", "tsv"], stationCodes=[["YRK", "York"]]
+    )
+    assert response.status_code == 200
+    assert response.mimetype == "application/zip"
+    assert 'filename="Week 12.zip"' in response.headers["Content-Disposition"]
+    assert response.headers["X-Export-Cache"].split(", ")[0].startswith("pdf=")
+
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.testzip() is None
+    assert archive.namelist() == [
+        "Week 12.pdf",
+        "Week 12.xlsx",
+        "Northbound.csv",
+        "Station codes.csv",
+        "Northbound.tsv",
+        "Station codes.tsv",
+    ]
+    assert archive.read("Week 12.pdf").startswith(b"%PDF")
+    assert "\r\nStation\t1A01\r\n" in archive.read("Northbound.tsv").decode("utf-8-sig")
+
+
+def test_combined_export_formats_from_query_string(client):
+    response = client.post("/timetable/export?formats=csv,CSV", json={"tables": TABLES})
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.namelist() == ["Northbound.csv"]
+    assert "filename=timetable.zip" in response.headers["Content-Disposition"]
+
+
+@pytest.mark.parametrize("formats", [[], None, ["pdf", "docx"], "pdf,png", 3])
+def test_combined_export_rejects_bad_formats(client, formats):
+    response = _combined(client, formats)
+    assert response.status_code == 400
+    assert "formats" in response.get_json()["error"]
+
+
+def test_combined_export_requires_tables(client):
+    response = client.post("/timetable/export", json={"formats": ["csv"]})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "tables payload required"}
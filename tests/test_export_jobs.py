@@ -0,0 +1,144 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from export_jobs import ExportJobQueue, QueueFullError
+
+
+def _wait_finished(queue, job_id, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = queue.get(job_id)
+        if status["status"] in {"done", "failed"}:
+            return status
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _submit(queue, size, render):
+    status = queue.submit("pdf", render, size, "timetable.pdf", "application/pdf")
+    return status["jobId"]
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def test_jobs_run_smallest_first(tmp_path):
+    queue = ExportJobQueue(str(tmp_path), workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocker(progress):
+        started.set()
+        release.wait(10)
+        return io.BytesIO(b"")
+
+    def render(name):
+        def run(progress):
+            order.append(name)
+            return io.BytesIO(name.encode())
+
+        return run
+
+    first = _submit(queue, 1000, blocker)
+    assert started.wait(10)
+    jobs = [_submit(queue, size, render(f"size-{size}")) for size in (30, 10, 20)]
+    assert queue.queued() == 3
+    release.set()
+
+    for job_id in [first] + jobs:
+        _wait_finished(queue, job_id)
+    assert order == ["size-10", "size-20", "size-30"]
+
+
+def test_status_files_track_progress_and_results(tmp_path):
+    queue = ExportJobQueue(str(tmp_path), workers=1)
+
+    def render(progress):
+        progress(0.5)
+        return io.BytesIO(b"%PDF-1.4 timetable")
+
+    job_id = _submit(queue, 10, render)
+    status = _wait_finished(queue, job_id)
+    assert status["status"] == "done"
+    assert status["progress"] == 1.0
+    assert status["bytes"] == 18
+    assert status["downloadName"] == "timetable.pdf"
+    assert status["pid"] == os.getpid()
+    with open(queue.result_path(job_id), "rb") as f:
+        assert f.read() == b"%PDF-1.4 timetable"
+
+    # Any worker sharing the directory can answer the poll.
+    other = ExportJobQueue(str(tmp_path))
+    assert other.get(job_id) == status
+
+
+def test_failed_renders_are_reported(tmp_path):
+    queue = ExportJobQueue(str(tmp_path), workers=1)
+
+    def render(progress):
+        raise ValueError("table too wide")
+
+    status = _wait_finished(queue, _submit(queue, 10, render))
+    assert status["status"] == "failed"
+    assert status["error"] == "table too wide"
+    assert not os.path.exists(queue.result_path(status["jobId"]))
+
+
+def test_unknown_and_malformed_job_ids(tmp_path):
+    queue = ExportJobQueue(str(tmp_path))
+    assert queue.get("0" * 32) is None
+    assert queue.get("../secrets") is None
+    assert queue.get(None) is None
+
+
+def test_full_queue_is_rejected(tmp_path):
+    queue = ExportJobQueue(str(tmp_path), max_queued=0)
+    with pytest.raises(QueueFullError):
+        _submit(queue, 10, lambda progress: io.BytesIO(b""))
+    assert os.listdir(tmp_path) == []
+
+
+def _write_job(tmp_path, job_id, status, pid, age=0):
+    path = tmp_path / f"{job_id}.json"
+    path.write_text(json.dumps({"jobId": job_id, "status": status, "pid": pid}))
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_jobs_of_exited_workers_are_failed(tmp_path):
+    job_id = "a" * 32
+    _write_job(tmp_path, job_id, "running", _dead_pid())
+    status = ExportJobQueue(str(tmp_path)).get(job_id)
+    assert status["status"] == "failed"
+    assert status["error"] == "The worker running this export exited"
+    # The failure is written back for every other worker to see.
+    assert json.loads((tmp_path / f"{job_id}.json").read_text())["status"] == "failed"
+
+
+def test_cleanup_keeps_only_live_unfinished_jobs(tmp_path):
+    done = _write_job(tmp_path, "b" * 32, "done", os.getpid(), age=120)
+    result = tmp_path / f"{'b' * 32}.result"
+    result.write_bytes(b"old")
+    os.utime(result, (time.time() - 120,) * 2)
+    orphaned = _write_job(tmp_path, "c" * 32, "queued", _dead_pid(), age=120)
+    waiting = _write_job(tmp_path, "d" * 32, "queued", os.getpid(), age=120)
+    recent = _write_job(tmp_path, "e" * 32, "done", os.getpid())
+
+    ExportJobQueue(str(tmp_path), retention=60).get("f" * 32)
+    assert not done.exists()
+    assert not result.exists()
+    assert not orphaned.exists()
+    assert waiting.exists()
+    assert recent.exists()
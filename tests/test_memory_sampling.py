@@ -0,0 +1,70 @@
+import tracemalloc
+
+import pytest
+
+import memory_sampling
+
+
+@pytest.fixture
+def reports():
+    found = []
+    memory_sampling.configure(
+        1.0, top_sites=3, report=lambda *measurement: found.append(measurement)
+    )
+    yield found
+    memory_sampling.configure(0.0)
+
+
+@memory_sampling.sampled
+def build(size, keep=False):
+    data = bytearray(size)
+    memory_sampling.checkpoint()
+    return data if keep else len(data)
+
+
+@memory_sampling.sampled
+def outer():
+    return build(1024)
+
+
+def test_sampled_calls_report_peak_net_and_sites(reports):
+    assert build(4 * 1024 * 1024) == 4 * 1024 * 1024
+    [(name, peak, net, sites)] = reports
+    assert name == "build"
+    assert peak >= 4 * 1024 * 1024
+    assert net < 1024 * 1024
+    # The checkpoint saw the buffer even though it was freed on return.
+    site, size = sites[0]
+    assert site.startswith("test_memory_sampling.py:")
+    assert size >= 4 * 1024 * 1024
+    assert len(sites) <= 3
+    assert not tracemalloc.is_tracing()
+
+
+def test_memory_kept_after_the_call_is_net(reports):
+    data = build(2 * 1024 * 1024, keep=True)
+    [(_, _, net, _)] = reports
+    assert net >= len(data)
+
+
+def test_nested_calls_are_not_traced_separately(reports):
+    outer()
+    assert [name for name, *_ in reports] == ["outer"]
+
+
+def test_nothing_is_traced_when_disabled():
+    memory_sampling.configure(1.0, report=None)
+    build(1024)
+    memory_sampling.configure(0.0, report=lambda *measurement: pytest.fail())
+    build(1024)
+    memory_sampling.configure(0.0)
+
+
+def test_an_existing_trace_is_left_alone(reports):
+    tracemalloc.start()
+    try:
+        build(1024)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert reports == []
@@ -0,0 +1,108 @@
+import json
+import os
+import subprocess
+import sys
+
+from metrics import Metrics, pid_alive
+
+
+def _dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", ""])
+    process.wait()
+    return process.pid
+
+
+def _metrics(tmp_path):
+    metrics = Metrics(str(tmp_path))
+    metrics.counter("requests_total", "Requests answered.")
+    metrics.gauge("queued_jobs", "Export jobs waiting.")
+    metrics.histogram("latency_seconds", "Request latency.", (0.1, 1))
+    return metrics
+
+
+def _write_worker(tmp_path, pid, values):
+    worker_dir = tmp_path / str(os.getppid())
+    worker_dir.mkdir(exist_ok=True)
+    (worker_dir / f"{pid}.json").write_text(json.dumps(values))
+
+
+def _samples(text):
+    return dict(
+        line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#")
+    )
+
+
+def test_pid_alive():
+    assert pid_alive(os.getpid())
+    assert not pid_alive(_dead_pid())
+
+
+def test_render_formats_each_family(tmp_path):
+    metrics = _metrics(tmp_path)
+    metrics.inc("requests_total", {"route": "/api/pdf", "status": "200"})
+    metrics.inc("requests_total", {"status": "200", "route": "/api/pdf"}, value=2)
+    metrics.set("queued_jobs", 3)
+    metrics.observe("latency_seconds", 0.05)
+    metrics.observe("latency_seconds", 0.5)
+    metrics.observe("latency_seconds", 5)
+
+    text = metrics.render()
+    assert "# TYPE requests_total counter\n" in text
+    assert "# HELP latency_seconds Request latency.\n" in text
+    assert _samples(text) == {
+        'requests_total{route="/api/pdf",status="200"}': "3",
+        "queued_jobs": "3",
+        'latency_seconds_bucket{le="0.1"}': "1",
+        'latency_seconds_bucket{le="1"}': "2",
+        'latency_seconds_bucket{le="+Inf"}': "3",
+        "latency_seconds_sum": "5.55",
+        "latency_seconds_count": "3",
+    }
+
+
+def test_render_sums_live_and_exited_workers(tmp_path):
+    metrics = _metrics(tmp_path)
+    metrics.inc("requests_total", {"route": "/"})
+    metrics.set("queued_jobs", 1)
+    metrics.observe("latency_seconds", 0.05)
+    _write_worker(
+        tmp_path,
+        _dead_pid(),
+        [
+            ["requests_total", {"route": "/"}, 10],
+            ["queued_jobs", {}, 5],
+            ["latency_seconds", {}, [[1, 1], 0.6, 3]],
+        ],
+    )
+    _write_worker(
+        tmp_path,
+        os.getppid(),
+        [
+            ["requests_total", {"route": "/"}, 100],
+            ["queued_jobs", {}, 2],
+            ["unknown_family", {}, 7],
+        ],
+    )
+    # Files that are not a worker's are skipped.
+    (tmp_path / str(os.getppid()) / "notes.txt").write_text("x")
+
+    samples = _samples(metrics.render())
+    # Counters and histograms keep what exited workers counted.
+    assert samples['requests_total{route="/"}'] == "111"
+    assert samples['latency_seconds_bucket{le="0.1"}'] == "2"
+    assert samples['latency_seconds_bucket{le="1"}'] == "3"
+    assert samples['latency_seconds_bucket{le="+Inf"}'] == "4"
+    assert samples["latency_seconds_count"] == "4"
+    # Gauges only count workers that are running.
+    assert samples["queued_jobs"] == "3"
+    assert "unknown_family" not in samples
+
+
+def test_flush_writes_only_after_changes(tmp_path):
+    metrics = _metrics(tmp_path)
+    path = tmp_path / str(os.getppid()) / f"{os.getpid()}.json"
+    metrics.flush()
+    assert not path.exists()
+    metrics.inc("requests_total")
+    metrics.flush()
+    assert json.loads(path.read_text()) == [["requests_total", {}, 1]]
@@ -0,0 +1,97 @@
+import io
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+from pypdf import PdfReader
+
+import pdf_utils
+from synthetic_timetable import make_pdf_tables
+
+
+PAGE_NUMBER_RE = re.compile(r"Page \d+")
+FOOTER = "Created by Paper Timetable Generator using RTT data"
+META = {"title": "Synthetic timetable", "subtitle": "Parallel render check"}
+WORKERS = 3
+
+
+@pytest.fixture(scope="module")
+def tables():
+    tables = make_pdf_tables(40, 160, tables=2)
+    cells = sum(len(table["headers"]) * len(table["rows"]) for table in tables)
+    assert cells > pdf_utils.PDF_PARALLEL_MIN_CELLS
+    return tables
+
+
+@pytest.fixture(scope="module")
+def rendered(tables):
+    progress = []
+    timings = {}
+    serial = pdf_utils.build_timetable_pdf(tables, META, renderer="canvas")
+    with ProcessPoolExecutor(2) as executor:
+        parallel = pdf_utils.build_timetable_pdf_parallel(
+            tables,
+            META,
+            renderer="canvas",
+            executor=executor,
+            workers=WORKERS,
+            progress=progress.append,
+            timings=timings,
+        )
+    return {
+        "serial": [page.extract_text() for page in PdfReader(io.BytesIO(serial)).pages],
+        "parallel": [
+            page.extract_text() for page in PdfReader(io.BytesIO(parallel)).pages
+        ],
+        "progress": progress,
+        "timings": timings,
+    }
+
+
+def test_each_batch_adds_at_most_one_page(tables, rendered):
+    batches = len(pdf_utils._parallel_batches(tables, WORKERS))
+    assert batches == WORKERS
+    serial, parallel = len(rendered["serial"]), len(rendered["parallel"])
+    assert serial <= parallel <= serial + batches - 1
+
+
+def test_parallel_document_has_the_serial_content(rendered):
+    def words(pages):
+        text = PAGE_NUMBER_RE.sub("", "\n".join(pages)).replace(FOOTER, "")
+        return Counter(text.split())
+
+    assert words(rendered["parallel"]) == words(rendered["serial"])
+    # The heading is only drawn by the first batch.
+    assert [META["subtitle"] in text for text in rendered["parallel"]].count(True) == 1
+    assert META["subtitle"] in rendered["parallel"][0]
+
+
+def test_page_numbers_are_stamped_across_the_merged_document(rendered):
+    for number, text in enumerate(rendered["parallel"], start=1):
+        assert PAGE_NUMBER_RE.findall(text) == [f"Page {number}"]
+        assert text.count(FOOTER) == 1
+
+
+def test_progress_and_timings_are_reported(rendered):
+    progress = rendered["progress"]
+    assert len(progress) == WORKERS
+    assert progress == sorted(progress)
+    assert progress[-1] == 1.0
+    assert set(rendered["timings"]) == {"render", "merge"}
+
+
+def test_small_inputs_render_serially(tables):
+    small = make_pdf_tables(10, 10)
+    timings = {}
+    with ProcessPoolExecutor(2) as executor:
+        data = pdf_utils.build_timetable_pdf_parallel(
+            small, META, executor=executor, workers=WORKERS, timings=timings
+        )
+    # Written by reportlab in the calling process, not merged by pypdf.
+    assert b"% ReportLab generated PDF document" in data
+    assert len(PdfReader(io.BytesIO(data)).pages) == len(
+        PdfReader(io.BytesIO(pdf_utils.build_timetable_pdf(small, META))).pages
+    )
+    assert set(timings) == {"layout", "render"}
+    assert pdf_utils._parallel_batches(tables, 1) == []
@@ -0,0 +1,101 @@
+import io
+from collections import Counter
+
+import pytest
+from pypdf import PdfReader
+
+import pdf_utils
+from synthetic_timetable import make_pdf_tables
+
+
+META = {"title": "Cambridge to London", "subtitle": "Monday"}
+
+
+def _read_page(page):
+    # Text, horizontal rule heights and icon positions, in page coordinates.
+    rules = set()
+    icons = []
+    last = [None]
+
+    def visit(operator, operands, cm, tm):
+        if operator == b"Do":
+            icons.append((round(cm[4], 1), round(cm[5], 1)))
+        if operator not in (b"m", b"l") or len(operands) != 2:
+            return
+        x, y = float(operands[0]), float(operands[1])
+        point = (cm[0] * x + cm[2] * y + cm[4], cm[1] * x + cm[3] * y + cm[5])
+        start = last[0]
+        if (
+            operator == b"l"
+            and start
+            and abs(start[1] - point[1]) < 0.01
+            and abs(start[0] - point[0]) > 1
+        ):
+            rules.add(round(point[1], 1))
+        last[0] = point
+
+    text = page.extract_text(visitor_operand_before=visit)
+    return {"text": text, "rules": sorted(rules), "icons": sorted(icons)}
+
+
+@pytest.fixture(scope="module")
+def rendered():
+    # Long enough to split rows across pages and wide enough to split
+    # columns into chunks, with a second table after the first.
+    tables = make_pdf_tables(40, 60, tables=2)
+    pages = {}
+    for renderer in ("platypus", "canvas"):
+        data = pdf_utils.build_timetable_pdf(tables, META, renderer=renderer)
+        reader = PdfReader(io.BytesIO(data))
+        pages[renderer] = [_read_page(page) for page in reader.pages]
+    return pages
+
+
+def _each_page(rendered, key):
+    return tuple(
+        [page[key] for page in rendered[renderer]] for renderer in ("platypus", "canvas")
+    )
+
+
+def test_canvas_matches_platypus_page_count(rendered):
+    assert len(rendered["canvas"]) == len(rendered["platypus"])
+    assert len(rendered["platypus"]) > 4
+
+
+def test_canvas_matches_platypus_text_per_page(rendered):
+    platypus, canvas = _each_page(rendered, "text")
+    for number, (expected, actual) in enumerate(zip(platypus, canvas), start=1):
+        # The renderers emit cell text in a different order.
+        assert Counter(actual.split()) == Counter(expected.split()), f"page {number}"
+
+
+def test_header_row_repeats_on_continuation_pages(rendered):
+    for pages in rendered.values():
+        texts = [page["text"] for page in pages]
+        # "Comes from" is the first body row, so pages without it continue a
+        # chunk from the page before; they still start with the header row.
+        continuations = [text for text in texts[1:] if "Comes from" not in text]
+        assert continuations
+        assert all("Operator" in text for text in continuations)
+
+
+def test_canvas_draws_the_same_rules_per_page(rendered):
+    platypus, canvas = _each_page(rendered, "rules")
+    assert canvas == platypus
+    assert sum(map(len, platypus)) > 0
+
+
+def test_canvas_places_the_same_icons_per_page(rendered):
+    platypus, canvas = _each_page(rendered, "icons")
+    assert canvas == platypus
+    assert sum(map(len, platypus)) > 0
+
+
+def test_auto_picks_canvas_for_large_tables():
+    small = make_pdf_tables(10, 10)
+    large = make_pdf_tables(200, 120)
+    assert pdf_utils.resolve_pdf_renderer("auto", small) == "platypus"
+    assert pdf_utils.resolve_pdf_renderer("auto", large) == "canvas"
+    assert pdf_utils.resolve_pdf_renderer(None, large) == "platypus"
+    with pytest.raises(ValueError):
+        pdf_utils.resolve_pdf_renderer("svg", small)
@@ -0,0 +1,87 @@
+import pytest
+from reportlab.lib import colors
+
+import pdf_utils
+from synthetic_timetable import make_pdf_tables
+
+
+RED = colors.HexColor("#f7c9c9")
+BLUE = colors.HexColor("#e6d9ff")
+
+
+def _painted(commands, cols, rows):
+    # What each command leaves on each cell: later commands win, the way
+    # reportlab paints them in order.
+    def resolve(index, size):
+        return index + size if index < 0 else index
+
+    state = {}
+    for command in commands:
+        op = command[0]
+        sc, sr = resolve(command[1][0], cols), resolve(command[1][1], rows)
+        ec, er = resolve(command[2][0], cols), resolve(command[2][1], rows)
+        value = ((sc, sr), (ec, er)) if op == "SPAN" else command[3:]
+        for row in range(sr, er + 1):
+            for col in range(sc, ec + 1):
+                state[(op, col, row)] = value
+    return state
+
+
+def test_compaction_keeps_per_cell_styling():
+    commands = [
+        ("FONT", (0, 0), (-1, -1), "Helvetica", 8),
+        ("BACKGROUND", (0, 0), (-1, 0), colors.lightgrey),
+        ("SPAN", (1, 2), (2, 2)),
+        ("LINEBELOW", (0, 1), (-1, 1), 0.5, colors.grey),
+    ]
+    for row in range(2, 9):
+        if row % 2:
+            commands.append(("BACKGROUND", (0, row), (-1, row), colors.beige))
+        commands.append(("LINEABOVE", (0, row), (-1, row), 0.5, colors.grey))
+    # A block of highlights, a repeat and a cell repainted later.
+    for row in range(3, 7):
+        for col in range(2, 5):
+            commands.append(("BACKGROUND", (col, row), (col, row), RED))
+    commands.append(("BACKGROUND", (3, 4), (3, 4), RED))
+    commands.append(("BACKGROUND", (5, 3), (5, 3), BLUE))
+    commands.append(("LINEABOVE", (0, 5), (-1, 5), 1, colors.black))
+    commands.append(("LINEABOVE", (0, 6), (-1, 6), 0.5, colors.grey))
+    commands.append(("BACKGROUND", (0, 7), (-1, 7), colors.lightgrey))
+    commands.append(("BACKGROUND", (3, 4), (3, 4), BLUE))
+    commands.append(("BACKGROUND", (0, 8), (0, 8), BLUE))
+
+    compiled = pdf_utils._compile_table_style(commands)
+    assert len(compiled) < len(commands)
+    assert _painted(compiled, 6, 9) == _painted(commands, 6, 9)
+
+
+@pytest.fixture
+def grid_styles(monkeypatch):
+    captured = []
+    compile_table_style = pdf_utils._compile_table_style
+
+    def capture(commands):
+        compiled = compile_table_style(commands)
+        captured.append((list(commands), compiled))
+        return compiled
+
+    monkeypatch.setattr(pdf_utils, "_compile_table_style", capture)
+    return captured
+
+
+def test_compaction_keeps_timetable_grid_styling(grid_styles):
+    # Half the time cells highlighted; some of them are struck through.
+    tables = make_pdf_tables(30, 40, highlight_density=0.5)
+    assert any(
+        isinstance(cell, dict) and cell.get("strike")
+        for row in tables[0]["rows"]
+        for cell in row
+    )
+    pdf_utils.build_timetable_pdf(tables, renderer="platypus")
+
+    assert grid_styles
+    rows = len(tables[0]["rows"]) + 1
+    for commands, compiled in grid_styles:
+        cols = max(max(command[1][0], command[2][0]) for command in commands) + 1
+        assert len(compiled) < len(commands)
+        assert _painted(compiled, cols, rows) == _painted(commands, cols, rows)
@@ -0,0 +1,115 @@
+import os
+import time
+
+import pytest
+
+from profiling import RequestProfiler
+
+
+SECRET = "profile-secret"
+
+
+def _busy_request(profiler, route):
+    sampler = profiler.start(route)
+    deadline = time.monotonic() + 0.1
+    while time.monotonic() < deadline:
+        sum(range(1000))
+    profiler.finish(sampler)
+    return sampler.name
+
+
+def test_profiles_are_written_as_collapsed_stacks(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), interval=0.001)
+    name = _busy_request(profiler, "/api/pdf")
+
+    assert name.endswith(f"-api-pdf-{os.getpid()}-1.collapsed")
+    [(listed, size, _)] = profiler.profiles()
+    assert listed == name
+    lines = (tmp_path / name).read_text().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) > 0
+    assert any("test_profiling.py:_busy_request" in line for line in lines)
+    assert size == (tmp_path / name).stat().st_size
+
+
+def test_old_profiles_are_pruned(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), interval=0.05, max_files=2)
+    names = []
+    for _ in range(3):
+        sampler = profiler.start("/")
+        profiler.finish(sampler)
+        names.append(sampler.name)
+        # Names sort by their millisecond timestamp.
+        time.sleep(0.002)
+    assert [name for name, _, _ in profiler.profiles()] == [names[2], names[1]]
+
+
+def test_sample_rate_is_shared_through_the_settings_file(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), secret=SECRET)
+    other = RequestProfiler(str(tmp_path), secret=SECRET, sample_rate=0.25)
+    assert profiler.enabled and not profiler.sampled()
+
+    profiler.set_sample_rate(1.0)
+    other._settings_checked = 0.0
+    assert other.sampled()
+    assert other.sample_rate == 1.0
+
+    profiler.set_sample_rate(None)
+    other._settings_checked = 0.0
+    other.sampled()
+    assert other.sample_rate == 0.25
+
+
+def test_profiling_is_off_without_a_secret_or_rate(tmp_path):
+    profiler = RequestProfiler(str(tmp_path))
+    assert not profiler.enabled
+    assert not profiler.authorized(SECRET)
+    assert RequestProfiler(str(tmp_path), sample_rate=0.1).enabled
+
+
+@pytest.fixture
+def client(app_module, tmp_path, monkeypatch):
+    profiler = RequestProfiler(str(tmp_path), secret=SECRET)
+    monkeypatch.setattr(app_module, "PROFILER", profiler)
+    return app_module.app.test_client()
+
+
+def _download(client, name, token=SECRET):
+    headers = {"X-Profile-Token": token} if token else {}
+    return client.get(f"/admin/profiles/{name}", headers=headers)
+
+
+def test_profile_download(client, tmp_path):
+    (tmp_path / "20260511T100000000Z-root-1-1.collapsed").write_text("app.py:index 3\n")
+    response = _download(client, "20260511T100000000Z-root-1-1.collapsed")
+    assert response.status_code == 200
+    assert response.data == b"app.py:index 3\n"
+    assert response.headers["Content-Disposition"].startswith("attachment")
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "settings.json",
+        "20260511T100000000Z-root-1-1.collapsed.tmp",
+        "..%2Fsettings.collapsed",
+        "missing.collapsed",
+    ],
+)
+def test_profile_download_rejects_other_files(client, tmp_path, name):
+    (tmp_path / "settings.json").write_text('{"sampleRate": 0.5}')
+    (tmp_path / "20260511T100000000Z-root-1-1.collapsed.tmp").write_text("x 1\n")
+    (tmp_path.parent / "settings.collapsed").write_text("x 1\n")
+    assert _download(client, name).status_code == 404
+
+
+def test_profile_download_needs_the_token(client, tmp_path):
+    (tmp_path / "a.collapsed").write_text("x 1\n")
+    assert _download(client, "a.collapsed", token=None).status_code == 403
+    assert _download(client, "a.collapsed", token="wrong").status_code == 403
+
+
+def test_profile_admin_is_hidden_without_a_secret(
+    app_module, client, tmp_path, monkeypatch
+):
+    monkeypatch.setattr(app_module, "PROFILER", RequestProfiler(str(tmp_path)))
+    assert _download(client, "a.collapsed").status_code == 404
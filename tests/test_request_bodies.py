@@ -0,0 +1,107 @@
+import gzip
+import io
+import json
+import zlib
+
+import pytest
+
+from request_bodies import (
+    RATIO_CHECK_MIN_BYTES,
+    UNDECOMPRESSABLE,
+    RequestBodyError,
+    read_body,
+    read_json_body,
+)
+
+
+PAYLOAD = json.dumps({"tables": [{"rows": [["CBG", "10:00"]] * 2000}]}).encode()
+
+
+def _raw_deflate(data):
+    compressor = zlib.compressobj(wbits=-zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _read(body, encoding=None, **limits):
+    return read_body(io.BytesIO(body), encoding, len(body), **limits)
+
+
+def _error(body, encoding=None, **limits):
+    with pytest.raises(RequestBodyError) as info:
+        _read(body, encoding, **limits)
+    return info.value
+
+
+@pytest.mark.parametrize(
+    "encoding, body",
+    [
+        (None, PAYLOAD),
+        ("identity", PAYLOAD),
+        ("gzip", gzip.compress(PAYLOAD)),
+        ("X-Gzip", gzip.compress(PAYLOAD)),
+        ("deflate", zlib.compress(PAYLOAD)),
+        ("deflate", _raw_deflate(PAYLOAD)),
+        ("identity, gzip", gzip.compress(PAYLOAD)),
+    ],
+)
+def test_bodies_are_inflated(encoding, body):
+    assert _read(body, encoding) == PAYLOAD
+
+
+def test_concatenated_gzip_members():
+    body = gzip.compress(PAYLOAD[:100]) + gzip.compress(PAYLOAD[100:])
+    assert _read(body, "gzip") == PAYLOAD
+
+
+@pytest.mark.parametrize("encoding", ["br", "gzip, deflate"])
+def test_unsupported_encodings_are_415(encoding):
+    assert _error(PAYLOAD, encoding).status == 415
+
+
+@pytest.mark.parametrize(
+    "encoding, body",
+    [
+        ("gzip", gzip.compress(PAYLOAD)[:-20]),
+        ("deflate", zlib.compress(PAYLOAD)[:-20]),
+        ("gzip", PAYLOAD),
+        ("deflate", zlib.compress(PAYLOAD) + b"junk"),
+    ],
+)
+def test_truncated_or_corrupt_bodies_are_400(encoding, body):
+    error = _error(body, encoding)
+    assert error.status == 400
+    assert str(error).startswith(UNDECOMPRESSABLE)
+
+
+def test_size_limit_applies_after_inflation():
+    limit = len(PAYLOAD) - 1
+    assert _error(PAYLOAD, max_bytes=limit).status == 413
+    error = _error(gzip.compress(PAYLOAD), "gzip", max_bytes=limit)
+    assert error.status == 413
+    assert str(error).endswith("once decompressed")
+    assert _read(gzip.compress(PAYLOAD), "gzip", max_bytes=len(PAYLOAD)) == PAYLOAD
+
+
+def test_declared_length_over_the_limit_is_refused_unread():
+    with pytest.raises(RequestBodyError) as info:
+        read_body(io.BytesIO(b""), None, 100, max_bytes=10)
+    assert info.value.status == 413
+
+
+def test_ratio_limit():
+    small = b"\0" * (RATIO_CHECK_MIN_BYTES // 2)
+    assert _read(gzip.compress(small), "gzip", max_ratio=10) == small
+
+    bomb = gzip.compress(b"\0" * (64 * 1024 * 1024))
+    error = _error(bomb, "gzip", max_ratio=100)
+    assert error.status == 413
+    assert "100 times" in str(error)
+
+
+def test_json_bodies():
+    body = io.BytesIO(gzip.compress(PAYLOAD))
+    assert read_json_body(body, "gzip") == json.loads(PAYLOAD)
+    assert read_json_body(io.BytesIO(b"  \n")) is None
+    with pytest.raises(RequestBodyError) as info:
+        read_json_body(io.BytesIO(b"{"))
+    assert info.value.status == 400
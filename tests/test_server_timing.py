@@ -0,0 +1,77 @@
+import re
+
+import pytest
+from flask import Flask
+
+import server_timing
+
+ENTRY = re.compile(r"^[a-z-]+;dur=\d+\.\d$")
+TABLES = [{"title": "Timed", "headers": ["Station", "1A01"], "rows": [["York", "10:00"]]}]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    ticks = iter([0.0, 1.0, 1.5, 3.5, 10.0, 10.25])
+    monkeypatch.setattr(server_timing.time, "perf_counter", lambda: next(ticks))
+
+
+def test_header_value_format():
+    timings = {"parse": 0.0012, "upstream-ttfb": 1.5}
+    assert server_timing.header_value(timings) == "parse;dur=1.2, upstream-ttfb;dur=1500.0"
+    assert server_timing.header_value(timings, total=2.04567) == (
+        "parse;dur=1.2, upstream-ttfb;dur=1500.0, total;dur=2045.7"
+    )
+    assert server_timing.header_value({}) == ""
+
+
+def test_log_fields():
+    fields = server_timing.log_fields({"upstream-body": 0.25}, total=0.5)
+    assert fields == "upstream_body_ms=250.0 total_ms=500.0"
+
+
+def test_nested_and_repeated_phases_add_up(clock):
+    with Flask(__name__).test_request_context():
+        assert server_timing.current() == {}
+        with server_timing.phase("render"):  # 0.0 .. 3.5
+            with server_timing.phase("layout"):  # 1.0 .. 1.5
+                pass
+        with server_timing.phase("layout"):  # 10.0 .. 10.25
+            pass
+        server_timing.record_all({"render": 0.5})
+        assert server_timing.current() == {"layout": 0.75, "render": 4.0}
+
+
+def test_record_outside_a_request_is_dropped():
+    server_timing.record("render", 1.0)
+    with server_timing.phase("layout"):
+        pass
+    assert server_timing.current() == {}
+
+
+def test_export_response_has_server_timing(client):
+    response = client.post(
+        "/timetable/pdf",
+        json={"tables": TABLES},
+        headers={"Origin": "http://127.0.0.1:8080"},
+    )
+    assert response.status_code == 200
+    entries = response.headers["Server-Timing"].split(", ")
+    assert all(ENTRY.match(entry) for entry in entries)
+    names = [entry.split(";")[0] for entry in entries]
+    assert names[-1] == "total"
+    assert {"parse", "layout", "render"} <= set(names)
+    assert response.headers["Timing-Allow-Origin"] == "http://127.0.0.1:8080"
+
+
+def test_no_header_without_timings(client):
+    response = client.get("/api/stations?q=york")
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
+    assert "Timing-Allow-Origin" not in response.headers
+
+
+def test_header_can_be_switched_off(client, app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "SERVER_TIMING", False)
+    response = client.post("/timetable/pdf", json={"tables": TABLES})
+    assert response.status_code == 200
+    assert "Server-Timing" not in response.headers
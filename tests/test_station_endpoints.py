@@ -0,0 +1,140 @@
+import math
+
+import pytest
+
+
+CAMBRIDGE = (52.194, 0.137)
+
+
+def _near(client, **params):
+    return client.get("/api/stations/near", query_string=params)
+
+
+def _near_bulk(client, payload):
+    return client.post("/api/stations/near", json=payload)
+
+
+def test_near_returns_closest_first(client):
+    response = _near(client, lat=CAMBRIDGE[0], lon=CAMBRIDGE[1])
+    assert response.status_code == 200
+    stations = response.get_json()
+    assert stations[0]["crsCode"] == "CBG"
+    assert len(stations) == 5
+    distances = [st["distanceKm"] for st in stations]
+    assert distances == sorted(distances)
+
+
+@pytest.mark.parametrize("limit, count", [("1", 1), ("1000", 50), ("", 5)])
+def test_near_limit_is_clamped(client, limit, count):
+    response = _near(client, lat=CAMBRIDGE[0], lon=CAMBRIDGE[1], limit=limit)
+    assert len(response.get_json()) == count
+
+
+@pytest.mark.parametrize("limit", ["0", "-3", "many", "1.5"])
+def test_near_rejects_bad_limits(client, limit):
+    response = _near(client, lat=CAMBRIDGE[0], lon=CAMBRIDGE[1], limit=limit)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "lat, lon",
+    [
+        ("nan", "0"),
+        ("0", "inf"),
+        ("91", "0"),
+        ("0", "-180.5"),
+        ("north", "0"),
+        ("", "0"),
+    ],
+)
+def test_near_rejects_bad_coordinates(client, lat, lon):
+    assert _near(client, lat=lat, lon=lon).status_code == 400
+
+
+def test_near_bulk_accepts_pairs_and_objects(client):
+    response = _near_bulk(
+        client,
+        {
+            "points": [
+                list(CAMBRIDGE),
+                {"lat": 51.532, "lon": -0.1233},
+                {"lat": "51.532", "long": "-0.1233"},
+            ],
+            "limit": 2,
+        },
+    )
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [len(stations) for stations in results] == [2, 2, 2]
+    assert results[0][0]["crsCode"] == "CBG"
+    assert results[1] == results[2]
+
+
+def test_near_bulk_clamps_the_limit(client, app_module):
+    response = _near_bulk(client, {"points": [list(CAMBRIDGE)], "limit": 10_000})
+    [stations] = response.get_json()["results"]
+    assert len(stations) == app_module.NEAR_STATIONS_MAX_LIMIT
+
+
+@pytest.mark.parametrize(
+    "point", [[math.nan, 0], [52.0], [52.0, 0.1, 3], {"lat": 52.0}, "52,0", None]
+)
+def test_near_bulk_reports_the_invalid_point(client, point):
+    response = _near_bulk(client, {"points": [list(CAMBRIDGE), point]})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "invalid point", "index": 1}
+
+
+def test_near_bulk_limits_the_point_count(client, app_module):
+    count = app_module.NEAR_STATIONS_MAX_POINTS + 1
+    response = _near_bulk(client, {"points": [list(CAMBRIDGE)] * count})
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "error": "too many points",
+        "max": app_module.NEAR_STATIONS_MAX_POINTS,
+    }
+
+
+@pytest.mark.parametrize("payload", [[1, 2], "points", {"points": []}, {}])
+def test_near_bulk_rejects_other_bodies(client, payload):
+    assert _near_bulk(client, payload).status_code == 400
+
+
+def _lookup(client, payload):
+    return client.post("/api/stations/lookup", json=payload)
+
+
+def test_lookup_dedupes_and_reports_missing_codes(client):
+    response = _lookup(client, {"crs": ["cbg", " CBG ", "KGX", "ZZZ", "", None]})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert list(body["stations"]) == ["CBG", "KGX"]
+    assert body["stations"]["CBG"]["stationName"] == "Cambridge"
+    assert body["stations"]["CBG"]["lat"] is not None
+    assert body["missing"] == ["ZZZ"]
+
+
+def test_lookup_accepts_comma_separated_codes(client):
+    by_post = _lookup(client, {"crs": "CBG,KGX"}).get_json()
+    by_get = client.get("/api/stations/lookup?crs=cbg,kgx").get_json()
+    assert by_post == by_get
+    assert list(by_get["stations"]) == ["CBG", "KGX"]
+
+
+@pytest.mark.parametrize(
+    "payload", [{}, {"crs": []}, {"crs": ["", " "]}, {"crs": {"CBG": 1}}, [1], "CBG"]
+)
+def test_lookup_requires_a_code_list(client, payload):
+    assert _lookup(client, payload).status_code == 400
+
+
+def test_lookup_limits_the_code_count(client, app_module):
+    limit = app_module.STATION_LOOKUP_MAX_CODES
+    codes = [f"Z{n:02d}" for n in range(limit)]
+    assert _lookup(client, {"crs": codes}).status_code == 200
+    # Duplicates do not count towards the limit.
+    assert _lookup(client, {"crs": codes + codes[:5]}).status_code == 200
+
+    response = _lookup(client, {"crs": codes + ["CBG"]})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "too many codes", "max": limit}
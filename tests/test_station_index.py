@@ -0,0 +1,159 @@
+import math
+import random
+
+from station_index import (
+    StationGeoIndex,
+    StationSearchIndex,
+    _unit_vector,
+    build_station_entries,
+    norm_station_query,
+)
+
+
+STATIONS = [
+    {"stationName": "Cambridge", "crsCode": "CBG"},
+    {"stationName": "Cambridge North", "crsCode": "CMB"},
+    {"stationName": "London Kings Cross", "crsCode": "KGX"},
+    {"stationName": "London St Pancras International", "crsCode": "STP"},
+    {"stationName": "Kingston", "crsCode": "KNG"},
+    {"stationName": "Cardiff Central", "crsCode": "CDF"},
+    {"stationName": "Sandwich", "crsCode": "SDW"},
+    {"stationName": "No Code Halt", "crsCode": ""},
+]
+
+
+def _index():
+    return StationSearchIndex(build_station_entries(STATIONS))
+
+
+def _codes(results):
+    return [st["crsCode"] for st in results]
+
+
+def test_norm_station_query():
+    assert norm_station_query("  St. Pancras & Kings-Cross ") == "st pancras and kings cross"
+    assert norm_station_query(None) == ""
+
+
+def test_entries_without_crs_are_skipped():
+    assert len(_index()) == len(STATIONS) - 1
+
+
+def test_crs_match_ranks_first():
+    assert _codes(_index().search("cbg")) == ["CBG"]
+
+
+def test_name_prefix_ranks_shorter_names_first():
+    assert _codes(_index().search("cambridge")) == ["CBG", "CMB"]
+
+
+def test_tiers_are_ordered():
+    # "kings": CRS-free, so name prefix (Kingston) beats an inner word
+    # (London Kings Cross).
+    assert _codes(_index().search("kings")) == ["KNG", "KGX"]
+    # "ndw" only occurs inside a name.
+    assert _codes(_index().search("ndw")) == ["SDW"]
+    # "cross kgx" only matches across the name/CRS separator.
+    assert _codes(_index().search("cross kgx")) == ["KGX"]
+
+
+def test_limit_and_empty_query():
+    index = _index()
+    assert _codes(index.search("london", limit=1)) == ["KGX"]
+    assert index.search("") == []
+    assert index.search("london", limit=0) == []
+
+
+def test_fuzzy_matches_typos():
+    index = _index()
+    assert _codes(index.search("cambrdige")) == ["CBG", "CMB"]
+    assert _codes(index.search("sandwitch")) == ["SDW"]
+    assert index.search("sandwitch", fuzzy=False) == []
+
+
+def test_fuzzy_needs_every_word_and_allows_an_unfinished_last_word():
+    index = _index()
+    assert _codes(index.search("lndon kin")) == ["KGX"]
+    assert _codes(index.search("lndon pancrs")) == ["STP"]
+    assert index.search("lndon cardif") == []
+
+
+def test_short_words_are_not_fuzzy_matched():
+    assert _index().search("cbx") == []
+
+
+def test_fuzzy_results_rank_by_distance():
+    index = StationSearchIndex(
+        build_station_entries(
+            [
+                {"stationName": "Stanford", "crsCode": "SNF"},
+                {"stationName": "Stamford", "crsCode": "SMD"},
+            ]
+        )
+    )
+    assert _codes(index.search("stamfird")) == ["SMD", "SNF"]
+
+
+def test_exact_tiers_rank_before_fuzzy_matches():
+    index = StationSearchIndex(
+        build_station_entries(
+            [
+                {"stationName": "Kingstan", "crsCode": "KGA"},
+                {"stationName": "Kingston", "crsCode": "KNG"},
+            ]
+        )
+    )
+    assert _codes(index.search("kingston")) == ["KNG", "KGA"]
+
+
+def _brute_force_nearest(index, lat, lon, limit):
+    target = _unit_vector(lat, lon)
+    distances = sorted(
+        (math.dist(_unit_vector(st["lat"], st["lon"]), target), st["crsCode"])
+        for st in index.entries
+    )
+    return [code for _, code in distances[:limit]]
+
+
+def test_nearest_matches_brute_force():
+    rng = random.Random(28)
+    stations = [
+        {
+            "stationName": f"Station {n}",
+            "crsCode": f"S{n:03d}",
+            "lat": rng.uniform(-90, 90),
+            "long": rng.uniform(-180, 180),
+        }
+        for n in range(500)
+    ]
+    index = StationGeoIndex(stations)
+    for _ in range(200):
+        lat, lon = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        limit = rng.randint(1, 12)
+        assert _codes(index.nearest(lat, lon, limit)) == _brute_force_nearest(
+            index, lat, lon, limit
+        )
+
+
+def test_nearest_distances_and_skipped_stations():
+    index = StationGeoIndex(
+        [
+            {"stationName": "Cambridge", "crsCode": "CBG", "lat": 52.1943, "long": 0.1371},
+            # Coordinates may arrive as strings.
+            {
+                "stationName": "London Kings Cross",
+                "crsCode": "KGX",
+                "lat": "51.5320",
+                "long": "-0.1233",
+            },
+            {"stationName": "No Position", "crsCode": "NOP"},
+            {"stationName": "Bad Position", "crsCode": "BAD", "lat": "n/a", "long": 0},
+        ]
+    )
+    assert len(index) == 2
+    cambridge, kings_cross = index.nearest(52.1943, 0.1371, limit=5)
+    assert cambridge["crsCode"] == "CBG" and cambridge["distanceKm"] == 0
+    assert kings_cross["crsCode"] == "KGX"
+    assert 75 < kings_cross["distanceKm"] < 76
+    assert index.nearest(0, 0, limit=0) == []
+    assert StationGeoIndex([]).nearest(0, 0) == []
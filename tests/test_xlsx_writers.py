@@ -0,0 +1,117 @@
+import io
+
+import pytest
+from openpyxl import load_workbook
+from openpyxl.utils import get_column_letter
+
+import xlsx_utils
+from synthetic_timetable import make_xlsx_tables
+
+
+EDGE_TABLES = [
+    {"title": "Only title"},
+    {"dateLabel": "Monday", "rows": [["x"], [], ["Comes from", "a", "b"]]},
+    {
+        "headers": ["a", "b", "c"],
+        "rows": [
+            ["Facilities"],
+            ["Cambridge", "arr", "1"],
+            ["", "dep", {"text": "1A23", "hyperlink": "https://example.com/1A23"}],
+        ],
+    },
+    {},
+    {"title": "Headers only", "dateLabel": "Tuesday", "headers": ["H"]},
+]
+
+
+def _color(color):
+    return None if color is None else (color.type, color.value, color.tint)
+
+
+def _side(side):
+    return None if side is None else (side.style, _color(side.color))
+
+
+def _cell(cell):
+    font, fill, border, align = cell.font, cell.fill, cell.border, cell.alignment
+    return (
+        cell.value,
+        cell.hyperlink.target if cell.hyperlink else None,
+        (font.name, font.sz, font.b, font.i, font.u, font.strike, _color(font.color)),
+        (fill.fill_type, _color(fill.fgColor)),
+        [_side(side) for side in (border.left, border.right, border.top, border.bottom)],
+        (align.horizontal, align.vertical, align.wrap_text),
+        cell.number_format,
+    )
+
+
+def _workbook(data):
+    wb = load_workbook(io.BytesIO(data))
+    sheets = {}
+    for ws in wb.worksheets:
+        columns = range(1, ws.max_column + 1)
+        sheets[ws.title] = {
+            "size": (ws.max_row, ws.max_column),
+            "merges": sorted(str(merged) for merged in ws.merged_cells.ranges),
+            "freeze": ws.freeze_panes,
+            "widths": [
+                ws.column_dimensions[get_column_letter(col)].width for col in columns
+            ],
+            "cells": [[_cell(cell) for cell in row] for row in ws.iter_rows()],
+        }
+    return wb.sheetnames, sheets
+
+
+def _both(tables, station_codes, toc_codes):
+    return [
+        _workbook(
+            xlsx_utils.build_timetable_xlsx(
+                tables, station_codes, toc_codes, writer=writer
+            )
+        )
+        for writer in ("standard", "streaming")
+    ]
+
+
+def test_streaming_matches_standard_workbook():
+    tables, station_codes, toc_codes = make_xlsx_tables(30, 60, tables=2)
+    (names, standard), (streaming_names, streaming) = _both(
+        tables, station_codes, toc_codes
+    )
+    assert streaming_names == names
+    for name in names:
+        assert streaming[name]["size"] == standard[name]["size"], name
+        assert streaming[name]["merges"] == standard[name]["merges"], name
+        assert streaming[name]["freeze"] == standard[name]["freeze"], name
+        assert streaming[name]["widths"] == standard[name]["widths"], name
+        for expected, actual in zip(standard[name]["cells"], streaming[name]["cells"]):
+            assert actual == expected, name
+
+    # The payload exercises what is being compared.
+    timetable = standard[names[0]]
+    cells = [cell for row in timetable["cells"] for cell in row]
+    assert timetable["merges"]
+    assert any(cell[1] for cell in cells)
+    assert any(cell[3][0] == "solid" for cell in cells)
+    assert any(cell[2][2] for cell in cells)
+    assert len(set(timetable["widths"])) > 1
+
+
+def test_streaming_matches_standard_on_sparse_tables():
+    standard, streaming = _both(EDGE_TABLES, [["CBG", "Cambridge"], ("KGX",)], [])
+    assert streaming == standard
+
+
+@pytest.mark.parametrize(
+    "writer, expected",
+    [("auto", "streaming"), ("standard", "standard"), ("streaming", "streaming")],
+)
+def test_resolve_xlsx_writer(writer, expected):
+    tables, _, _ = make_xlsx_tables(40, 120)
+    assert xlsx_utils.resolve_xlsx_writer(writer, tables) == expected
+
+
+def test_auto_keeps_small_workbooks_standard():
+    assert xlsx_utils.resolve_xlsx_writer("auto", EDGE_TABLES) == "standard"
+    with pytest.raises(ValueError):
+        xlsx_utils.resolve_xlsx_writer("csv", EDGE_TABLES)
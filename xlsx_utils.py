@@ -1,35 +1,28 @@
 import io
-import re
+import time
 
+from export_tables import cell_text, lookup_rows, sheet_names
+from memory_sampling import checkpoint as memory_checkpoint, sampled
 
-INVALID_SHEET_CHARS = re.compile(r"[:\\/?*\[\]]")
 
-
-def _sheet_name(name, fallback):
-    text = INVALID_SHEET_CHARS.sub(" ", str(name or "").strip())[:31].strip()
-    return text or fallback
-
-
-def _cell_text(value):
-    if value is None:
-        return ""
-    if isinstance(value, dict):
-        return str(value.get("text") or "")
-    return str(value)
+# "standard" formats a regular workbook after filling it; "streaming" writes
+# write-only sheets with per-cell named styles; "auto" streams large exports.
+XLSX_WRITERS = ("standard", "streaming", "auto")
+XLSX_STREAMING_MIN_CELLS = 5000
 
 
 def _append_rows(ws, rows):
     extra_rows = []
     for row in rows or []:
         _append_row(ws, row)
-        label = _cell_text(row[0] if row else "").strip()
+        label = cell_text(row[0] if row else "").strip()
         if label in {"Comes from", "Continues to"}:
             extra_rows.append(ws.max_row)
     return extra_rows
 
 
 def _append_row(ws, row):
-    ws.append([_cell_text(cell) for cell in row])
+    ws.append([cell_text(cell) for cell in row])
     row_idx = ws.max_row
     for col_idx, value in enumerate(row, start=1):
         if not isinstance(value, dict):
@@ -170,23 +163,55 @@ def _format_lookup_sheet(ws):
     _fit_columns(ws, max_width=48)
 
 
-def build_timetable_xlsx(tables, station_codes=None, toc_codes=None):
+def resolve_xlsx_writer(writer, tables):
+    writer = (writer or "standard").strip().lower()
+    if writer not in XLSX_WRITERS:
+        raise ValueError(f"Unknown XLSX writer: {writer}")
+    if writer != "auto":
+        return writer
+    cells = 0
+    for table in tables or []:
+        rows = table.get("rows") or ()
+        cells += len(table.get("headers") or ()) * len(rows)
+    return "streaming" if cells >= XLSX_STREAMING_MIN_CELLS else "standard"
+
+
+def _save_workbook(wb, output, timings, started):
+    # Filling the workbook counts as "layout"; the save writes the archive.
+    saving = time.perf_counter()
+    buffer = output if output is not None else io.BytesIO()
+    wb.save(buffer)
+    memory_checkpoint()
+    if timings is not None:
+        timings["layout"] = saving - started
+        timings["render"] = time.perf_counter() - saving
+    return None if output is not None else buffer.getvalue()
+
+
+@sampled
+def build_timetable_xlsx(
+    tables,
+    station_codes=None,
+    toc_codes=None,
+    progress=None,
+    output=None,
+    writer=None,
+    timings=None,
+):
+    # With an output file the workbook is written there and None is returned.
+    # A timings dict receives the "layout" and "render" seconds.
+    started = time.perf_counter()
+    if resolve_xlsx_writer(writer, tables) == "streaming":
+        return _build_streaming_xlsx(
+            tables, station_codes, toc_codes, progress, output, timings, started
+        )
+
     from openpyxl import Workbook
 
     wb = Workbook()
     wb.remove(wb.active)
 
-    used_names = set()
-    for idx, table in enumerate(tables or [], start=1):
-        base_name = _sheet_name(table.get("sheetName") or table.get("title"), f"Sheet {idx}")
-        name = base_name
-        suffix = 2
-        while name in used_names:
-            suffix_text = f" {suffix}"
-            name = f"{base_name[:31 - len(suffix_text)]}{suffix_text}"
-            suffix += 1
-        used_names.add(name)
-
+    for idx, table, name in sheet_names(tables):
         ws = wb.create_sheet(name)
         title_rows = []
         if table.get("title"):
@@ -215,33 +240,308 @@ def build_timetable_xlsx(tables, station_codes=None, toc_codes=None):
             facility_row,
             extra_rows=extra_rows,
         )
+        if progress is not None:
+            progress(idx / len(tables))
 
     codes_ws = wb.create_sheet("Station codes")
     codes_ws.append(["Code", "Station"])
-    for entry in station_codes or []:
-        if isinstance(entry, dict):
-            code = str(entry.get("code") or "").strip()
-            name = str(entry.get("name") or "").strip()
-        else:
-            code = str(entry[0] if len(entry) > 0 else "").strip()
-            name = str(entry[1] if len(entry) > 1 else "").strip()
-        if code or name:
-            codes_ws.append([code, name])
+    for row in lookup_rows(station_codes):
+        codes_ws.append(row)
     _format_lookup_sheet(codes_ws)
 
     toc_ws = wb.create_sheet("TOC codes")
     toc_ws.append(["Code", "Operator"])
-    for entry in toc_codes or []:
-        if isinstance(entry, dict):
-            code = str(entry.get("code") or "").strip()
-            name = str(entry.get("name") or "").strip()
-        else:
-            code = str(entry[0] if len(entry) > 0 else "").strip()
-            name = str(entry[1] if len(entry) > 1 else "").strip()
-        if code or name:
-            toc_ws.append([code, name])
+    for row in lookup_rows(toc_codes):
+        toc_ws.append(row)
     _format_lookup_sheet(toc_ws)
+    return _save_workbook(wb, output, timings, started)
+
+
+class _NamedStyles:
+    # One named style per combination of alignment, border, fill and font
+    # the standard formatter can give a cell, registered on first use. The
+    # parts use distinct words, so joining them names the style uniquely.
+    def __init__(self, wb):
+        from openpyxl.styles import Alignment, Border, Font, PatternFill, Side
+        from openpyxl.styles.builtins import styles as builtin_styles
+        from openpyxl.styles.fonts import DEFAULT_FONT
+
+        self.wb = wb
+        thin_side = Side(style="thin", color="B8B8B8")
+        medium_side = Side(style="medium", color="707070")
+        self.alignments = {
+            align: Alignment(horizontal=align, vertical="center", wrap_text=True)
+            for align in ("left", "right", "center")
+        }
+        self.borders = {
+            "thin": Border(left=thin_side, right=thin_side, top=thin_side, bottom=thin_side),
+            "station": Border(
+                left=thin_side,
+                right=thin_side,
+                top=medium_side,
+                bottom=thin_side,
+            ),
+            # What merging leaves on the covered cells of a thin-bordered row.
+            "merged": Border(top=thin_side, bottom=thin_side),
+            "merged-right": Border(right=thin_side, top=thin_side, bottom=thin_side),
+        }
+        self.fills = {
+            "header": PatternFill("solid", fgColor="D9EAF7"),
+            "facility": PatternFill("solid", fgColor="EDEDED"),
+            "band0": PatternFill("solid", fgColor="FFFFFF"),
+            "band1": PatternFill("solid", fgColor="F7FBFF"),
+        }
+        self.fonts = {
+            None: DEFAULT_FONT,
+            "title": Font(bold=True, size=14),
+            "date": Font(italic=True, color="666666"),
+            "bold": Font(bold=True),
+            "link": builtin_styles["Hyperlink"].font,
+            "link-bold": Font(bold=True, color="0563C1", underline="single"),
+        }
+        self._arrays = {}
+
+    def array(self, align, border, fill, font):
+        # The array is shared by every cell with this style, which is safe
+        # as long as nothing assigns font/fill/etc. to those cells.
+        key = (align, border, fill, font)
+        style = self._arrays.get(key)
+        if style is None:
+            from openpyxl.styles import NamedStyle
+
+            named = NamedStyle(
+                name=" ".join(["Timetable"] + [part for part in key if part]),
+            )
+            if align:
+                named.alignment = self.alignments[align]
+            if border:
+                named.border = self.borders[border]
+            if fill:
+                named.fill = self.fills[fill]
+            named.font = self.fonts[font]
+            self.wb.add_named_style(named)
+            style = self._arrays[key] = named.as_tuple()
+        return style
+
+
+def _streaming_cell(ws, value, style, hyperlink=None):
+    from openpyxl.cell import WriteOnlyCell
+
+    cell = WriteOnlyCell(ws, value)
+    # Same as ``cell.style = name`` without a by-name search per cell.
+    cell._style = style
+    if hyperlink:
+        cell.hyperlink = hyperlink
+    return cell
+
+
+def _timetable_cell_key(
+    row_idx,
+    col_idx,
+    max_col,
+    title_rows,
+    header_fills,
+    merged_rows,
+    band_start,
+    band,
+    station_row,
+    hyperlink,
+):
+    # Mirrors the order in which _format_timetable_sheet styles a cell,
+    # including merge_cells replacing covered cells with unstyled ones.
+    align = "left" if col_idx == 1 else "right" if col_idx == 2 else "center"
+    border = "thin"
+    fill = None
+    font = "link" if hyperlink else None
+    if row_idx == 1 and col_idx == 1 and title_rows:
+        font = "title"
+    if row_idx == 2 and col_idx == 1 and len(title_rows) > 1:
+        font = "date"
+    if row_idx in title_rows and col_idx > 1:
+        align = font = None
+        border = "merged-right" if col_idx == max_col else "merged"
+    if row_idx in header_fills:
+        fill = header_fills[row_idx]
+        font = "link-bold" if hyperlink else "bold"
+    if row_idx in merged_rows and col_idx == 2:
+        align = fill = font = None
+        border = "merged-right"
+    if row_idx >= band_start:
+        fill = f"band{band % 2}" if band >= 0 else "band0"
+        border = "station" if station_row else "thin"
+        if col_idx == 1 and station_row:
+            font = "bold"
+    return align, border, fill, font
+
+
+def _write_timetable_sheet(ws, table, styles):
+    from openpyxl.utils import get_column_letter
+
+    title_rows = []
+    lines = []
+    if table.get("title"):
+        lines.append([str(table.get("title"))])
+        title_rows.append(1)
+    if table.get("dateLabel"):
+        lines.append([str(table.get("dateLabel"))])
+        title_rows.append(len(lines))
+    if table.get("title") or table.get("dateLabel"):
+        lines.append([])
+    headcode_row = None
+    if table.get("headcodes"):
+        lines.append(table.get("headcodes", []))
+        headcode_row = len(lines)
+    header_row = None
+    if table.get("headers"):
+        lines.append(table.get("headers", []))
+        header_row = len(lines)
+    rows = table.get("rows") or []
+    first_data_row = len(lines) + 1
+    # The standard writer takes this from ws.max_row, which skips the blank
+    # spacer row and is 1 on an empty sheet.
+    last_filled = max((idx for idx, line in enumerate(lines, start=1) if line), default=1)
+    facility_row = last_filled + 1 if rows else None
+
+    # Everything that has to precede the cells in the sheet XML (merges,
+    # freeze panes, column widths) is worked out in one pass over the
+    # payload, so the rows themselves can be written and dropped one by one.
+    max_col = 1
+    max_row = 0
+    widths = {}
+    extra_rows = []
+    for row_idx, row in enumerate((*lines, *rows), start=1):
+        if row:
+            max_row = row_idx
+            max_col = max(max_col, len(row))
+        if row_idx in title_rows:
+            continue
+        for col_idx, value in enumerate(row, start=1):
+            width = min(34, len(cell_text(value)) + 2)
+            if width > widths.get(col_idx, 10):
+                widths[col_idx] = width
+        if row_idx >= first_data_row:
+            label = cell_text(row[0] if row else "").strip()
+            if label in {"Comes from", "Continues to"}:
+                extra_rows.append(row_idx)
+    max_row = max(max_row, 1)
+
+    # Freezing at column C creates that column in the standard writer.
+    for col_idx in range(1, max(max_col, 3) + 1):
+        ws.column_dimensions[get_column_letter(col_idx)].width = widths.get(col_idx, 10)
+    ws.column_dimensions["A"].width = 8
+    ws.column_dimensions["B"].width = 6
+    ws.freeze_panes = f"C{(facility_row or header_row or 1) + 1}"
+    merged_rows = set()
+    if max_col > 1:
+        for row_idx in title_rows:
+            ws.merged_cells.add(f"A{row_idx}:{get_column_letter(max_col)}{row_idx}")
+    if max_col >= 2:
+        for row_idx in (headcode_row, header_row, facility_row, *extra_rows):
+            if row_idx:
+                merged_rows.add(row_idx)
+                ws.merged_cells.add(f"A{row_idx}:B{row_idx}")
+
+    header_fills = {}
+    for row_idx, fill in (
+        (headcode_row, "header"),
+        (header_row, "header"),
+        (facility_row, "facility"),
+    ):
+        if row_idx:
+            header_fills[row_idx] = fill
+    band_start = (facility_row or header_row or 0) + 1
+    band = -1
+    keys = {}
+
+    def style_for(row_idx, col_idx, row_class, station_row, hyperlink):
+        # Rows of the same class style identically, so the key is cached per
+        # class and column position rather than computed for every cell.
+        col_class = col_idx if col_idx <= 2 or col_idx == max_col else "mid"
+        band_class = band % 2 if band >= 0 else -1
+        cache_key = (row_class, col_class, station_row, hyperlink, band_class)
+        key = keys.get(cache_key)
+        if key is None:
+            key = keys[cache_key] = _timetable_cell_key(
+                row_idx,
+                col_idx,
+                max_col,
+                title_rows,
+                header_fills,
+                merged_rows,
+                band_start,
+                band,
+                station_row,
+                hyperlink,
+            )
+        return styles.array(*key)
+
+    # An empty table still gets a styled (blank) A1, as in the standard writer.
+    for row_idx, row in enumerate((*lines, *rows, []), start=1):
+        if row_idx > max_row:
+            break
+        station_row = False
+        if row_idx >= band_start:
+            station_row = bool(cell_text(row[0] if row else "").strip())
+            if station_row:
+                band += 1
+        if row_idx in title_rows or row_idx in header_fills or row_idx in merged_rows:
+            row_class = row_idx
+        elif row_idx >= band_start:
+            row_class = "band"
+        else:
+            row_class = "plain"
+
+        cells = []
+        for col_idx in range(1, max_col + 1):
+            covered = (row_idx in title_rows and col_idx > 1 and max_col > 1) or (
+                row_idx in merged_rows and col_idx == 2
+            )
+            value = None
+            hyperlink = None
+            if col_idx <= len(row) and not covered:
+                raw = row[col_idx - 1]
+                value = cell_text(raw)
+                if isinstance(raw, dict):
+                    hyperlink = str(raw.get("hyperlink") or "").strip() or None
+            style = style_for(row_idx, col_idx, row_class, station_row, bool(hyperlink))
+            cells.append(_streaming_cell(ws, value, style, hyperlink))
+        ws.append(cells)
+
+
+def _write_lookup_sheet(ws, header, rows, styles):
+    from openpyxl.utils import get_column_letter
 
-    output = io.BytesIO()
-    wb.save(output)
-    return output.getvalue()
+    rows = list(rows)
+    widths = {}
+    for row in (header, *rows):
+        for col_idx, value in enumerate(row, start=1):
+            widths[col_idx] = max(widths.get(col_idx, 10), min(48, len(value) + 2))
+    for col_idx, width in widths.items():
+        ws.column_dimensions[get_column_letter(col_idx)].width = width
+    ws.freeze_panes = "A2"
+
+    header_style = styles.array(None, "thin", "header", "bold")
+    cell_style = styles.array(None, "thin", None, None)
+    ws.append([_streaming_cell(ws, value, header_style) for value in header])
+    for row in rows:
+        ws.append([_streaming_cell(ws, value, cell_style) for value in row])
+
+
+def _build_streaming_xlsx(
+    tables, station_codes, toc_codes, progress, output, timings, started
+):
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    styles = _NamedStyles(wb)
+    for idx, table, name in sheet_names(tables):
+        _write_timetable_sheet(wb.create_sheet(name), table, styles)
+        if progress is not None:
+            progress(idx / len(tables))
+    _write_lookup_sheet(
+        wb.create_sheet("Station codes"), ["Code", "Station"], lookup_rows(station_codes), styles
+    )
+    _write_lookup_sheet(
+        wb.create_sheet("TOC codes"), ["Code", "Operator"], lookup_rows(toc_codes), styles
+    )
+    return _save_workbook(wb, output, timings, started)